@@ -0,0 +1,75 @@
+"""Pipeline engine: dispatch overhead per node and resuming from cached node results"""
+
+import fcsugar
+from fcsugar import Container, node
+from fcsugar.core import cache
+from fcsugar.library import splice, normalize, rfft, LDA
+from .common import SIZE_PARAMS, SIZE_PARAM_NAMES, make_dataframe_container
+
+
+@node
+def noop(container, value: int = 0):
+    return container
+
+
+class _Empty(Container):
+    def __init__(self):
+        Container.__init__(self, status_widget=False)
+
+
+class PipelineDispatch:
+    """Executing pipelines of nodes that do nothing, divide by the number of nodes for the overhead per node"""
+
+    params = [10, 100, 1000]
+    param_names = ['n_nodes']
+
+    def setup(self, n_nodes):
+        fcsugar.config.show_gui = False
+        self.container = _Empty()
+
+    def time_build_and_execute(self, n_nodes):
+        for i in range(n_nodes):
+            self.container >> noop(value=i)
+        self.container.execute_pipeline()
+
+    def time_execute_trace_memory(self, n_nodes):
+        for i in range(n_nodes):
+            self.container >> noop(value=i)
+        self.container.execute_pipeline(trace_memory=True)
+
+
+class PipelineCache:
+    """Re-executing a pipeline after changing the params of its last node, as the GUI does"""
+
+    params = SIZE_PARAMS
+    param_names = SIZE_PARAM_NAMES
+
+    def setup(self, n_rows, n_samples):
+        fcsugar.config.show_gui = False
+        cache.models.clear()
+        self.container = make_dataframe_container(n_rows, n_samples)
+        self.container >> splice('_RAW_CURVE', 0, n_samples - 100) >> normalize('spliced') >> rfft('normalize') >> \
+            LDA('fft', labels_column='FCLUSTER_LABELS', n_components=2)
+        self.container.execute_pipeline(clear=False)
+        self.random_state = 0
+
+    def time_change_last_node(self, n_rows, n_samples):
+        # a new value on every call so that neither the node result nor the fitted model is cached,
+        # values that were used before are cached by every repeat after the first
+        self.random_state += 1
+        self.container.pipeline[-1].params['random_state'] = self.random_state
+        self.container.execute_pipeline(clear=False)
+
+
+class ImportTime:
+    """Cold import and container creation in a fresh interpreter, as in batch workers"""
+
+    def timeraw_import_headless(self):
+        return """
+        import os
+        os.environ['FCSUGAR_HEADLESS'] = '1'
+        import pandas as pd
+        from fcsugar import DataFrameContainer
+        from fcsugar.library import splice, normalize, LDA, kshape
+        DataFrameContainer(pd.DataFrame({'a': [0]})) >> splice('a', 0, 1)
+        """
@@ -0,0 +1,92 @@
+"""hdf5 save & load round trips"""
+
+import os
+import tempfile
+import fcsugar
+from fcsugar import DataFrameContainer
+from fcsugar.core import hdftools
+from .common import SIZE_PARAMS, SIZE_PARAM_NAMES, make_dataframe, make_dataframe_container, make_array_container
+
+
+class _FileBenchmark:
+    params = SIZE_PARAMS
+    param_names = SIZE_PARAM_NAMES
+
+    def setup(self, n_rows, n_samples):
+        fcsugar.config.show_gui = False
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'bench.h5')
+        self.saved = os.path.join(self.tmpdir.name, 'saved.h5')
+
+    def teardown(self, n_rows, n_samples):
+        self.tmpdir.cleanup()
+
+    def _remove(self):
+        if os.path.isfile(self.path):
+            os.remove(self.path)
+
+
+class SaveLoadDataFrame(_FileBenchmark):
+    def setup(self, n_rows, n_samples):
+        _FileBenchmark.setup(self, n_rows, n_samples)
+        self.df = make_dataframe(n_rows, n_samples)
+        hdftools.save_dataframe(self.saved, self.df, metadata={'source': 'benchmark'})
+
+    def time_save_dataframe(self, n_rows, n_samples):
+        self._remove()
+        hdftools.save_dataframe(self.path, self.df, metadata={'source': 'benchmark'})
+
+    def time_load_dataframe(self, n_rows, n_samples):
+        hdftools.load_dataframe(self.saved)
+
+
+class SaveLoadColumns(_FileBenchmark):
+    def setup(self, n_rows, n_samples):
+        _FileBenchmark.setup(self, n_rows, n_samples)
+        self.index, self.columns = make_dataframe_container(n_rows, n_samples).to_columns()
+        hdftools.append_columns(self.saved, self.columns, self.index)
+
+    def time_append_columns(self, n_rows, n_samples):
+        self._remove()
+        hdftools.append_columns(self.path, self.columns, self.index)
+
+    def time_read_columns(self, n_rows, n_samples):
+        hdftools.read_columns(self.saved)
+
+    def time_read_row_slice(self, n_rows, n_samples):
+        hdftools.read_columns(self.saved, start=0, stop=n_rows // 10)
+
+
+class SaveLoadDataFrameContainer(_FileBenchmark):
+    def setup(self, n_rows, n_samples):
+        _FileBenchmark.setup(self, n_rows, n_samples)
+        self.container = make_dataframe_container(n_rows, n_samples)
+        self.container.to_hdf5(self.saved)
+
+    def time_save(self, n_rows, n_samples):
+        self._remove()
+        self.container.to_hdf5(self.path)
+
+    def time_load(self, n_rows, n_samples):
+        DataFrameContainer.from_hdf5(self.saved, status_widget=False)
+
+    def time_load_columns_slice(self, n_rows, n_samples):
+        DataFrameContainer.from_hdf5(self.saved, columns=['_RAW_CURVE'], start=0, stop=n_rows // 10,
+                                     slices={'_RAW_CURVE': slice(0, n_samples // 2)}, status_widget=False)
+
+
+class SaveLoadArrayContainer(_FileBenchmark):
+    def setup(self, n_rows, n_samples):
+        _FileBenchmark.setup(self, n_rows, n_samples)
+        self.container = make_array_container(n_rows, n_samples)
+        self.container.to_hdf5(self.saved)
+
+    def time_save(self, n_rows, n_samples):
+        self._remove()
+        self.container.to_hdf5(self.path)
+
+    def time_load(self, n_rows, n_samples):
+        type(self.container).from_hdf5(self.saved, status_widget=False)
+
+    def time_load_mmap(self, n_rows, n_samples):
+        type(self.container).from_hdf5(self.saved, mmap=True, status_widget=False)
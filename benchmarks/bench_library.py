@@ -0,0 +1,126 @@
+"""Library nodes on synthetic DataFrameContainers"""
+
+import fcsugar
+from fcsugar.core import cache
+from fcsugar.library import splice, normalize, zscore, log, absval, rfft, LDA, pad_arrays, sort_peak_widths, \
+    kshape, rfft_magnitude, log_power_spectrum, welch_psd, build_index
+from .common import SIZE_PARAMS, SIZE_PARAM_NAMES, make_dataframe_container
+
+
+class _NodeBenchmark:
+    params = SIZE_PARAMS
+    param_names = SIZE_PARAM_NAMES
+
+    def setup(self, n_rows, n_samples):
+        fcsugar.config.show_gui = False
+        # fitted models are cached across executions, every repeat should fit
+        cache.models.clear()
+        self.container = make_dataframe_container(n_rows, n_samples)
+
+    def _run(self, *nodes):
+        for n in nodes:
+            self.container >> n
+        self.container.execute_pipeline()
+
+
+class Elementwise(_NodeBenchmark):
+    def time_splice(self, n_rows, n_samples):
+        self._run(splice('_RAW_CURVE', 0, n_samples // 2))
+
+    def time_normalize(self, n_rows, n_samples):
+        self._run(normalize('_RAW_CURVE'))
+
+    def time_zscore(self, n_rows, n_samples):
+        self._run(zscore('_RAW_CURVE'))
+
+    def time_log(self, n_rows, n_samples):
+        self._run(log('_RAW_CURVE'))
+
+    def time_absval(self, n_rows, n_samples):
+        self._run(absval('_RAW_CURVE'))
+
+    def peakmem_normalize(self, n_rows, n_samples):
+        self._run(normalize('_RAW_CURVE'))
+
+
+class ElementwiseRagged(_NodeBenchmark):
+    def setup(self, n_rows, n_samples):
+        fcsugar.config.show_gui = False
+        cache.models.clear()
+        self.container = make_dataframe_container(n_rows, n_samples, ragged=True)
+
+    def time_normalize(self, n_rows, n_samples):
+        self._run(normalize('_RAW_CURVE'))
+
+    def time_pad_arrays(self, n_rows, n_samples):
+        self._run(pad_arrays('_RAW_CURVE', method='random'))
+
+
+class Signal(_NodeBenchmark):
+    def time_rfft(self, n_rows, n_samples):
+        self._run(rfft('_RAW_CURVE'))
+
+    def peakmem_rfft(self, n_rows, n_samples):
+        self._run(rfft('_RAW_CURVE'))
+
+    def time_rfft_absval_log(self, n_rows, n_samples):
+        self._run(rfft('_RAW_CURVE'), absval('fft'), log('absval'))
+
+    def time_rfft_magnitude(self, n_rows, n_samples):
+        self._run(rfft_magnitude('_RAW_CURVE'))
+
+    def time_log_power_spectrum(self, n_rows, n_samples):
+        self._run(log_power_spectrum('_RAW_CURVE'))
+
+    def time_log_power_spectrum_float32(self, n_rows, n_samples):
+        self._run(log_power_spectrum('_RAW_CURVE', single_precision=True))
+
+    def time_welch_psd(self, n_rows, n_samples):
+        self._run(welch_psd('_RAW_CURVE'))
+
+    def time_sort_peak_widths(self, n_rows, n_samples):
+        self._run(sort_peak_widths('_RAW_CURVE'))
+
+    def time_sort_peak_widths_permutation(self, n_rows, n_samples):
+        self._run(sort_peak_widths('_RAW_CURVE', permutation_only=True))
+
+
+class Transform(_NodeBenchmark):
+    def time_LDA(self, n_rows, n_samples):
+        self._run(LDA('_RAW_CURVE', labels_column='FCLUSTER_LABELS', n_components=2))
+
+
+class Search(_NodeBenchmark):
+    def setup(self, n_rows, n_samples):
+        _NodeBenchmark.setup(self, n_rows, n_samples)
+        self.trace = self.container.get_block('_RAW_CURVE')[0]
+        self.indexes = {
+            metric: fcsugar.core.TraceIndex(metric, random_state=0).fit(self.container.get_block('_RAW_CURVE'))
+            for metric in ('euclidean', 'sbd')
+        }
+
+    def time_build_index(self, n_rows, n_samples):
+        self._run(build_index('_RAW_CURVE', metric='sbd'))
+
+    def time_query_euclidean(self, n_rows, n_samples):
+        self.indexes['euclidean'].query(self.trace, k=10)
+
+    def time_query_sbd(self, n_rows, n_samples):
+        self.indexes['sbd'].query(self.trace, k=10)
+
+
+class Cluster(_NodeBenchmark):
+    # kshape is slow, small sizes only
+    params = ([1000], [100])
+
+    def setup(self, n_rows, n_samples):
+        try:
+            import tslearn
+        except ImportError:
+            raise NotImplementedError("tslearn is not installed")
+
+        self.kshape = kshape
+        _NodeBenchmark.setup(self, n_rows, n_samples)
+
+    def time_kshape(self, n_rows, n_samples):
+        self._run(self.kshape('_RAW_CURVE', n_clusters=3, max_iter=10, verbose=False, random_state=0))
@@ -0,0 +1,21 @@
+"""Colormap utilities"""
+
+import numpy as np
+from fcsugar.plotting import make_colormap, map_labels_to_colors
+
+
+class Colormaps:
+    params = [10, 1000, 100000]
+    param_names = ['n']
+
+    def setup(self, n):
+        self.labels = np.random.default_rng(0).integers(0, 10, size=n)
+
+    def time_make_colormap(self, n):
+        make_colormap(min(n, 200), 'hsv', output='bokeh')
+
+    def time_map_labels_to_colors_bokeh(self, n):
+        map_labels_to_colors(self.labels, 'tab10', output='bokeh')
+
+    def time_map_labels_to_colors_mpl(self, n):
+        map_labels_to_colors(self.labels, 'tab10', output='mpl')
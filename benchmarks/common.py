@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Synthetic data for the benchmarks.
+
+Run the benchmarks with asv, results are stored as JSON in .asv/results:
+
+    asv run                  # benchmark the latest commit in a new environment
+    asv run --python=same    # benchmark the current environment
+    asv compare HEAD~1 HEAD  # compare two commits
+"""
+
+import numpy as np
+import pandas as pd
+import fcsugar
+
+fcsugar.config.show_gui = False
+
+from fcsugar.containers import DataFrameContainer, ArrayContainer
+
+
+# asv params for the size of the synthetic data, benchmarks are run for all combinations
+SIZE_PARAMS = ([1000, 10000], [1000])
+SIZE_PARAM_NAMES = ['n_rows', 'n_samples']
+
+
+def make_traces(n_rows: int, n_samples: int, ragged: bool = False, seed: int = 0) -> list:
+    """Noisy gaussian peaks with random positions and widths, values are positive"""
+    rng = np.random.default_rng(seed)
+
+    if ragged:
+        sizes = rng.integers(n_samples // 2, n_samples + 1, size=n_rows)
+    else:
+        sizes = np.full(n_rows, n_samples)
+
+    traces = []
+    for size in sizes:
+        x = np.arange(size)
+        center = rng.uniform(0.2, 0.8) * size
+        width = rng.uniform(0.01, 0.1) * size
+        peak = np.exp(-0.5 * ((x - center) / width) ** 2)
+        traces.append(peak + 0.05 * rng.random(size) + 0.01)
+
+    return traces
+
+
+def make_dataframe(n_rows: int, n_samples: int, ragged: bool = False, n_labels: int = 4, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    return pd.DataFrame(
+        {
+            '_RAW_CURVE': make_traces(n_rows, n_samples, ragged=ragged, seed=seed),
+            'FCLUSTER_LABELS': rng.integers(0, n_labels, size=n_rows),
+        }
+    )
+
+
+def make_dataframe_container(n_rows: int, n_samples: int, ragged: bool = False, n_labels: int = 4,
+                             seed: int = 0) -> DataFrameContainer:
+    df = make_dataframe(n_rows, n_samples, ragged=ragged, n_labels=n_labels, seed=seed)
+    return DataFrameContainer(df, status_widget=False)
+
+
+def make_array_container(n_rows: int, n_samples: int, n_labels: int = 4, seed: int = 0) -> ArrayContainer:
+    rng = np.random.default_rng(seed)
+
+    array = np.stack(make_traces(n_rows, n_samples, seed=seed))
+    labels = rng.integers(0, n_labels, size=array.shape)
+
+    return ArrayContainer(array, labels, status_widget=False)
@@ -1,2 +1,2 @@
-from .core import Container, Node, node, config
+from .core import Container, Node, node, config, Pipeline
 from .containers import *
@@ -1,2 +1,4 @@
 from .containers import *
 from .user_containers import *
+from .streaming import *
+from .lazy import *
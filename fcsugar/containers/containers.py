@@ -18,38 +18,470 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 
-from ..core import Container, hdftools
+from ..core import Container, TraceIndex, hdftools, config, executors, registry
+from ..core.cache import sizeof, fingerprint
 import pandas as pd
 import numpy as np
-from typing import Union
+import h5py
+import os
+from typing import Callable, Dict, Tuple, List, Optional
+from warnings import warn
 
 
 class DataFrameContainer(Container):
-    def __init__(self, dataframe: pd.DataFrame):
-        Container.__init__(self)
+    def __init__(self, dataframe: pd.DataFrame, status_widget=None):
+        Container.__init__(self, status_widget=status_widget)
         self.dataframe = dataframe
 
+        # column name: (2D block, ids of the row views stored in the DataFrame)
+        self._blocks = {}
+
+        # column name: TraceIndex, see the build_index node
+        self.indexes = {}
+
+        # column name: the column's values when its index was set, keeps the arrays alive so their ids stay unique
+        self._indexed_rows = {}
+
     def to_dict(self) -> dict:
         pass
 
+    def get_block(self, column: str) -> np.ndarray:
+        """
+        Get a column of equal-length arrays as a 2D array of shape [n_rows, array_size].
+
+        Columns set with ``set_block()`` are returned without copying as long as the column has not been
+        modified or reordered since. Other columns are stacked once and stored as a block, the rows in the
+        DataFrame are then replaced by views of the block.
+
+        :param column: name of a DataFrame column where each element is a 1D array
+        :return:       2D array, rows are in the order of the DataFrame
+        :raises ValueError: if the arrays in the column are not all of the same size
+        """
+        values = self.dataframe[column].values
+
+        if column in self._blocks.keys():
+            block, ids = self._blocks[column]
+
+            if np.array_equal(ids, _row_ids(values)):
+                return block
+
+        if not self.is_uniform(column):
+            raise ValueError(f"Arrays in column '{column}' are not all of the same size")
+
+        block = np.stack(values)
+        self.set_block(column, block)
+
+        return block
+
+    def set_block(self, column: str, data: np.ndarray):
+        """
+        Set a column from a 2D array of shape [n_rows, array_size].
+        Each element of the DataFrame column is a view of a row of the array.
+        The array is not copied, so it must not be modified in place afterwards.
+
+        :param column: name of the column, it is created if it does not exist
+        :param data:   2D array, rows must be in the order of the DataFrame
+        """
+        if data.ndim != 2:
+            raise ValueError(f"data must be a 2D array, got an array of shape {data.shape}")
+
+        if data.shape[0] != self.dataframe.index.size:
+            raise ValueError(f"data has {data.shape[0]} rows, the DataFrame has {self.dataframe.index.size} rows")
+
+        # not copied, slices such as data[:, start:stop] are kept as views
+        rows = np.empty(data.shape[0], dtype=object)
+        for i in range(data.shape[0]):
+            rows[i] = data[i]
+
+        self.dataframe[column] = pd.Series(rows, index=self.dataframe.index, dtype=object)
+        self._blocks[column] = (data, _row_ids(rows))
+
+    def map_blocks(self, func: Callable[[np.ndarray], np.ndarray], column: str, output_column: str):
+        """
+        Apply a function that operates on 2D arrays, where each row is a trace, to a column of arrays.
+
+        Columns of equal-length arrays are processed in one call on the whole block. Otherwise rows of the same
+        size are stacked and processed together, in chunks of at most ``config.chunk_rows`` rows.
+
+        :param func:          function that takes a 2D array and returns a 2D array with the same number of rows
+        :param column:        input column
+        :param output_column: column to store the output in
+        """
+        if self.is_uniform(column):
+            self.set_block(output_column, func(self.get_block(column)))
+            return
+
+        values = self.dataframe[column].values
+        sizes = np.fromiter(map(np.size, values), dtype=np.int64, count=len(values))
+
+        out = np.empty(len(values), dtype=object)
+
+        for size in np.unique(sizes):
+            ixs = np.flatnonzero(sizes == size)
+
+            for start in range(0, ixs.size, config.chunk_rows):
+                chunk = ixs[start:start + config.chunk_rows]
+                block = func(np.stack(values[chunk]))
+
+                for i, row in zip(chunk, block):
+                    out[i] = row
+
+        self.dataframe[output_column] = pd.Series(out, index=self.dataframe.index, dtype=object)
+
+    def process_node(self, node, params: Optional[dict] = None):
+        """
+        Execute a row-local node on shards of rows in parallel with the executor set in ``config.executor``.
+
+        Only the columns named by the node's ``*_column`` params are passed to the shards, or all columns if it has
+        no such params. With the process executor the shards are inherited by forked workers and the output columns
+        are returned through shared memory.
+
+        :param params: params to execute the node with, ``node.params`` if None
+        """
+        if params is None:
+            params = node.params
+
+        executor = executors.get_executor()
+        n_rows = self.dataframe.index.size
+
+        if (executor == 'serial') or (n_rows < 2 * executors.get_n_workers()):
+            return node.process(self, **params)
+
+        input_columns = [v for k, v in params.items() if k.endswith('_column') and v in self.dataframe.columns]
+        if len(input_columns) == 0:
+            input_columns = list(self.dataframe.columns)
+
+        index = self.dataframe.index.values
+        columns = {}
+        for c in input_columns:
+            columns[c] = self.get_block(c) if self.is_uniform(c) else self.dataframe[c].values
+
+        def run_shard(start: int, stop: int) -> dict:
+            shard = DataFrameContainer.from_columns(
+                index[start:stop], {c: a[start:stop] for c, a in columns.items()}, status_widget=False
+            )
+            ids = {c: _row_ids(shard.dataframe[c].values) for c in columns.keys()}
+
+            shard = node.process(shard, **params)
+
+            out = {}
+            for c in shard.dataframe.columns:
+                # new columns, or input columns that were replaced by the node
+                if (c in ids.keys()) and np.array_equal(ids[c], _row_ids(shard.dataframe[c].values)):
+                    continue
+
+                a = shard.get_block(c) if shard.is_uniform(c) else shard.dataframe[c].values
+
+                if (executor == 'process') and (a.dtype != np.dtype('O')):
+                    a = executors.SharedArray.create(a)
+
+                out[c] = a
+
+            return out
+
+        bounds = executors.shard_bounds(n_rows, executors.get_n_workers())
+        shards = executors.map_shards(run_shard, n_rows, executor=executor)
+
+        for c in shards[0].keys():
+            parts = [s[c] for s in shards]
+
+            shape = [p.shape for p in parts]
+            dtype = np.result_type(*[p.dtype for p in parts])
+
+            if all(len(s) == len(shape[0]) and s[1:] == shape[0][1:] for s in shape) and (dtype != np.dtype('O')):
+                data = np.empty((n_rows,) + shape[0][1:], dtype=dtype)
+
+                for (start, stop), p in zip(bounds, parts):
+                    if isinstance(p, executors.SharedArray):
+                        p.read(out=data[start:stop])
+                    else:
+                        data[start:stop] = p
+
+                if data.ndim == 2:
+                    self.set_block(c, data)
+                else:
+                    self.dataframe[c] = data
+
+            else:
+                # ragged arrays, or shards with arrays of different sizes
+                data = np.empty(n_rows, dtype=object)
+
+                for (start, stop), p in zip(bounds, parts):
+                    if isinstance(p, executors.SharedArray):
+                        p = p.read()
+
+                    for i, row in enumerate(p, start):
+                        data[i] = row
+
+                self.dataframe[c] = pd.Series(data, index=self.dataframe.index, dtype=object)
+
+        return self
+
+    def is_uniform(self, column: str) -> bool:
+        """Whether all elements of a column are arrays of the same size"""
+        if self.dataframe[column].dtype != np.dtype('O'):
+            return False
+
+        if column in self._blocks.keys():
+            if np.array_equal(self._blocks[column][1], _row_ids(self.dataframe[column].values)):
+                return True
+
+        values = self.dataframe[column].values
+
+        if (values.size == 0) or (not isinstance(values[0], np.ndarray)) or (values[0].ndim != 1):
+            return False
+
+        sizes = np.fromiter(map(np.size, values), dtype=np.int64, count=values.size)
+        return bool((sizes == sizes[0]).all())
+
+    def get_profile_info(self) -> dict:
+        return {'n_rows': self.dataframe.index.size, 'columns': list(self.dataframe.columns)}
+
+    def get_column_nbytes(self, columns: List[str]) -> Dict[str, int]:
+        return {c: sizeof(self.dataframe[c].values) for c in columns}
+
+    def get_state(self) -> dict:
+        # shallow copy, nodes add or replace columns instead of modifying them in place
+        return {'dataframe': self.dataframe.copy(deep=False), '_blocks': dict(self._blocks),
+                'indexes': dict(self.indexes), '_indexed_rows': dict(self._indexed_rows)}
+
+    def set_state(self, state: dict):
+        self.dataframe = state['dataframe'].copy(deep=False)
+        self._blocks = dict(state['_blocks'])
+        self.indexes = dict(state['indexes'])
+        self._indexed_rows = dict(state['_indexed_rows'])
+
+    def fingerprint(self) -> str:
+        # _blocks holds the ids of row views and indexes are derived from the columns, only the DataFrame is data
+        return fingerprint(self.dataframe)
+
+    def set_index(self, column: str, index: TraceIndex):
+        """
+        Set the nearest-neighbour index of a column. The rows of the column are recorded so that ``get_index()``
+        can tell when the column was reordered, filtered or replaced after the index was built.
+
+        :param column: name of the indexed column
+        :param index:  index built from the column's traces, in the order of the DataFrame
+        """
+        self.indexes[column] = index
+        self._indexed_rows[column] = self.dataframe[column].values.copy()
+
+    def get_index(self, column: str) -> TraceIndex:
+        """
+        Get the nearest-neighbour index of a column, built with the ``build_index`` node.
+
+        :raises KeyError:   if the column has no index
+        :raises ValueError: if the rows of the column changed since the index was built
+        """
+        if column not in self.indexes.keys():
+            raise KeyError(f"Column '{column}' has no index, build one with the build_index node")
+
+        index = self.indexes[column]
+
+        if len(index) != self.dataframe.index.size:
+            raise ValueError(f"The index of column '{column}' has {len(index)} rows, the DataFrame has "
+                             f"{self.dataframe.index.size} rows. Build the index again.")
+
+        # nodes reorder, filter or replace columns without copying the arrays of the rows that are kept
+        if (column in self._indexed_rows.keys()) and \
+                not np.array_equal(_row_ids(self._indexed_rows[column]), _row_ids(self.dataframe[column].values)):
+            raise ValueError(f"Column '{column}' was modified since its index was built. Build the index again.")
+
+        return index
+
+    def to_columns(self) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Get the index and columns as arrays, for ``hdftools.append_columns()``.
+        Columns of equal-size arrays are returned as 2D blocks.
+        """
+        columns = {}
+        for c in self.dataframe.columns:
+            if self.is_uniform(c):
+                columns[c] = self.get_block(c)
+            else:
+                columns[c] = self.dataframe[c].values
+
+        return self.dataframe.index.values, columns
+
     @classmethod
-    def from_hdf5(cls, path: str, key: str = 'DATAFRAME_CONTAINER'):
+    def from_columns(cls, index: np.ndarray, columns: Dict[str, np.ndarray], **kwargs):
+        """
+        Create a container from the output of ``hdftools.read_columns()``, 2D arrays are stored as blocks.
+        kwargs are passed to the constructor.
+        """
+        blocks = {c: a for c, a in columns.items() if a.ndim == 2}
+
+        df = pd.DataFrame({c: a for c, a in columns.items() if a.ndim == 1}, index=index)
+
+        container = cls(df, **kwargs)
+
+        for c in columns.keys():
+            if c in blocks.keys():
+                container.set_block(c, blocks[c])
+
+        # keep the column order
+        container.dataframe = container.dataframe[list(columns.keys())]
+
+        return container
+
+    @classmethod
+    def from_hdf5(cls, path: str, key: str = 'DATAFRAME_CONTAINER', columns: Optional[List[str]] = None,
+                  start: Optional[int] = None, stop: Optional[int] = None,
+                  slices: Optional[Dict[str, slice]] = None, **kwargs):
+        """
+        Load a container saved with ``to_hdf5()``. Only the requested columns and rows are read from the file,
+        see ``hdftools.read_columns()``. Files saved with ``DataFrame.to_hdf`` are also supported but are always
+        read entirely. kwargs are passed to the constructor.
+
+        Indexes of columns, see ``build_index``, are only loaded with all the rows and without ``slices``.
+
+        :param path:    path to the hdf5 file
+        :param key:     name of the hdf5 group
+        :param columns: columns to load, loads all columns if None
+        :param start:   first row to load
+        :param stop:    stop loading before this row
+        :param slices:  column name: slice of the arrays in the column, such as ``slice(0, 1000)``
+        """
+        if hdftools.is_columnar(path, key):
+            container = cls.from_columns(
+                *hdftools.read_columns(path, key, columns=columns, start=start, stop=stop, slices=slices),
+                **kwargs
+            )
+            container._functions = registry.load_functions(path, key)
+
+            # indexes refer to all rows and the whole arrays
+            if (start is None) and (stop is None) and not slices:
+                for c, index in _load_indexes(path, key, list(container.dataframe.columns)).items():
+                    container.set_index(c, index)
+
+            return container
+
         df = pd.read_hdf(path, key=key, mode='r')
-        return cls(df)
 
-    def to_hdf5(self, path: str, key: str = 'DATAFRAME_CONTAINER'):
-        pass
+        if columns is not None:
+            df = df[columns]
+
+        container = cls(df.iloc[start:stop], **kwargs)
+        container._functions = registry.load_functions(path, key)
+
+        return container
+
+    def to_hdf5(self, path: str, key: str = 'DATAFRAME_CONTAINER', compression: Optional[str] = None,
+                compression_opts: Optional[int] = None, append: bool = False, columns: Optional[List[str]] = None):
+        """
+        Save the DataFrame in the columnar layout, see ``hdftools.append_columns()``. Each column is a separate
+        chunked dataset, columns of equal-size arrays are stored as 2D datasets.
+
+        Compression makes files smaller but saving and loading slower, 'lzf' saves noisy float traces at about
+        100 MB/s per core compared to GB/s without compression.
+
+        DataFrames that the columnar layout does not support, such as DataFrames without rows, with datetime
+        columns or with a MultiIndex, are saved with ``DataFrame.to_hdf`` instead, without compression.
+        They cannot be appended to, have columns written with ``columns``, or have their indexes saved.
+
+        :param path:             path to the hdf5 file, other groups in an existing file are kept
+        :param key:              name of the hdf5 group, must not exist in the file unless ``append`` or
+                                 ``columns`` is used
+        :param compression:      hdf5 compression filter, 'lzf' is faster, 'gzip' is smaller, None to not compress
+        :param compression_opts: options of the compression filter, such as the gzip level
+        :param append:           append the rows to the stored DataFrame, which must have the same columns
+        :param columns:          only write these columns, adding or replacing them in the stored DataFrame,
+                                 which must have the same number of rows. Other columns are not rewritten.
+        """
+        filters = dict(compression=compression, compression_opts=compression_opts)
+
+        exists = False
+        if os.path.isfile(path):
+            with h5py.File(path, 'r') as f:
+                exists = key in f.keys()
+
+        if columns is not None:
+            for c in columns:
+                if self.is_uniform(c):
+                    values = self.get_block(c)
+                else:
+                    values = self.dataframe[c].values
+
+                hdftools.write_column(path, c, values, key=key, **filters)
+
+            _save_indexes(path, key, {c: i for c, i in self.indexes.items() if c in columns}, replace=columns)
+            return
+
+        if exists and not append:
+            raise KeyError(f"'{key}' already exists in file: {path}")
+
+        index, data = self.to_columns()
+
+        if exists:
+            hdftools.append_columns(path, data, index, key=key, **filters)
+
+        elif (len(index) == 0) or isinstance(self.dataframe.columns, pd.MultiIndex):
+            self._to_hdf_table(path, key)
+            return
+
+        else:
+            # append_columns raises TypeError for unsupported columns before writing anything
+            try:
+                hdftools.append_columns(path, data, index, key=key, **filters)
+            except TypeError:
+                self._to_hdf_table(path, key)
+                return
+
+        registry.save_functions(path, key, self._functions)
+
+        # saved indexes don't have the appended rows
+        _save_indexes(path, key, {} if append else self.indexes, replace=list(self.dataframe.columns))
+
+    def _to_hdf_table(self, path: str, key: str):
+        # for DataFrames the columnar layout does not support, see to_hdf5()
+        self.dataframe.to_hdf(path, key=key, mode='a')
+        registry.save_functions(path, key, self._functions)
+
+        if len(self.indexes) > 0:
+            warn(f"The indexes of {list(self.indexes.keys())} are not saved with DataFrames that are not "
+                 f"stored in the columnar layout")
 
     def __add__(self, dataframe_container):
         self.dataframe = pd.concat([self.dataframe, dataframe_container.df])
         return self
 
 
+def _save_indexes(path: str, key: str, indexes: Dict[str, TraceIndex], replace: List[str]):
+    """Save the indexes of columns in the 'indexes' subgroup of a container's group, and delete the
+    saved indexes of the columns in ``replace`` that are not in ``indexes``"""
+    with h5py.File(path, 'a') as f:
+        if 'indexes' in f[key].keys():
+            for c in replace:
+                if (c in f[key]['indexes'].keys()) and (c not in indexes.keys()):
+                    del f[key]['indexes'][c]
+
+    for c, index in indexes.items():
+        index.to_hdf5(path, f"{key}/indexes/{c}")
+
+
+def _load_indexes(path: str, key: str, columns: List[str]) -> Dict[str, TraceIndex]:
+    with h5py.File(path, 'r') as f:
+        if 'indexes' not in f[key].keys():
+            return {}
+
+        saved = [c for c in f[key]['indexes'].keys() if c in columns]
+
+    return {c: TraceIndex.from_hdf5(path, f"{key}/indexes/{c}") for c in saved}
+
+
+def _row_ids(values: np.ndarray) -> np.ndarray:
+    return np.fromiter(map(id, values), dtype=np.intp, count=len(values))
+
+
 class ArrayContainer(Container):
-    def __init__(self, array: np.ndarray, labels: np.ndarray = None):
-        Container.__init__(self)
+    def __init__(self, array: np.ndarray, labels: np.ndarray = None, status_widget=None):
+        """
+        :param array:  data array, can be memory-mapped, see ``from_hdf5()`` and ``from_npy()``
+        :param labels: labels with the same shape as the array
+        """
+        Container.__init__(self, status_widget=status_widget)
 
-        if array.shape != labels.shape:
+        if (labels is not None) and (array.shape != labels.shape):
             raise ValueError("Shape of array and labels must match exactly")
 
         self.array = array
@@ -58,14 +490,106 @@ class ArrayContainer(Container):
     def to_dict(self):
         return {'array': self.array, 'labels': self.labels}
 
+    def get_state(self) -> dict:
+        # no copy, nodes replace the arrays instead of modifying them in place.
+        # Copying would also read memory-mapped arrays into memory.
+        return {'array': self.array, 'labels': self.labels}
+
+    def set_state(self, state: dict):
+        self.array = state['array']
+        self.labels = state['labels']
+
+    @property
+    def is_memmap(self) -> bool:
+        """Whether the array is memory-mapped from a file"""
+        return isinstance(self.array, np.memmap)
+
     @classmethod
-    def from_hdf5(cls, path: str, key: str = 'ARRAY_CONTAINER'):
-        d = hdftools.load_dict(path, group=key)
+    def from_hdf5(cls, path: str, key: str = 'ARRAY_CONTAINER', mmap: bool = False, **kwargs):
+        """
+        Load a container saved with ``to_hdf5()``, kwargs are passed to the constructor.
+
+        :param path: path to the hdf5 file
+        :param key:  name of the hdf5 group
+        :param mmap: memory-map the array and labels instead of reading them, see ``hdftools.memmap_dataset()``.
+                     Labels that cannot be memory-mapped, such as str labels, are read.
+        """
+        if not mmap:
+            d = hdftools.load_dict(path, group=key)
+
+            if 'array' not in d.keys():
+                raise TypeError("Not a valid ArrayContainer. File does not have the required 'array' key")
 
-        if ('array' not in d.keys()) or ('labels' not in d.keys()):
-            raise TypeError("Not a valid ArrayContainer. File does not have required 'array' and 'labels' keys")
+            container = cls(d['array'], d.get('labels'), **kwargs)
+            container._functions = registry.load_functions(path, key)
+            return container
 
-        return cls(**d)
+        with h5py.File(path, 'r') as f:
+            if 'array' not in f[key].keys():
+                raise TypeError("Not a valid ArrayContainer. File does not have the required 'array' key")
+
+            labels_dtype = f[key]['labels'].dtype if 'labels' in f[key].keys() else None
+
+        array = hdftools.memmap_dataset(path, f'{key}/array')
+
+        if labels_dtype is None:
+            labels = None
+        elif labels_dtype.kind in 'biufc':
+            labels = hdftools.memmap_dataset(path, f'{key}/labels')
+        else:
+            with hdftools.load_dict(path, group=key, lazy=True) as d:
+                labels = d['labels']
+
+        container = cls(array, labels, **kwargs)
+        container._functions = registry.load_functions(path, key)
+        return container
 
     def to_hdf5(self, path, key: str = 'ARRAY_CONTAINER'):
-        hdftools.save_dict(self.to_dict(), path, group=key)
+        """
+        Save the array and labels to an hdf5 file. Labels are left out if they are None.
+
+        :param path: path to the hdf5 file
+        :param key:  name of the hdf5 group
+        """
+        d = {k: v for k, v in self.to_dict().items() if v is not None}
+        hdftools.save_dict(d, path, group=key)
+        registry.save_functions(path, key, self._functions)
+
+    @classmethod
+    def from_npy(cls, path: str, mmap: bool = True, **kwargs):
+        """
+        Load a container saved with ``to_npy()``, kwargs are passed to the constructor.
+
+        :param path: directory with the 'array.npy' and 'labels.npy' files
+        :param mmap: memory-map the arrays instead of reading them. Labels of object dtype are always read.
+        """
+        mmap_mode = 'r' if mmap else None
+
+        array = np.load(os.path.join(path, 'array.npy'), mmap_mode=mmap_mode)
+
+        labels_path = os.path.join(path, 'labels.npy')
+
+        if not os.path.isfile(labels_path):
+            labels = None
+        else:
+            try:
+                labels = np.load(labels_path, mmap_mode=mmap_mode)
+            except ValueError:
+                # object arrays cannot be memory-mapped
+                labels = np.load(labels_path, allow_pickle=True)
+
+        return cls(array, labels, **kwargs)
+
+    def to_npy(self, path: str):
+        """
+        Save the array and labels as .npy files, which can be memory-mapped with ``from_npy()``.
+
+        :param path: directory to save 'array.npy' and 'labels.npy' to, created if it doesn't exist
+        """
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        np.save(os.path.join(path, 'array.npy'), self.array)
+
+        if self.labels is not None:
+            np.save(os.path.join(path, 'labels.npy'), self.labels)
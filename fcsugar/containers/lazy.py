@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from ..core import Container, Node, hdftools
+from .containers import DataFrameContainer
+from collections import OrderedDict
+from typing import Optional, Union, List
+import numpy as np
+import pandas as pd
+
+
+# column version of data that comes from the source instead of a node
+_SOURCE = -1
+
+
+class LazyDataFrameContainer(Container):
+    """
+    Lazy execution of a DataFrame pipeline. ``>>`` only builds the pipeline, ``collect()`` plans and executes it.
+
+    The planner uses the ``output_column``, ``kernel`` and ``*_column`` params of the nodes to:
+
+        - skip nodes whose output is not used by a later node
+        - fuse consecutive nodes that have kernels, such as ``normalize >> log >> absval``, into a single
+          pass over the data that does not store the intermediate columns
+        - drop intermediate columns as soon as no later node reads them
+        - read only the needed columns from an hdf5 source, and push slicing kernels such as ``splice``
+          down to the read
+
+    Nodes without an ``output_column`` can read or write any column, all columns that exist before such a node
+    are kept for it.
+
+    Example:
+
+    .. code-block:: python
+
+        lazy = LazyDataFrameContainer('recording.h5')
+        lazy >> splice('_RAW_CURVE', 0, 2990) >> normalize('spliced') >> rfft('normalize') >> \\
+            absval('fft') >> log('absval') >> splice('log', 0, 1000) >> LDA('spliced', 'labels', 2)
+
+        print(lazy.explain())
+        container = lazy.collect()
+    """
+
+    def __init__(self, source: Union[str, pd.DataFrame, DataFrameContainer], key: str = 'DATAFRAME_CONTAINER',
+                 status_widget=None):
+        """
+        :param source: DataFrame, DataFrameContainer or path to an hdf5 file with a DataFrame in the columnar layout
+        :param key:    name of the hdf5 group if the source is a file
+        """
+        Container.__init__(self, status_widget=status_widget)
+
+        self.source = source
+        self.key = key
+
+    def plan(self, keep: Optional[List[str]] = None) -> list:
+        """
+        Plan the execution of the pipeline.
+
+        :param keep: columns to keep in the output besides the output of the last node. Source columns are always
+                     kept for in-memory sources, for hdf5 sources only the columns that are read are kept.
+        :return:     list of nodes to execute
+        """
+        return _Planner(self, keep).plan()
+
+    def explain(self, keep: Optional[List[str]] = None) -> str:
+        """Description of the planned execution, see ``plan()``"""
+        planner = _Planner(self, keep)
+        steps = planner.plan()
+
+        lines = [planner.describe_read()] + [step.describe() for step in steps]
+
+        return '\n'.join(lines)
+
+    def collect(self, keep: Optional[List[str]] = None, clear: bool = True, **kwargs) -> DataFrameContainer:
+        """
+        Plan and execute the pipeline, kwargs are passed to ``DataFrameContainer.execute_pipeline()``.
+
+        :param keep:  see ``plan()``
+        :param clear: clear the pipeline after execution
+        :return:      container with the output
+        """
+        planner = _Planner(self, keep)
+        steps = planner.plan()
+
+        container = planner.load()
+
+        container._log = OrderedDict(self._log)
+        container.history = self.history
+        container._functions = dict(self._functions)
+        container.subs = list(self.subs)
+        container.profilers = list(self.profilers)
+        container.pipeline = steps
+
+        if clear:
+            self.pipeline.clear()
+
+        result = container.execute_pipeline(clear=True, **kwargs)
+
+        self._log = OrderedDict(container._log)
+        self._functions = dict(container._functions)
+        self._profiles.update(container._profiles)
+        self.node_stats = container.node_stats
+
+        return result
+
+    def execute_pipeline(self, clear=True, trace_memory=False, cancel=None, profile=None, executor=None,
+                         raise_errors=False) -> DataFrameContainer:
+        """Same as ``collect()``"""
+        return self.collect(clear=clear, trace_memory=trace_memory, cancel=cancel, profile=profile,
+                            executor=executor, raise_errors=raise_errors)
+
+
+class _Step(Node):
+    """
+    Node of a planned execution. Runs a single node, or a chain of fused kernels over one input column.
+    """
+
+    def __init__(self, nodes: List[Node], positions: List[int], chain: list = None, materialize: List[str] = None,
+                 data_column: str = None):
+        Node.__init__(self)
+
+        self.nodes = nodes
+
+        # index of each node in the lazy container's pipeline, for the history
+        self.positions = positions
+
+        # (kernel, kwargs, output column) for fused nodes
+        self.chain = chain
+        self.materialize = materialize
+
+        if chain is None:
+            self.name = nodes[0].name
+            self.params = nodes[0].params
+            self.row_local = nodes[0].row_local
+        else:
+            self.name = ' >> '.join(n.name for n in nodes)
+            self.params = {'data_column': data_column}
+            self.row_local = all(n.row_local for n in nodes)
+
+    def process(self, container: DataFrameContainer, **params):
+        if self.chain is None:
+            return self.nodes[0].process(container, **params)
+
+        column = params['data_column']
+        funcs = []
+
+        for kernel, kwargs, output_column in self.chain:
+            funcs.append((kernel, kwargs))
+
+            if output_column in self.materialize:
+                container.map_blocks(_compose(funcs), column, output_column)
+                column = output_column
+                funcs = []
+
+        return container
+
+    def describe(self) -> str:
+        if self.chain is None:
+            return f"node   {self.name} {self.params}"
+
+        return f"fused  {self.name}: {self.params['data_column']} -> {self.materialize}"
+
+
+class _DropColumns(Node):
+    def __init__(self, columns: List[str]):
+        Node.__init__(self)
+        self.name = 'drop'
+        self.columns = columns
+        self.params = {}
+        self.nodes = []
+
+    def process(self, container: DataFrameContainer):
+        columns = [c for c in self.columns if c in container.dataframe.columns]
+
+        container.dataframe = container.dataframe.drop(columns=columns)
+        for c in columns:
+            container._blocks.pop(c, None)
+
+        return container
+
+    def describe(self) -> str:
+        return f"drop   {self.columns}"
+
+
+def _compose(funcs: list):
+    def composed(X: np.ndarray) -> np.ndarray:
+        for kernel, kwargs in funcs:
+            X = kernel(X, **kwargs)
+        return X
+
+    return composed
+
+
+def _identity(X: np.ndarray, **kwargs) -> np.ndarray:
+    # kernel of nodes that were pushed down to the read
+    return X
+
+
+class _Planner:
+    def __init__(self, lazy: LazyDataFrameContainer, keep: Optional[List[str]]):
+        self.lazy = lazy
+        self.nodes = list(lazy.pipeline)
+        self.keep = list(keep) if keep is not None else []
+
+        self.from_file = isinstance(lazy.source, str)
+
+        if self.from_file:
+            self.source_columns = hdftools.get_column_names(lazy.source, lazy.key)
+        elif isinstance(lazy.source, DataFrameContainer):
+            self.source_columns = list(lazy.source.dataframe.columns)
+        else:
+            self.source_columns = list(lazy.source.columns)
+
+        self.read_columns = []
+        self.slices = {}
+
+    def plan(self) -> list:
+        nodes = self.nodes
+
+        if len(nodes) == 0:
+            self.read_columns = list(self.source_columns)
+            return []
+
+        # (column, version) read by each node, the version is the index of the node that wrote it
+        reads = []
+        latest = {c: _SOURCE for c in self.source_columns}
+
+        for n in nodes:
+            if n.output_column is None:
+                # unknown node, it can read any column
+                reads.append(list(latest.items()))
+            else:
+                reads.append([(v, latest.get(v, _SOURCE)) for k, v in n.params.items() if k.endswith('_column')])
+
+            if n.output_column is not None:
+                latest[n.output_column] = len(reads) - 1
+
+        # versions of columns that must be in the output
+        kept = {(c, latest[c]) for c in self.keep if c in latest.keys()}
+        last = len(nodes) - 1
+        if nodes[last].output_column is not None:
+            kept.add((nodes[last].output_column, last))
+
+        # backwards pass to find the nodes whose output is used
+        live = set()
+        needed = set(kept)
+        for i in reversed(range(len(nodes))):
+            n = nodes[i]
+            if (i == last) or (n.output_column is None) or ((n.output_column, i) in needed):
+                live.add(i)
+                needed.update(reads[i])
+
+        # versions that are read by another live node, or kept, must be stored as columns
+        readers = {}
+        for i in sorted(live):
+            for r in reads[i]:
+                readers.setdefault(r, []).append(i)
+
+        # fuse consecutive live nodes with kernels where each node reads the output of the previous one
+        groups = []
+        for i in sorted(live):
+            n = nodes[i]
+            prev = groups[-1] if len(groups) > 0 else None
+
+            fusable = (n.kernel is not None) and (n.output_column is not None) and ('data_column' in n.params)
+
+            if fusable and (prev is not None) and prev['fusable'] and \
+                    (reads[i] == [(nodes[prev['ixs'][-1]].output_column, prev['ixs'][-1])]):
+                prev['ixs'].append(i)
+            else:
+                groups.append({'ixs': [i], 'fusable': fusable})
+
+        # source columns that are only read by the first node of a chain whose kernel slices the arrays
+        if self.from_file:
+            for g in groups:
+                first = nodes[g['ixs'][0]]
+                source = (first.params.get('data_column'), _SOURCE)
+
+                if g['fusable'] and hasattr(first.kernel, 'pushdown') and (readers.get(source) == [g['ixs'][0]]) \
+                        and (source not in kept):
+                    kwargs = _kernel_kwargs(first)
+                    self.slices[source[0]] = first.kernel.pushdown(**kwargs)
+
+        self.read_columns = [c for c in self.source_columns
+                             if ((c, _SOURCE) in readers.keys()) or ((c, _SOURCE) in kept) or not self.from_file]
+
+        steps = []
+        step_of = {}
+
+        # versions that are stored as columns in the container
+        stored = set()
+
+        for g in groups:
+            ixs = g['ixs']
+            group_nodes = [nodes[i] for i in ixs]
+
+            if not g['fusable']:
+                steps.append(_Step(group_nodes, ixs))
+                stored.update((nodes[i].output_column, i) for i in ixs)
+
+            else:
+                chain = []
+                materialize = []
+                for i in ixs:
+                    n = nodes[i]
+                    kernel = n.kernel
+
+                    if (i == ixs[0]) and (n.params['data_column'] in self.slices.keys()):
+                        kernel = _identity
+
+                    chain.append((kernel, _kernel_kwargs(n), n.output_column))
+
+                    version = (n.output_column, i)
+                    if (version in kept) or any(r not in ixs for r in readers.get(version, [])) or (i == ixs[-1]):
+                        materialize.append(n.output_column)
+                        stored.add(version)
+
+                steps.append(_Step(group_nodes, ixs, chain, materialize,
+                                   data_column=group_nodes[0].params['data_column']))
+
+            for i in ixs:
+                step_of[i] = len(steps) - 1
+
+        # drop columns after the last step that reads them, unless they were overwritten by then
+        drops = {}
+        for (column, producer), rs in readers.items():
+            if (column, producer) in kept:
+                continue
+
+            # source columns are kept, except for pushed down slices of an hdf5 source
+            if (producer == _SOURCE) and not (self.from_file and (column in self.slices.keys())):
+                continue
+
+            if (producer != _SOURCE) and ((column, producer) not in stored):
+                continue
+
+            s = max(step_of[i] for i in rs)
+
+            overwritten = any((nodes[i].output_column == column) and (i > producer) and (step_of[i] <= s)
+                              for i in live)
+
+            if not overwritten:
+                drops.setdefault(s, []).append(column)
+
+        planned = []
+        for s, step in enumerate(steps):
+            planned.append(step)
+            if s in drops.keys():
+                planned.append(_DropColumns(sorted(set(drops[s]))))
+
+        return planned
+
+    def describe_read(self) -> str:
+        if self.from_file:
+            return f"read   {self.lazy.source} columns={self.read_columns} slices={self.slices}"
+        return f"source in-memory DataFrame, columns={self.read_columns}"
+
+    def load(self) -> DataFrameContainer:
+        status_widget = self.lazy.status_widget if self.lazy.status_widget is not None else False
+
+        if self.from_file:
+            return DataFrameContainer.from_columns(
+                *hdftools.read_columns(self.lazy.source, self.lazy.key, columns=self.read_columns, slices=self.slices),
+                status_widget=status_widget
+            )
+
+        if isinstance(self.lazy.source, DataFrameContainer):
+            container = DataFrameContainer(self.lazy.source.dataframe, status_widget=status_widget)
+            container.set_state(self.lazy.source.get_state())
+            return container
+
+        return DataFrameContainer(self.lazy.source.copy(deep=False), status_widget=status_widget)
+
+
+def _kernel_kwargs(n: Node) -> dict:
+    return {k: v for k, v in n.params.items() if k != 'data_column'}
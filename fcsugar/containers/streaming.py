@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+from ..core import Container, hdftools, config, executors
+from ..core.bases import _execute_pipeline
+from ..core.history import STREAMED
+from .containers import DataFrameContainer
+from collections import OrderedDict
+from typing import Optional, Union
+from time import perf_counter
+import os
+
+
+class DataFrameStream(Container):
+    """
+    Out-of-core execution of a pipeline on a DataFrame stored in the columnar hdf5 layout,
+    see ``hdftools.append_columns()``.
+
+    The leading row-local nodes of the pipeline are executed on chunks of rows read from the file and the output
+    of each chunk is appended to an output file. The first node that is not row-local is a barrier, the output file
+    is then loaded into a DataFrameContainer and the rest of the pipeline is executed in memory.
+
+    Example:
+
+    .. code-block:: python
+
+        stream = DataFrameStream('recording.h5', output_path='processed.h5')
+        stream >> splice('_RAW_CURVE', 0, 2990) >> normalize('spliced') >> LDA('normalize', 'labels', 2)
+
+        # splice and normalize are streamed, LDA runs on the materialized output
+        container = stream.execute_pipeline()
+    """
+
+    def __init__(self, path: str, output_path: Optional[str] = None, key: str = 'DATAFRAME_CONTAINER',
+                 chunk_rows: Optional[int] = None, status_widget=None):
+        """
+        :param path:        hdf5 file with a DataFrame in the columnar layout
+        :param output_path: file to write the output of the streamed nodes to, must not exist
+        :param key:         name of the hdf5 group, used for both input and output files
+        :param chunk_rows:  number of rows per chunk, uses ``config.chunk_rows`` if not provided
+        """
+        Container.__init__(self, status_widget=status_widget)
+
+        self.path = path
+        self.output_path = output_path
+        self.key = key
+        self.chunk_rows = chunk_rows if chunk_rows is not None else config.chunk_rows
+
+    @property
+    def n_rows(self) -> int:
+        return hdftools.get_n_rows(self.path, self.key)
+
+    def execute_pipeline(self, clear=True, trace_memory=False, profile=None, executor=None, raise_errors=False) \
+            -> Union[DataFrameContainer, 'DataFrameStream']:
+        """
+        Execute the pipeline. If profiling is enabled ``node_stats`` holds a profile for each node and chunk,
+        see ``Container.execute_pipeline()`` which also describes ``executor`` and ``raise_errors``.
+
+        :return: DataFrameContainer with the output of the entire pipeline if the pipeline has a barrier node,
+                 else a DataFrameStream of the output file
+        """
+        pipeline = list(self.pipeline)
+
+        n_streamed = 0
+        while (n_streamed < len(pipeline)) and pipeline[n_streamed].row_local:
+            n_streamed += 1
+
+        streamed, rest = pipeline[:n_streamed], pipeline[n_streamed:]
+
+        if clear:
+            self.pipeline.clear()
+
+        if len(streamed) > 0:
+            with executors.use_executor(executor):
+                self._stream(streamed, trace_memory, profile)
+            path = self.output_path
+        else:
+            path = self.path
+
+        if len(rest) == 0:
+            output = DataFrameStream(path, key=self.key, chunk_rows=self.chunk_rows, status_widget=False)
+            output._log = OrderedDict(self._log)
+            output.history = self.history
+            output._functions = dict(self._functions)
+            output._profiles = dict(self._profiles)
+            output.node_stats = self.node_stats
+
+            for sub in self.subs:
+                sub(output)
+
+            return output
+
+        # barrier, load the output so far and execute the rest of the pipeline in memory
+        self._set_status(f"Materializing {path}")
+
+        container = DataFrameContainer.from_columns(
+            *hdftools.read_columns(path, self.key),
+            status_widget=self.status_widget if self.status_widget is not None else False
+        )
+
+        container._log = OrderedDict(self._log)
+        container.history = self.history
+        container._functions = dict(self._functions)
+        container.subs = list(self.subs)
+        container.profilers = list(self.profilers)
+        container._profiles = dict(self._profiles)
+        container.pipeline = rest
+
+        # the in-memory nodes continue the run of the streamed nodes
+        container._pipeline_offset = n_streamed
+
+        try:
+            return container.execute_pipeline(clear=clear, trace_memory=trace_memory, profile=profile,
+                                              executor=executor, raise_errors=raise_errors)
+        finally:
+            container._pipeline_offset = 0
+
+    def _stream(self, nodes: list, trace_memory: bool, profile: Optional[bool]):
+        if self.output_path is None:
+            raise ValueError("An output_path is required to stream row-local nodes")
+
+        if os.path.isfile(self.output_path):
+            raise FileExistsError(self.output_path)
+
+        self.history.start_run()
+        for ix, node in enumerate(nodes):
+            self.append_log(node)
+            self.history.append(node, ix, STREAMED)
+
+        n_rows = self.n_rows
+        self.node_stats = []
+        t_zero = perf_counter()
+
+        # chunks are appended to a temporary file that is renamed once all chunks are written, so a failed run
+        # never leaves a partial output that looks valid
+        tmp = f"{self.output_path}.tmp"
+
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+        try:
+            for start in range(0, n_rows, self.chunk_rows):
+                stop = min(start + self.chunk_rows, n_rows)
+                self._set_status(f"Processing rows {start} - {stop} of {n_rows}")
+
+                chunk = DataFrameContainer.from_columns(
+                    *hdftools.read_columns(self.path, self.key, start=start, stop=stop),
+                    status_widget=False
+                )
+                chunk.pipeline = list(nodes)
+                chunk.profilers = self.profilers
+
+                t_chunk = perf_counter() - t_zero
+                chunk = _execute_pipeline(chunk, clear=False, trace_memory=trace_memory, profile=profile)
+
+                # profile start times are relative to the chunk
+                for stats in chunk.node_stats:
+                    if 'start' in stats.keys():
+                        stats['start'] += t_chunk
+
+                self.node_stats += chunk.node_stats
+                self._profiles.update(chunk._profiles)
+
+                index, columns = chunk.to_columns()
+                hdftools.append_columns(tmp, columns, index, key=self.key)
+        except BaseException:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+            raise
+
+        if os.path.isfile(tmp):
+            os.replace(tmp, self.output_path)
+
+    def _set_status(self, msg: str):
+        if self.status_widget is not None:
+            self.status_widget.value = msg
@@ -1,2 +1,7 @@
-from .bases import Container, Node, node
+from .bases import Container, Node, node, PipelineCancelled
 from . import config
+from . import profiling
+from . import registry
+from .pipeline import Pipeline, BatchResult
+from .history import ExecutionLog
+from .trace_index import TraceIndex
@@ -19,15 +19,36 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from abc import ABCMeta, abstractmethod
 from functools import wraps
-from inspect import getfullargspec, getsource, signature
+from inspect import signature
 from typing import *
 from traceback import format_exc
-from ipywidgets import widgets
-from IPython.display import display
+from time import perf_counter
+import threading
+import os
+import tracemalloc
 from . import config
+from .cache import NodeCache, fingerprint, node_key
+from .profiling import NodeProfiler, to_chrome_trace, to_speedscope
+from . import checkpoints as ckpt
+from . import registry, executors
+from .history import ExecutionLog, EXECUTED, CACHED, RESUMED
 from collections import OrderedDict
-out = widgets.Output()
-from copy import deepcopy
+from copy import copy, deepcopy
+
+
+def _widgets():
+    # ipywidgets and IPython take about a second to import, they are only imported once a GUI is made
+    from ipywidgets import widgets
+    return widgets
+
+
+def _display(obj):
+    from IPython.display import display
+    display(obj)
+
+
+class PipelineCancelled(Exception):
+    """Raised when a pipeline execution is cancelled by a newer execution"""
 
 
 class Container:
@@ -35,67 +56,312 @@ class Container:
     Data Container
     """
 
-    def __init__(self, status_widget: Union[widgets.Textarea, bool] = None):
+    def __init__(self, status_widget: Union['widgets.Textarea', bool] = None):
+        """
+        :param status_widget: Textarea to show the status of pipeline executions in, False for no status widget.
+                              A new Textarea is displayed if None, unless ``config.headless`` is True.
+        """
         self._log = OrderedDict()
-        self.functions = {}
+
+        # node name: key of the node's function in the registry, see functions
+        self._functions = {}
         self.pipeline = []
         self.subs = []
+        self.node_stats = []
 
-        if status_widget is None:
+        # structured record of every execution, see ExecutionLog
+        self.history = ExecutionLog()
+
+        # position of the first node of the pipeline in the pipeline of the run, when this container executes
+        # the rest of another container's pipeline such as a DataFrameStream. The records then continue the run.
+        self._pipeline_offset = 0
+
+        # callbacks that are called with the profile of each node, see add_profiler()
+        self.profilers = []
+        self._profiles = {}
+
+        self.cache = NodeCache(config.cache_max_bytes) if config.cache_max_bytes else None
+        self._cache_root = None
+
+        # (directory, nodes) set by set_checkpoints()
+        self.checkpoints = None
+        self._checkpoint_root = None
+
+        # state of debounced re-execution from the GUI, see schedule_execution()
+        self._live = None
+
+        # info reported by the node that is being executed, see report_progress()
+        self._progress = {}
+
+        if (status_widget is None) and not config.headless:
+            widgets = _widgets()
             self.status_widget = widgets.Textarea(description='Status', value='',
                                                   layout=widgets.Layout(width='80%'))
-            display(self.status_widget)
+            _display(self.status_widget)
 
-        elif isinstance(status_widget, widgets.Textarea):
-            self.status_widget = status_widget
-
-        elif not status_widget:
+        elif (status_widget is None) or (status_widget is False):
             self.status_widget = None
 
-# TODO: Think about how to deal with log if the pipeline is executed consecutively multiple times
+        else:
+            self.status_widget = status_widget
+
     @property
     def log(self) -> List[dict]:
+        """
+        Params of each node that was executed, by node name and occurrence such as 'splice.0'.
+        A node that is executed again, such as when the pipeline is re-executed from the GUI, keeps its entry
+        with its latest params. See ``history`` for a record of every execution.
+        """
         d = OrderedDict()
+        n_occurrences = {}
         for node in self._log.keys():
 
-            n_occurances = [item.split('.')[0] for item in list(d)].count(node.name)
+            n = n_occurrences.get(node.name, 0)
+            n_occurrences[node.name] = n + 1
 
-            name = f"{node.name}.{n_occurances}"
+            name = f"{node.name}.{n}"
 
-            d[name] = self._log[node]
+            # entries of profiled nodes carry the profile, see execute_pipeline()
+            if node in self._profiles.keys():
+                d[name] = {**self._log[node], '_profile': self._profiles[node]}
+            else:
+                d[name] = self._log[node]
         return d
 
     def append_log(self, node):
-        self._log[node] = node.params
+        # composite nodes, such as fused nodes of lazy containers, log the nodes they are made of
+        if hasattr(node, 'nodes'):
+            for n in node.nodes:
+                self.append_log(n)
+            return
 
-        if node.name not in self.functions.keys():
-            self.functions[node.name] = getsource(node.process)
-
-    def __rshift__(self, node):
-        arg_names = getfullargspec(node.process).args
+        self._log[node] = node.params
 
-        if 'self' in arg_names:
-            arg_names.remove('self')
-        arg_names = arg_names[1:]
+        if node.name not in self._functions.keys():
+            self._functions[node.name] = registry.register(node.process)
 
-        params = {**dict(zip(arg_names, node.args)),  # positional args
-                  **node.kwargs
-                  }
+    @property
+    def functions(self) -> Dict[str, str]:
+        """
+        Source of the function of each node, by node name. Sources are read from the process-wide registry
+        of functions on access, see ``registry``.
+        """
+        return {name: registry.get_source(k) for name, k in self._functions.items()}
+
+    @functions.setter
+    def functions(self, functions: Dict[str, str]):
+        self._functions = {name: registry.register_source(src) for name, src in functions.items()}
+
+    def report_progress(self, message: str, **info):
+        """
+        Report the progress of a long running node. The message is shown in the status widget and ``info``
+        is added to the node's entry in ``node_stats``, and to its profile if the execution is profiled.
+
+        :param message: status message, such as 'kshape: 3/10 inits'
+        :param info:    values to add to the node's stats, the latest value of each key is kept
+        """
+        if self.status_widget is not None:
+            self.status_widget.value = f"\r{message}"
+
+        self._progress.update(info)
+
+    def add_profile(self, node, profile: dict):
+        """Attach a node's profile to its log entry"""
+        if hasattr(node, 'nodes'):
+            for n in node.nodes:
+                self.add_profile(n, profile)
+            return
+
+        self._profiles[node] = profile
+
+    def add_profiler(self, callback: Callable[[dict], None]):
+        """
+        Add a callback that is called with the profile of each node after it is executed.
+        Adding a profiler enables profiling for all executions, see ``execute_pipeline()``.
+
+        :param callback: function that takes the profile dict of a node
+        """
+        self.profilers.append(callback)
+
+    def get_profile_info(self) -> dict:
+        """
+        Info about the container's data for profiling. Containers with rows and columns return a dict with
+        'n_rows' and 'columns', the list of column names.
+        """
+        return {}
+
+    def get_column_nbytes(self, columns: List[str]) -> Dict[str, int]:
+        """Approximate size of the given columns in bytes, for profiling"""
+        return {}
+
+    def export_profile(self, path: str, format: str = 'chrome') -> dict:
+        """
+        Export the node profiles of the last profiled execution.
+
+        :param path:   json file to write to
+        :param format: 'chrome' for the Chrome trace event format, or 'speedscope'
+        :return:       the exported profile as a dict
+        """
+        if format == 'chrome':
+            return to_chrome_trace(self.node_stats, path)
+        elif format == 'speedscope':
+            return to_speedscope(self.node_stats, path)
+
+        raise ValueError(f"format must be one of 'chrome' or 'speedscope', got: {format}")
 
-        node.params = params
+    def __rshift__(self, node):
+        node.bind()
 
         self.pipeline.append(node)
-        node.subscribe(lambda: self.execute_pipeline(clear=False))
-        if config.show_gui:
+        node.subscribe(self.schedule_execution)
+        if config.show_gui and not config.headless:
             node.make_gui()
         return self
 
+    def get_state(self) -> dict:
+        """
+        Snapshot of the container's data, used for caching intermediate pipeline results.
+        Subclasses can override this with a cheaper copy, along with ``set_state()``.
+        """
+        return deepcopy({k: v for k, v in self.__dict__.items() if k not in _ENGINE_ATTRS})
+
+    def set_state(self, state: dict):
+        """Restore the container's data from a snapshot returned by ``get_state()``"""
+        self.__dict__.update(deepcopy(state))
+
+    def fingerprint(self) -> str:
+        """
+        Content hash of the container's data, used as the key of a pipeline's input for caching and checkpoints.
+        It must be the same for the same data in any process, subclasses whose state holds anything that isn't
+        data, such as object ids, override this.
+        """
+        return fingerprint(self.get_state())
+
+    def clear_cache(self):
+        """
+        Clear cached node results. Call this if the container's data was modified outside of the pipeline
+        after a pipeline was executed with ``clear=False``.
+        """
+        if self.cache is not None:
+            self.cache.clear()
+        self._cache_root = None
+
+    def set_checkpoints(self, directory: str, after: Optional[List[Union[int, str]]] = None):
+        """
+        Save checkpoints of the container during pipeline execution, so that a failed or interrupted
+        execution can be resumed with ``execute_pipeline(resume=True)``.
+
+        Checkpoint files are written with ``to_hdf5()``, which the container class must implement, and
+        named by the cache key of the node's output, see ``cache.node_key()``. A checkpoint is therefore
+        only used if the input data and the nodes up to it, including their params and function source,
+        are the same.
+
+        :param directory: directory to save the checkpoints to, created if it doesn't exist
+        :param after:     indices or names of the nodes after which to save a checkpoint, all nodes if None
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        self.checkpoints = (directory, after)
+        self._checkpoint_root = None
+
+    def _prepare_checkpoints(self, ix: int, keys: Optional[List[str]], resume: bool, params: List[dict]) \
+            -> Tuple[int, Dict[int, Tuple[str, str]]]:
+        directory, after = self.checkpoints
+
+        if keys is None:
+            # the key of the pipeline's input is kept after a failed execution so that it can be resumed
+            if (self._checkpoint_root is None) or not resume:
+                self._checkpoint_root = self.fingerprint()
+
+            parent_key = self._checkpoint_root
+            keys = []
+            for node, p in zip(self.pipeline, params):
+                parent_key = node_key(parent_key, node, p)
+                keys.append(parent_key)
+
+        if resume:
+            n, path = ckpt.find_checkpoint(directory, keys)
+
+            if n > ix:
+                if self.status_widget is not None:
+                    self.status_widget.value = f"Resuming from checkpoint: {path}"
+
+                self.set_state(ckpt.load_checkpoint(type(self), path).get_state())
+
+                for i in range(ix, n):
+                    self.append_log(self.pipeline[i])
+                    self.history.append(self.pipeline[i], self._pipeline_offset + i, RESUMED)
+
+                ix = n
+
+        checkpoints = {}
+        for i, node in enumerate(self.pipeline):
+            if (after is None) or (i in after) or (node.name in after):
+                checkpoints[i] = (ckpt.checkpoint_path(directory, keys[i]), keys[i])
+
+        return ix, checkpoints
+
+    def process_node(self, node, params: Optional[dict] = None):
+        """
+        Execute a row-local node with the executor of the execution, see ``execute_pipeline()``. Containers that
+        can be split into shards of rows override this to execute the node on the shards in parallel.
+
+        :param params: params to execute the node with, ``node.params`` if None
+        """
+        return node.process(self, **(node.params if params is None else params))
+
     def load_functions(self, globals: dict, locals: dict):
-        for func in self.functions.values():
-            exec(func, globals, locals)
+        registry.exec_functions(self._functions.values(), globals, locals)
+
+    def execute_pipeline(self, clear=True, trace_memory=False, cancel: threading.Event = None,
+                         profile: bool = None, resume: bool = False, executor: Optional[str] = None,
+                         raise_errors: bool = False):
+        """
+        Execute the pipeline. Wall time and, if ``trace_memory`` is True, the peak memory of each node
+        are stored in ``node_stats``.
+
+        If ``profile`` is True, or profilers were added with ``add_profiler()``, ``node_stats`` instead holds
+        the full profile of each node, see ``profiling.NodeProfiler``, and the profile is also added to the
+        node's entry in ``log``. ``profile`` defaults to ``config.profile``.
+
+        If ``clear`` is False the pipeline is kept so that it can be re-executed, for example from the GUI.
+        Node results are then cached and re-execution resumes from the first node whose params, function
+        source or input changed.
 
-    def execute_pipeline(self, clear=True):
-        container = _execute_pipeline(self, clear=clear)
+        If ``cancel`` is set during execution, ``PipelineCancelled`` is raised before the next node
+        and the subscribers are not called.
+
+        If checkpoints were set with ``set_checkpoints()`` and ``resume`` is True, execution restarts after
+        the last node of the longest prefix of the pipeline that has a valid checkpoint.
+
+        ``executor`` is used for the row-local nodes of this execution instead of ``config.executor``, without
+        changing it for other threads, see ``executors.use_executor()``.
+
+        Exceptions are shown in the status widget if the container has one, set ``raise_errors`` to also raise
+        them, such as when the execution is part of a batch.
+        """
+        if self._pipeline_offset == 0:
+            self.history.start_run()
+
+        # params can be changed from the GUI during the execution, each node is executed with the params that
+        # its cache and checkpoint keys were computed from
+        params = [dict(node.params) for node in self.pipeline]
+
+        if clear or self.cache is None:
+            self._cache_root = None
+            ix, keys = 0, None
+        else:
+            ix, keys = self._resume_from_cache(params)
+
+        checkpoints = None
+        if self.checkpoints is not None:
+            ix, checkpoints = self._prepare_checkpoints(ix, keys, resume, params)
+
+        with executors.use_executor(executor):
+            container = _execute_pipeline(self, ix, clear=clear, keys=keys, trace_memory=trace_memory,
+                                          cancel=cancel, profile=profile, checkpoints=checkpoints,
+                                          raise_errors=raise_errors, params=params)
 
         if isinstance(container, Container):
             for sub in container.subs:
@@ -107,9 +373,87 @@ class Container:
 
         return container
 
+    def schedule_execution(self):
+        """
+        Re-execute the pipeline in the background after parameter changes from the GUI.
+
+        Calls within ``config.gui_debounce`` seconds of each other are coalesced into one execution.
+        An execution that is still running when a newer one starts is cancelled before its next node,
+        so only the result of the latest parameters is passed to the subscribers.
+        """
+        if self._live is None:
+            self._live = _LiveExecution()
+
+        live = self._live
+
+        with live.state_lock:
+            if live.timer is not None:
+                live.timer.cancel()
+
+            live.generation += 1
+            generation = live.generation
+
+            live.timer = threading.Timer(config.gui_debounce, self._run_scheduled, args=(generation,))
+            live.timer.daemon = True
+            live.timer.start()
+
+    def _run_scheduled(self, generation: int):
+        live = self._live
+
+        with live.state_lock:
+            if generation != live.generation:
+                return
+
+            if live.cancel is not None:
+                live.cancel.set()
+
+            cancel = threading.Event()
+            live.cancel = cancel
+
+        # wait for a cancelled execution to stop at its next node
+        with live.run_lock:
+            if cancel.is_set():
+                return
+
+            try:
+                self.execute_pipeline(clear=False, cancel=cancel)
+            except PipelineCancelled:
+                pass
+
+    def _resume_from_cache(self, params: List[dict]) -> Tuple[int, List[str]]:
+        # the state of the container before the first execution is the input of the pipeline
+        if self._cache_root is None:
+            self._cache_root = (self.fingerprint(), self.get_state())
+
+        parent_key, root_state = self._cache_root
+
+        keys = []
+        for node, p in zip(self.pipeline, params):
+            parent_key = node_key(parent_key, node, p)
+            keys.append(parent_key)
+
+        ix = 0
+        while (ix < len(keys)) and (keys[ix] in self.cache):
+            self.append_log(self.pipeline[ix])
+            self.history.append(self.pipeline[ix], self._pipeline_offset + ix, CACHED)
+            ix += 1
+
+        if ix == 0:
+            self.set_state(root_state)
+        else:
+            self.set_state(self.cache.get(keys[ix - 1]))
+
+        return ix, keys
+
     def connect(self, func: callable):
         self.subs.append(func)
 
+    def __getstate__(self):
+        # threads and locks of the live execution cannot be copied or pickled
+        state = self.__dict__.copy()
+        state['_live'] = None
+        return state
+
     def deepcopy(self, memodict={}):
         sw = self.status_widget
 
@@ -122,33 +466,168 @@ class Container:
         return cls
 
 
-def _execute_pipeline(container: Container, ix=0, clear=True):
+_ENGINE_ATTRS = ('_log', 'history', '_functions', 'pipeline', 'subs', 'node_stats', 'status_widget', 'cache',
+                 '_cache_root', '_live', 'profilers', '_profiles', 'checkpoints', '_checkpoint_root', '_progress',
+                 '_pipeline_offset')
+
+
+class _LiveExecution:
+    def __init__(self):
+        self.state_lock = threading.Lock()
+        self.run_lock = threading.Lock()
+        self.timer = None
+        self.cancel = None
+        self.generation = 0
+
+
+def _execute_pipeline(container: Container, ix=0, clear=True, keys: List[str] = None,
+                      trace_memory: bool = False, cancel: threading.Event = None, profile: bool = None,
+                      checkpoints: Dict[int, Tuple[str, str]] = None, raise_errors: bool = False,
+                      params: List[dict] = None):
+    """
+    Execute the container's pipeline in a loop, starting from node ``ix``.
+    Raises ``PipelineCancelled`` before the next node once ``cancel`` is set.
+
+    ``checkpoints`` maps the index of a node to the (path, key) of the checkpoint to save after it.
+    ``params`` are the params of each node that ``keys`` were computed from, a copy of the params of each node is
+    taken when it is executed if None.
+
+    Wall time and, if ``trace_memory`` is True, the peak traced memory of each node are stored in
+    ``container.node_stats``, or the full profile of each node if profiling is enabled. If the container
+    has no status widget, or ``raise_errors`` is True, exceptions are raised after being shown in the widget.
+    """
     if not isinstance(container, Container):
         return container
-    
-    if ix == len(container.pipeline):
-        if clear:
-            container.pipeline.clear()
-        container.status_widget.value = f"\rYay! Pipeline computed without errors =D"
-        return container
 
-    node = container.pipeline[ix]
-    container.append_log(node)
+    pipeline = container.pipeline
+    status_widget = container.status_widget
+    container.node_stats = []
+
+    if profile is None:
+        profile = config.profile or (len(container.profilers) > 0)
 
-    container.status_widget.value = f"\rProcessing node: {node.name}"
+    profiler = NodeProfiler(perf_counter()) if profile else None
+
+    stop_tracing = False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        stop_tracing = True
+
+    result = container
+    last_status = 0.0
 
     try:
-        return _execute_pipeline(node.process(container, **node.params), ix + 1, clear=clear)
-    except Exception as e:
+        for ix in range(ix, len(pipeline)):
+            if (cancel is not None) and cancel.is_set():
+                raise PipelineCancelled
+
+            node = pipeline[ix]
+            container.append_log(node)
+            container.history.append(node, container._pipeline_offset + ix, EXECUTED)
+
+            t0 = perf_counter()
+
+            # writing to the widget for every node dominates when nodes are cheap
+            if (status_widget is not None) and (t0 - last_status > config.status_interval):
+                status_widget.value = f"\rProcessing node: {node.name}"
+                last_status = t0
+
+            if profiler is not None:
+                profiler.start(node, result)
+
+            if trace_memory:
+                tracemalloc.reset_peak()
+                mem0 = tracemalloc.get_traced_memory()[0]
+
+            node_input = result
+            if isinstance(node_input, Container):
+                node_input._progress = {}
+
+            node_params = params[ix] if params is not None else dict(node.params)
+
+            if node.row_local and (executors.get_executor() != 'serial'):
+                result = result.process_node(node, node_params)
+            else:
+                result = node.process(result, **node_params)
+
+            stats = {'node': node.name, 'wall_time': perf_counter() - t0}
+
+            if isinstance(node_input, Container):
+                stats.update(node_input._progress)
+            if trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                stats['peak_memory'] = peak - mem0
+                if profiler is not None:
+                    stats['memory_delta'] = current - mem0
+
+            if profiler is not None:
+                stats = profiler.stop(node, result, stats)
+                container.add_profile(node, stats)
+                for callback in container.profilers:
+                    callback(stats)
+
+            container.node_stats.append(stats)
+
+            # a node can return something that is not a container, such as a numpy array
+            if not isinstance(result, Container):
+                return result
+
+            if (keys is not None) and (result is container):
+                container.cache.put(keys[ix], container.get_state())
+
+            if (checkpoints is not None) and (ix in checkpoints.keys()) and (result is container):
+                if status_widget is not None:
+                    status_widget.value = f"\rSaving checkpoint after node: {node.name}"
+                path, key = checkpoints[ix]
+                ckpt.save_checkpoint(container, path, ix, key)
+
+    except PipelineCancelled:
+        if status_widget is not None:
+            status_widget.value = "Cancelled"
+        raise
+
+    except Exception:
         if clear:
-            container.pipeline.clear()
-        container.status_widget.value = str(e)
-        container.status_widget.value = format_exc()
+            pipeline.clear()
+
+        if status_widget is None:
+            raise
+
+        status_widget.value = format_exc()
+
+        if raise_errors:
+            raise
 
         return container
 
+    finally:
+        if stop_tracing:
+            tracemalloc.stop()
+
+    if clear:
+        pipeline.clear()
+
+    # the execution was successful, it does not have to be resumed
+    container._checkpoint_root = None
+
+    if status_widget is not None:
+        status_widget.value = f"\rYay! Pipeline computed without errors =D"
+
+    return result
+
 
 class Node(metaclass=ABCMeta):
+    # True if each row of the output only depends on the same row of the input,
+    # such nodes can be executed on chunks of rows. Other nodes are barriers that need all the rows.
+    row_local = False
+
+    # name of the column the node writes its output to, None if unknown
+    output_column = None
+
+    # function that computes the node's output from a 2D block of its 'data_column' input,
+    # called as kernel(block, **other_params). Used to fuse consecutive nodes by lazy containers.
+    kernel = None
+
     def __init__(self, *args, **kwargs):
         self.name = self.__class__.__name__
         self.args = args
@@ -163,12 +642,32 @@ class Node(metaclass=ABCMeta):
     def process(self, t, *args, **kwargs) -> Container:
         pass
 
-    def make_gui(self):
+    def bind(self):
+        """Resolve the params from the args the node was created with"""
+        # resolve the signature once, the first parameter is the container
         self.signature = signature(self.process)
+        arg_names = list(self.signature.parameters)[1:]
+
+        self.params = {**dict(zip(arg_names, self.args)),  # positional args
+                       **self.kwargs
+                       }
+
+    def copy(self):
+        """Copy of the node with its own params and without subscribers, to add it to another container"""
+        n = copy(self)
+        n.params = dict(self.params) if self.params is not None else None
+        n.subs = []
+        return n
+
+    def make_gui(self):
+        if self.signature is None:
+            self.signature = signature(self.process)
+
+        widgets = _widgets()
 
         label = f"<b>{self.name}</b>"
 
-        display(widgets.HTML(value=label))
+        _display(widgets.HTML(value=label))
 
         for i, arg_name in enumerate(self.signature.parameters):
             if i == 0:
@@ -187,9 +686,9 @@ class Node(metaclass=ABCMeta):
             else:
                 return
 
-            w.observe(self.set_param)
+            w.observe(self.set_param, names='value')
 
-            display(w)
+            _display(w)
 
     def update_gui(self):
         pass
@@ -205,7 +704,18 @@ class Node(metaclass=ABCMeta):
         self.subs.append(func)
 
 
-def node(func):
+def node(func: callable = None, *, row_local: bool = False, output_column: str = None, kernel: callable = None):
+    """
+    Decorator to use a function as a processing node. Can be used as ``@node`` or with options.
+
+    :param func:          function, the first argument must be the container
+    :param row_local:     the function only operates on each row independently, see ``Node.row_local``
+    :param output_column: column that the function writes its output to
+    :param kernel:        block function equivalent to the node, see ``Node.kernel``
+    """
+    if func is None:
+        return lambda f: node(f, row_local=row_local, output_column=output_column, kernel=kernel)
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         class _Node(Node):
@@ -216,9 +726,27 @@ def node(func):
             def process(container, *args, **kwargs):
                 pass
 
+            def __reduce__(self):
+                # the class is local, pickle the node as a call of the decorated function
+                return _rebuild_node, (wrapper, self.args, self.kwargs, self.params)
+
+        _Node.row_local = row_local
+        _Node.output_column = output_column
+
         n = _Node(*args, **kwargs)
         n.process = func
+        n.kernel = kernel
 
         return n
 
+    wrapper.row_local = row_local
+
     return wrapper
+
+
+def _rebuild_node(wrapper: callable, args: tuple, kwargs: dict, params: Optional[dict]) -> Node:
+    n = wrapper(*args, **kwargs)
+    if params is not None:
+        n.bind()
+        n.params = params
+    return n
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import OrderedDict
+from typing import *
+from . import config
+from . import registry
+from .trace_index import TraceIndex
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(obj: Any) -> str:
+    """
+    Content hash of an object. Works with numpy arrays (including object arrays of arrays),
+    pandas DataFrames & Series, dicts, lists, tuples and anything with a stable ``repr``.
+
+    :param obj: object to hash
+    :return:    hex digest
+    """
+    h = hashlib.blake2b(digest_size=16)
+    _update_hash(h, obj)
+    return h.hexdigest()
+
+
+def _update_hash(h, obj: Any):
+    if isinstance(obj, np.ndarray):
+        h.update(f"ndarray{obj.dtype.str}{obj.shape}".encode())
+        if obj.dtype == np.dtype('O'):
+            for item in obj.ravel():
+                _update_hash(h, item)
+        else:
+            h.update(np.ascontiguousarray(obj).view(np.uint8).data)
+
+    elif isinstance(obj, pd.DataFrame):
+        h.update(b'DataFrame')
+        _update_hash(h, obj.index)
+        for c in obj.columns:
+            _update_hash(h, c)
+            _update_hash(h, obj[c].values)
+
+    elif isinstance(obj, pd.Series):
+        h.update(b'Series')
+        _update_hash(h, obj.index)
+        _update_hash(h, obj.values)
+
+    elif isinstance(obj, pd.Index):
+        h.update(b'Index')
+        h.update(pd.util.hash_pandas_object(obj).values.data)
+
+    elif isinstance(obj, dict):
+        h.update(b'dict')
+        for k in sorted(obj.keys(), key=repr):
+            _update_hash(h, k)
+            _update_hash(h, obj[k])
+
+    elif isinstance(obj, (list, tuple)):
+        h.update(type(obj).__name__.encode())
+        for item in obj:
+            _update_hash(h, item)
+
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r}".encode())
+
+
+def node_key(parent_key: str, node, params: Optional[dict] = None) -> str:
+    """
+    Cache key of a node's output. Chaining on the key of the node's input makes it content-addressed:
+    the key changes if the input data, the node's name, function code or params change.
+
+    :param parent_key: key of the node's input, i.e. the previous node's key or the fingerprint of the input data
+    :param node:       the Node
+    :param params:     params the node is executed with, ``node.params`` if None
+    """
+    if params is None:
+        params = node.params
+
+    return fingerprint((parent_key, node.name, registry.code_hash(node.process), params))
+
+
+def sizeof(obj: Any) -> int:
+    """
+    Approximate size of the data held by an object, in bytes. Arrays that are views of the same array, such as
+    the rows of a block, are counted once as the size of that array.
+    """
+    buffers = {}
+    other = _collect_buffers(obj, buffers)
+    return other + sum(nbytes for nbytes, _ in buffers.values())
+
+
+def _collect_buffers(obj: Any, buffers: Dict[int, Tuple[int, Any]]) -> int:
+    """
+    Add the arrays that own the memory of the arrays held by an object to ``buffers``, as id: (nbytes, array).
+
+    :return: size of the data that is not held by arrays
+    """
+    if isinstance(obj, np.ndarray):
+        base = _base_array(obj)
+
+        # backed by a file, not held in memory
+        if isinstance(base, np.memmap):
+            return 0
+
+        buffers[id(base)] = (base.nbytes, base)
+
+        other = 0
+        if obj.dtype == np.dtype('O'):
+            for item in obj.ravel():
+                other += _collect_buffers(item, buffers)
+        return other
+
+    elif isinstance(obj, pd.DataFrame):
+        return obj.index.nbytes + sum(_collect_buffers(obj[c].values, buffers) for c in obj.columns)
+
+    elif isinstance(obj, pd.Series):
+        return obj.index.nbytes + _collect_buffers(obj.values, buffers)
+
+    elif isinstance(obj, pd.api.extensions.ExtensionArray):
+        return obj.nbytes
+
+    elif isinstance(obj, dict):
+        return sum(_collect_buffers(v, buffers) for v in obj.values())
+
+    elif isinstance(obj, (list, tuple)):
+        return sum(_collect_buffers(v, buffers) for v in obj)
+
+    elif isinstance(obj, TraceIndex):
+        # the traces, projection and sketch of an index are arrays
+        return _collect_buffers(vars(obj), buffers)
+
+    return 64
+
+
+def _base_array(a: np.ndarray) -> np.ndarray:
+    """The array that owns the memory of a view"""
+    while isinstance(a.base, np.ndarray):
+        a = a.base
+    return a
+
+
+class NodeCache:
+    """
+    LRU cache of intermediate pipeline results, evicted by size in bytes.
+
+    Results are usually shallow copies of the container's state that share most of their columns with the
+    results of the previous nodes. Arrays are counted once across all results, and their size is only freed
+    when the last result that holds them is evicted.
+    """
+
+    def __init__(self, max_bytes: int):
+        """
+        :param max_bytes: maximum total size of the cached results
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+
+        # key: (result, ids of its arrays, size of its data that is not held by arrays)
+        self._entries = OrderedDict()
+
+        # id: [nbytes, array, number of results that hold it], the array is kept so that its id is not reused
+        self._buffers = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        """Get a cached result, marks it as most recently used. Returns None if not cached."""
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key][0]
+
+    def put(self, key: str, result: Any):
+        """Cache a result, evicting least recently used results until it fits"""
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return
+
+        buffers = {}
+        other = _collect_buffers(result, buffers)
+
+        if other + sum(nbytes for nbytes, _ in buffers.values()) > self.max_bytes:
+            return
+
+        # only the arrays that are not held by other results add to the size, evicting can free some of them
+        while True:
+            size = other + sum(nbytes for i, (nbytes, _) in buffers.items() if i not in self._buffers)
+
+            if self.nbytes + size <= self.max_bytes:
+                break
+
+            self._evict()
+
+        for i, (nbytes, array) in buffers.items():
+            if i in self._buffers:
+                self._buffers[i][2] += 1
+            else:
+                self._buffers[i] = [nbytes, array, 1]
+
+        self._entries[key] = (result, list(buffers.keys()), other)
+        self.nbytes += size
+
+    def _evict(self):
+        _, (_, ids, other) = self._entries.popitem(last=False)
+        self.nbytes -= other
+
+        for i in ids:
+            entry = self._buffers[i]
+            entry[2] -= 1
+
+            if entry[2] == 0:
+                self.nbytes -= entry[0]
+                del self._buffers[i]
+
+    def clear(self):
+        self._entries.clear()
+        self._buffers.clear()
+        self.nbytes = 0
+
+
+class ModelCache:
+    """
+    LRU cache of the models fitted by nodes such as ``kshape`` and ``LDA``, shared by all containers in the
+    process. Evicted by the number of models, see ``config.model_cache_size``.
+
+    Each model is stored under two keys, the fingerprint of the node name, fit params and the data it was fit on,
+    and the node name & fit params only. The second key holds the latest model fit with those params, for
+    transforming new data without refitting.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(name: str, fit_params: dict, data: Any = None) -> str:
+        """
+        :param name:       name of the node
+        :param fit_params: params of the node that affect the fit
+        :param data:       data the model is fit on, or None for the key of the latest model
+        """
+        if data is None:
+            return fingerprint((name, fit_params))
+
+        return fingerprint((name, fit_params, data))
+
+    def get(self, key: str) -> Any:
+        """Get a fitted model, marks it as most recently used. Returns None if not cached."""
+        if key not in self._entries:
+            return None
+
+        self._entries.move_to_end(key)
+        return self._entries[key]
+
+    def put(self, model: Any, *keys: str):
+        """Cache a fitted model under the given keys, evicting least recently used models"""
+        for key in keys:
+            self._entries[key] = model
+            self._entries.move_to_end(key)
+
+        while len(self._entries) > config.model_cache_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+models = ModelCache()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from . import hdftools, registry
+from typing import *
+import json
+import os
+
+
+# group of a checkpoint file with the info of the checkpoint, see load_checkpoint_info()
+_INFO = 'CHECKPOINT'
+
+
+def checkpoint_path(directory: str, key: str) -> str:
+    """Path of the checkpoint file of a node, named by the node's cache key, see ``cache.node_key()``"""
+    return os.path.join(directory, f"{key}.h5")
+
+
+def save_checkpoint(container, path: str, ix: int, key: str):
+    """
+    Save a container after node ``ix`` of its pipeline. The container is written with its ``to_hdf5()`` method,
+    the log and the keys of the functions are stored as meta data, with the sources in the functions table of
+    the file, see ``registry.save_table()``.
+
+    The file is written under a temporary name and then renamed, so an interrupted write never leaves
+    a checkpoint that looks valid.
+
+    :param container: container to save, must implement ``to_hdf5()``
+    :param path:      checkpoint file
+    :param ix:        index of the node in the pipeline
+    :param key:       cache key of the node's output
+    """
+    tmp = f"{path}.tmp"
+
+    if os.path.isfile(tmp):
+        os.remove(tmp)
+
+    container.to_hdf5(tmp)
+
+    # params can be of any type, they are stored as json with a str fallback
+    info = {
+        'key': key,
+        'ix': ix,
+        'node': container.pipeline[ix].name,
+        'container': type(container).__name__,
+        'log': json.dumps(container.log, default=str),
+        'functions': json.dumps(container._functions)
+    }
+
+    hdftools.update_dict(info, tmp, _INFO)
+    registry.save_table(tmp, container._functions.values())
+
+    os.replace(tmp, path)
+
+
+def load_checkpoint(cls, path: str):
+    """
+    Load a container saved with ``save_checkpoint()``.
+
+    :param cls:  container class, must implement ``from_hdf5()``
+    :param path: checkpoint file
+    """
+    return cls.from_hdf5(path, status_widget=False)
+
+
+def load_checkpoint_info(path: str) -> dict:
+    """
+    Info of a checkpoint: the cache 'key' and index 'ix' of the node, the 'node' name, the 'container' class,
+    and the 'log' and 'functions' of the container when it was saved.
+    """
+    with hdftools.load_dict(path, _INFO, lazy=True) as d:
+        info = {k: d[k] for k in d.keys()}
+
+    for k, v in info.items():
+        if isinstance(v, bytes):
+            info[k] = v.decode()
+
+    info['log'] = json.loads(info['log'])
+    registry.load_table(path)
+    info['functions'] = {name: registry.get_source(k) for name, k in json.loads(info['functions']).items()}
+
+    return info
+
+
+def find_checkpoint(directory: str, keys: List[str]) -> Tuple[int, Optional[str]]:
+    """
+    Find the checkpoint of the longest prefix of a pipeline.
+
+    :param directory: checkpoint directory
+    :param keys:      cache keys of the nodes of the pipeline, see ``cache.node_key()``
+    :return:          (number of nodes in the prefix, checkpoint file). (0, None) if there is no checkpoint.
+    """
+    for ix in reversed(range(len(keys))):
+        path = checkpoint_path(directory, keys[ix])
+        if os.path.isfile(path):
+            return ix + 1, path
+
+    return 0, None
@@ -19,7 +19,36 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 import os
 
-show_gui = True
+# no widgets are made and ipywidgets, IPython & bokeh are never imported, for scripts and worker processes.
+# Can also be set with the environment variable FCSUGAR_HEADLESS=1
+headless = os.environ.get('FCSUGAR_HEADLESS', '0').lower() in ('1', 'true', 'yes')
+
+show_gui = not headless
+
+# max size in bytes of the node results cached when a pipeline is executed with clear=False, 0 disables caching
+cache_max_bytes = 2 * 1024 ** 3
+
+# number of fitted models kept by nodes such as kshape and LDA to skip refitting, see cache.ModelCache.
+# 0 disables the cache, nodes can then not be executed with fit=False
+model_cache_size = 16
+
+# seconds to wait for more parameter changes from the GUI before re-executing a pipeline
+gui_debounce = 0.3
+
+# minimum interval in seconds between updates of a container's status widget during pipeline execution
+status_interval = 0.1
+
+# profile every node of pipeline executions by default, see Container.execute_pipeline()
+profile = False
+
+# number of rows processed at once by chunked operations on DataFrameContainers
+chunk_rows = 10000
+
+# executor for row-local nodes and other sharded work, one of 'serial', 'thread' or 'process'
+executor = 'serial'
+
+# number of workers used by the thread and process executors
+n_workers = os.cpu_count() or 1
 
 # 'notebook' or 'external'
 bokeh_output = 'notebook'
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from . import config
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import get_all_start_methods, get_context, resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import *
+from warnings import warn
+import numpy as np
+import threading
+
+
+EXECUTORS = ['serial', 'thread', 'process']
+
+# function executed by the workers of a process pool, set in each worker by the pool initializer. The arguments of
+# the initializer are inherited by forking so that the function does not have to be pickled, and the module global
+# of the parent process is never set, so concurrent maps from different threads don't share it.
+_task = None
+
+# executor of the current thread set with use_executor(), overrides config.executor
+_local = threading.local()
+
+
+def get_executor() -> str:
+    """
+    The executor set with ``use_executor()`` in the current thread, or else in ``config.executor``.
+    'process' falls back to 'thread' where fork is not available.
+    """
+    executor = getattr(_local, 'executor', None) or config.executor
+
+    if executor not in EXECUTORS:
+        raise ValueError(f"executor must be one of {EXECUTORS}, got: {executor}")
+
+    if (executor == 'process') and ('fork' not in get_all_start_methods()):
+        warn("The process executor requires the 'fork' start method, using the thread executor")
+        return 'thread'
+
+    return executor
+
+
+@contextmanager
+def use_executor(executor: Optional[str]):
+    """
+    Use an executor in the current thread only, without changing ``config.executor`` for other threads.
+
+    :param executor: one of 'serial', 'thread' or 'process', None keeps the current executor
+    """
+    previous = getattr(_local, 'executor', None)
+
+    if executor is not None:
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}, got: {executor}")
+        _local.executor = executor
+
+    try:
+        yield
+    finally:
+        _local.executor = previous
+
+
+def get_n_workers() -> int:
+    """Number of workers set in ``config.n_workers``"""
+    return max(1, int(config.n_workers))
+
+
+def shard_bounds(n_items: int, n_shards: int) -> List[Tuple[int, int]]:
+    """Split ``range(n_items)`` into at most ``n_shards`` contiguous (start, stop) ranges of similar size"""
+    n_shards = max(1, min(n_shards, n_items))
+    edges = np.linspace(0, n_items, n_shards + 1).astype(int)
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
+
+
+def map_shards(func: Callable[[int, int], Any], n_items: int, executor: Optional[str] = None) -> list:
+    """
+    Call ``func(start, stop)`` on contiguous shards of ``range(n_items)`` using the configured executor.
+
+    With the process executor the workers are forked, so ``func`` and any data it refers to are inherited by
+    the workers instead of being pickled. Large results should be returned as ``SharedArray``.
+
+    :param func:     function that processes the items from start to stop
+    :param n_items:  number of items, such as the number of rows of a DataFrame
+    :param executor: one of 'serial', 'thread' or 'process', uses ``get_executor()`` if not provided
+    :return:         list of the results for each shard, in order
+    """
+    if executor is None:
+        executor = get_executor()
+
+    n_workers = get_n_workers()
+
+    if (executor == 'serial') or (n_workers == 1):
+        return [func(0, n_items)]
+
+    starts, stops = zip(*shard_bounds(n_items, n_workers))
+
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            return list(pool.map(func, starts, stops))
+
+    with ProcessPoolExecutor(max_workers=len(starts), mp_context=get_context('fork'),
+                             initializer=_set_task, initargs=(func,)) as pool:
+        return list(pool.map(_call_task, starts, stops))
+
+
+def _set_task(func: Callable):
+    global _task
+    _task = func
+
+
+def _call_task(start: int, stop: int):
+    return _task(start, stop)
+
+
+def map_items(func: Callable[[int], Any], n_items: int, executor: Optional[str] = None) -> list:
+    """
+    Call ``func(i)`` for each item of ``range(n_items)`` using the configured executor. Unlike ``map_shards()``
+    the items are handed out to the workers one at a time, for items that take very different amounts of time
+    such as the files of a batch. See ``map_shards()`` for how ``func`` is passed to worker processes.
+
+    :param func:     function that processes item i
+    :param n_items:  number of items
+    :param executor: one of 'serial', 'thread' or 'process', uses ``get_executor()`` if not provided
+    :return:         list of the results for each item, in order
+    """
+    if executor is None:
+        executor = get_executor()
+
+    n_workers = min(get_n_workers(), max(1, n_items))
+
+    if (executor == 'serial') or (n_workers == 1):
+        return [func(i) for i in range(n_items)]
+
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=n_workers) as pool:
+            return list(pool.map(func, range(n_items)))
+
+    with ProcessPoolExecutor(max_workers=n_workers, mp_context=get_context('fork'),
+                             initializer=_set_task, initargs=(func,)) as pool:
+        return list(pool.map(_call_item, range(n_items)))
+
+
+def _call_item(i: int):
+    return _task(i)
+
+
+class SharedArray:
+    """
+    Picklable reference to a numpy array in shared memory, used to return large arrays from worker processes.
+    """
+
+    def __init__(self, name: str, shape: tuple, dtype: np.dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    @classmethod
+    def create(cls, array: np.ndarray):
+        """Copy an array into a new block of shared memory"""
+        shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+
+        view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+        view[:] = array
+        del view
+
+        shm.close()
+
+        # the reader owns the shared memory, it must not be cleaned up when the worker exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+
+        return cls(shm.name, array.shape, array.dtype)
+
+    def read(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Copy the array out of shared memory and free the shared memory, can only be called once.
+
+        :param out: copy into this array instead of a new array
+        """
+        shm = SharedMemory(name=self.name)
+
+        try:
+            view = np.ndarray(self.shape, dtype=self.dtype, buffer=shm.buf)
+
+            if out is None:
+                out = view.copy()
+            else:
+                out[:] = view
+
+            del view
+
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return out
@@ -2,6 +2,7 @@
 
 
 from typing import *
+from collections.abc import Mapping
 import h5py
 import json
 import os
@@ -12,15 +13,15 @@ from warnings import warn
 
 
 def save_dataframe(path: str, dataframe: pd.DataFrame, metadata: Optional[dict] = None,
-                   metadata_method: str = 'json', raise_meta_fail: bool = True):
+                   metadata_method: str = 'json', raise_meta_fail: bool = True, bulk: bool = False):
     """
     Save DataFrame to hdf5 file along with a meta data dict.
 
     Meta data dict can either be serialized with json and stored as a str in the hdf5 file, or recursively saved
     into hdf5 groups if the dict contains types that hdf5 can deal with. Experiment with both methods and see what works best
 
-    Currently the hdf5 method can work with these types: [str, bytes, int, float, np.int, np.int8, np.int16,
-    np.int32, np.int64, np.float, np.float16, np.float32, np.float64, np.float128, np.complex].
+    Currently the hdf5 method can work with these types: [str, bytes, int, float, complex, bool, numpy arrays
+    and numpy scalars].
 
     If it encounters an object that is not of these types it will store whatever that object's __str__() method
     returns if on_meta_fail is False, else it will raise an exception.
@@ -40,6 +41,9 @@ def save_dataframe(path: str, dataframe: pd.DataFrame, metadata: Optional[dict]
     :param raise_meta_fail: raise an exception if recursive metadata saving encounters an unsupported object
                             If false, it will save the unsupported object's __str__() return value
     :type raise_meta_fail:  bool
+
+    :param bulk:            pack scalar leaves of recursive metadata into compound datasets, see ``save_dict()``
+    :type bulk:             bool
     """
 
     if os.path.isfile(path):
@@ -54,59 +58,91 @@ def save_dataframe(path: str, dataframe: pd.DataFrame, metadata: Optional[dict]
         mg.attrs['method'] = metadata_method
 
         if metadata_method == 'json':
-            bad_keys = []
-            for k in metadata.keys():
-                try:
-                    mg.create_dataset(k, data=json.dumps(metadata[k]))
-                except TypeError as e:
-                    bad_keys.append(str(e))
+            # the entire dict is stored as one json str, so that it is read at once
+            try:
+                mg.create_dataset(_JSON_METADATA, data=json.dumps(metadata))
+            except TypeError:
+                bad_keys = []
+                for k in metadata.keys():
+                    try:
+                        json.dumps(metadata[k])
+                    except TypeError as e:
+                        bad_keys.append(str(e))
+
+                f.close()
+                os.remove(path)
 
-            if len(bad_keys) > 0:
                 bad_keys = '\n'.join(bad_keys)
                 raise TypeError(f"The following meta data keys are not JSON serializable\n{bad_keys}")
 
         elif metadata_method == 'recursive':
-            _dicts_to_group(h5file=f, path='META/', d=metadata, raise_meta_fail=raise_meta_fail)
+            _dicts_to_group(h5file=f, path='META/', d=metadata, raise_meta_fail=raise_meta_fail, bulk=bulk)
 
     f.close()
 
     dataframe.to_hdf(path, key='DATAFRAME', mode='r+')
 
 
-def load_dataframe(filepath: str) -> Tuple[pd.DataFrame, Union[dict, None]]:
+# name of the dataset that stores json meta data
+_JSON_METADATA = '__json__'
+
+
+def load_dataframe(filepath: str, lazy_metadata: bool = False) -> Tuple[pd.DataFrame, Union[dict, None]]:
     """
     Load a DataFrame along with meta data that were saved using ``HdfTools.save_dataframe``
 
-    :param filepath: file path to the hdf5 file
-    :type filepath:  str
+    :param filepath:      file path to the hdf5 file
+    :type filepath:       str
+
+    :param lazy_metadata: return recursive meta data as a ``LazyDict``, see ``load_dict()``
+    :type lazy_metadata:  bool
 
     :return: tuple, (DataFrame, meta data dict if present else None)
     :rtype: Tuple[pd.DataFrame, Union[dict, None]]
     """
 
     with h5py.File(filepath, 'r') as f:
-        if 'META' in f.keys():
+        method = f['META'].attrs['method'] if 'META' in f.keys() else None
 
-            if f['META'].attrs['method'] == 'json':
-                ks = f['META'].keys()
+        if method == 'json':
+            ks = f['META'].keys()
+
+            if _JSON_METADATA in ks:
+                metadata = json.loads(f['META'][_JSON_METADATA][()])
+
+            # files saved before the meta data was stored as a single json str
+            else:
                 metadata = dict.fromkeys(ks)
                 for k in ks:
                     metadata[k] = json.loads(f['META'][k][()])
 
-            elif f['META'].attrs['method'] == 'recursive':
-                metadata = _dicts_from_group(f, 'META/')
+        elif (method == 'recursive') and not lazy_metadata:
+            metadata = _dicts_from_group(f, 'META/')
 
         else:
             metadata = None
+
+    if (method == 'recursive') and lazy_metadata:
+        metadata = load_dict(filepath, 'META', lazy=True)
+
     df = pd.read_hdf(filepath, key='DATAFRAME', mode='r')
 
     return (df, metadata)
 
 
-def save_dict(d: dict, filename: str, group: str, raise_type_fail=True):
+def save_dict(d: dict, filename: str, group: str, raise_type_fail=True, bulk: bool = False):
     """
     Recursively save a dict to an hdf5 group.
 
+    With ``bulk=True`` scalar leaves are packed into compound datasets instead of creating one dataset per leaf,
+    which is much faster for large nested dicts:
+
+        - scalar leaves of a dict with the same dtype are packed into one dataset of (key, value) records
+        - dicts whose values are dicts with the same keys and scalar leaves, such as per-trace parameter dicts,
+          are packed into one compound dataset with a record per dict and a field per key
+
+    Packed dicts are unpacked by ``load_dict()``.
+
     :param d:        dict to save
     :type d:         dict
 
@@ -118,16 +154,34 @@ def save_dict(d: dict, filename: str, group: str, raise_type_fail=True):
 
     :param raise_type_fail: whether to raise if saving a piece of data fails
     :type raise_type_fail:  bool
+
+    :param bulk:     pack scalar leaves into compound datasets
+    :type bulk:      bool
     """
 
     if os.path.isfile(filename):
         raise FileExistsError
 
     with h5py.File(filename, 'w') as h5file:
-        _dicts_to_group(h5file, f'{group}/', d, raise_meta_fail=raise_type_fail)
+        _dicts_to_group(h5file, f'{group}/', d, raise_meta_fail=raise_type_fail, bulk=bulk)
+
+
+# types of the leaves that are saved as scalar datasets, or packed by bulk saving
+_SCALAR_TYPES = (str, bytes, int, float, complex, np.integer, np.floating, np.complexfloating, np.bool_)
 
+# attribute of the datasets & groups created by bulk saving, with the kind of packing
+_PACKED = '_packed'
+
+
+def _dicts_to_group(h5file: h5py.File, path: str, d: dict, raise_meta_fail: bool, bulk: bool = False):
+    group = h5file.require_group(path)
+    _dict_to_group(group, d, raise_meta_fail, bulk)
+
+
+def _dict_to_group(group: h5py.Group, d: dict, raise_meta_fail: bool, bulk: bool):
+    if bulk:
+        d = _pack_dict(group, d)
 
-def _dicts_to_group(h5file: h5py.File, path: str, d: dict, raise_meta_fail: bool):
     for key, item in d.items():
 
         if isinstance(item, np.ndarray):
@@ -135,38 +189,37 @@ def _dicts_to_group(h5file: h5py.File, path: str, d: dict, raise_meta_fail: bool
             if item.dtype == np.dtype('O'):
                 # see if h5py is ok with it
                 try:
-                    h5file[path + key] = item
-                    # h5file[path + key].attrs['dtype'] = item.dtype.str
+                    group[key] = item
+                    # group[key].attrs['dtype'] = item.dtype.str
                 except:
                     msg = f"numpy dtype 'O' for item: {item} not supported by HDF5\n{traceback.format_exc()}"
 
                     if raise_meta_fail:
                         raise TypeError(msg)
                     else:
-                        h5file[path + key] = str(item)
+                        group[key] = str(item)
                         warn(f"{msg}, storing whatever str(obj) returns.")
 
             # numpy array of unicode strings
             elif item.dtype.str.startswith('<U'):
-                h5file[path + key] = item.astype(h5py.special_dtype(vlen=str))
-                h5file[path + key].attrs['dtype'] = item.dtype.str  # h5py doesn't restore the right dtype for str types
+                ds = group.create_dataset(key, data=item.astype(h5py.special_dtype(vlen=str)))
+                ds.attrs['dtype'] = item.dtype.str  # h5py doesn't restore the right dtype for str types
 
             # other types
             else:
-                h5file[path + key] = item
-                # h5file[path + key].attrs['dtype'] = item.dtype.str
+                group[key] = item
+                # group[key].attrs['dtype'] = item.dtype.str
 
         # single pieces of data
-        elif isinstance(item, (str, bytes, int, float, np.int, np.int8, np.int16, np.int32, np.int64, np.float,
-                               np.float16, np.float32, np.float64, np.float128, np.complex)):
-            h5file[path + key] = item
+        elif isinstance(item, _SCALAR_TYPES):
+            group[key] = item
 
         elif isinstance(item, dict):
-            _dicts_to_group(h5file, path + key + '/', item, raise_meta_fail)
+            _dict_to_group(group.create_group(key), item, raise_meta_fail, bulk)
 
         # last resort, try to convert this object to a dict and save its attributes
         elif hasattr(item, '__dict__'):
-            _dicts_to_group(h5file, path + key + '/', item.__dict__, raise_meta_fail)
+            _dict_to_group(group.create_group(key), item.__dict__, raise_meta_fail, bulk)
 
         else:
             msg = f"{type(item)} for item: {item} not supported not supported by HDF5"
@@ -175,11 +228,193 @@ def _dicts_to_group(h5file: h5py.File, path: str, d: dict, raise_meta_fail: bool
                 raise ValueError(msg)
 
             else:
-                h5file[path + key] = str(item)
+                group[key] = str(item)
                 warn(f"{msg}, storing whatever str(obj) returns.")
 
 
-def load_dict(filename: str, group: str) -> dict:
+def _scalar_dtype(values: list) -> Optional[np.dtype]:
+    """dtype that a list of scalar leaves can be packed as, None if they cannot be packed together"""
+    if all(isinstance(v, str) for v in values):
+        return h5py.string_dtype()
+
+    if any(isinstance(v, (str, bytes)) or not isinstance(v, _SCALAR_TYPES) for v in values):
+        return None
+
+    dtypes = set(np.asarray(v).dtype for v in values)
+
+    if len(dtypes) != 1:
+        return None
+
+    return dtypes.pop()
+
+
+def _pack_dict(group: h5py.Group, d: dict) -> dict:
+    """
+    Pack scalar leaves and homogeneous dicts of records of a dict into compound datasets of the group.
+    Returns the items that were not packed.
+    """
+    rest = {}
+    scalars = {}
+
+    for key, item in d.items():
+        if isinstance(item, str) or (isinstance(item, _SCALAR_TYPES) and not isinstance(item, bytes)):
+            dtype = _scalar_dtype([item])
+            scalars.setdefault(dtype, []).append(key)
+
+        elif isinstance(item, dict) and _pack_records(group, key, item):
+            continue
+
+        else:
+            rest[key] = item
+
+    for dtype, keys in scalars.items():
+        name = f"__scalars__.{'str' if dtype.kind == 'O' else dtype.str}"
+        records = np.empty(len(keys), dtype=[('key', h5py.string_dtype()), ('value', dtype)])
+        records['key'] = keys
+        records['value'] = [d[k] for k in keys]
+
+        ds = group.create_dataset(name, data=records)
+        ds.attrs[_PACKED] = 'scalars'
+
+    return rest
+
+
+def _pack_records(group: h5py.Group, key: str, d: dict) -> bool:
+    """Save a dict of dicts with the same keys and scalar leaves as a compound dataset, if possible"""
+    if len(d) < 2 or not all(isinstance(v, dict) for v in d.values()):
+        return False
+
+    records = list(d.values())
+    fields = list(records[0].keys())
+
+    if (len(fields) == 0) or not all(isinstance(f, str) for f in fields) or \
+            any(list(r.keys()) != fields for r in records):
+        return False
+
+    dtypes = []
+    for f in fields:
+        dtype = _scalar_dtype([r[f] for r in records])
+        if dtype is None:
+            return False
+        dtypes.append((f, dtype))
+
+    values = np.empty(len(records), dtype=dtypes)
+    for f in fields:
+        values[f] = [r[f] for r in records]
+
+    g = group.create_group(key)
+    g.attrs[_PACKED] = 'records'
+    g.create_dataset('keys', data=np.array([str(k) for k in d.keys()], dtype=object), dtype=h5py.string_dtype())
+    g.create_dataset('values', data=values)
+
+    return True
+
+
+def update_dict(d: dict, filename: str, group: str, raise_type_fail=True, bulk: bool = False):
+    """
+    Recursively update a dict saved with ``save_dict()`` in place, the file is created if it doesn't exist.
+    Items of ``d`` replace the saved items with the same keys, nested dicts are updated recursively.
+    Other items and datasets in the file are not rewritten.
+
+    :param d:        dict of items to add or replace
+    :type d:         dict
+
+    :param filename: filename
+    :type filename:  str
+
+    :param group:    group name of the dict
+    :type group:     str
+
+    :param raise_type_fail: whether to raise if saving a piece of data fails
+    :type raise_type_fail:  bool
+
+    :param bulk:     pack scalar leaves into compound datasets, see ``save_dict()``
+    :type bulk:      bool
+    """
+
+    with h5py.File(filename, 'a') as h5file:
+        _update_group(h5file.require_group(group), d, raise_type_fail, bulk)
+
+
+def _update_group(group: h5py.Group, d: dict, raise_meta_fail: bool, bulk: bool):
+    # packed scalars of this group are rewritten along with the new items
+    items = {}
+    for name in list(group.keys()):
+        if isinstance(group[name], h5py.Dataset) and (group[name].attrs.get(_PACKED) == 'scalars'):
+            items.update(_read_packed_scalars(group[name]))
+            del group[name]
+
+    for key, item in d.items():
+        items.pop(key, None)
+
+        if key in group.keys():
+            existing = group[key]
+
+            if isinstance(item, dict) and isinstance(existing, h5py.Group):
+                if existing.attrs.get(_PACKED) != 'records':
+                    _update_group(existing, item, raise_meta_fail, bulk)
+                    continue
+
+                # packed records are rewritten, records of ``item`` replace records with the same keys
+                item = {**_read_packed_records(existing), **item}
+
+            del group[key]
+
+        items[key] = item
+
+    _dict_to_group(group, items, raise_meta_fail, bulk)
+
+
+def update_metadata(path: str, metadata: dict, raise_meta_fail: bool = True, bulk: bool = False):
+    """
+    Update the meta data of a file saved with ``save_dataframe()``, without rewriting the DataFrame.
+    Items of ``metadata`` replace the saved items with the same keys.
+
+    :param path:            path to the hdf5 file
+    :type path:             str
+
+    :param metadata:        meta data items to add or replace
+    :type metadata:         dict
+
+    :param raise_meta_fail: see ``save_dataframe()``
+    :type raise_meta_fail:  bool
+
+    :param bulk:            see ``save_dataframe()``
+    :type bulk:             bool
+    """
+
+    with h5py.File(path, 'a') as f:
+        if 'META' not in f.keys():
+            mg = f.create_group('META')
+            mg.attrs['method'] = 'json'
+
+        method = f['META'].attrs['method']
+
+        if method == 'recursive':
+            _update_group(f['META'], metadata, raise_meta_fail, bulk)
+            return
+
+        mg = f['META']
+
+        if _JSON_METADATA in mg.keys():
+            current = json.loads(mg[_JSON_METADATA][()])
+        else:
+            current = {k: json.loads(mg[k][()]) for k in mg.keys()}
+
+        current.update(metadata)
+
+        try:
+            data = json.dumps(current)
+        except TypeError as e:
+            raise TypeError(f"The meta data is not JSON serializable\n{e}")
+
+        for k in list(mg.keys()):
+            del mg[k]
+
+        mg.create_dataset(_JSON_METADATA, data=data)
+
+
+def load_dict(filename: str, group: str, lazy: bool = False) -> Union[dict, 'LazyDict']:
     """
     Recursively load a dict from an hdf5 group.
 
@@ -189,22 +424,747 @@ def load_dict(filename: str, group: str) -> dict:
     :param group:    group name of the dict
     :type group:     str
 
+    :param lazy:     return a ``LazyDict`` that only reads items when they are accessed, instead of reading
+                     the entire group. The file is kept open until ``LazyDict.close()`` is called.
+    :type lazy:      bool
+
     :return:         dict recursively loaded from the hdf5 group
-    :rtype:          dict
+    :rtype:          Union[dict, LazyDict]
     """
 
+    if lazy:
+        return LazyDict(h5py.File(filename, 'r')[group])
+
     with h5py.File(filename, 'r') as h5file:
         return _dicts_from_group(h5file, f'{group}/')
 
 
+def memmap_dataset(filename: str, name: str) -> np.memmap:
+    """
+    Memory-map a dataset of an hdf5 file as a read-only numpy array, without reading it.
+    Processes that map the same file share its pages in the OS page cache.
+
+    Only uncompressed, contiguous (not chunked) datasets of numeric dtypes can be mapped.
+    This is the default layout of datasets created with ``save_dict()``.
+
+    :param filename: path to the hdf5 file
+    :type filename:  str
+
+    :param name:     path of the dataset within the file, such as 'ARRAY_CONTAINER/array'
+    :type name:      str
+
+    :return:         read-only memory-mapped array
+    :rtype:          np.memmap
+    """
+
+    with h5py.File(filename, 'r') as h5file:
+        ds = h5file[name]
+
+        if ds.chunks is not None:
+            raise TypeError(f"Dataset '{name}' is chunked, only contiguous datasets can be memory-mapped")
+
+        if ds.dtype.kind not in 'biufc':
+            raise TypeError(f"Dataset '{name}' of dtype {ds.dtype} cannot be memory-mapped")
+
+        offset = ds.id.get_offset()
+        shape = ds.shape
+        dtype = ds.dtype
+
+    # storage is not allocated for datasets that were never written to
+    if offset is None:
+        return np.zeros(shape, dtype=dtype)
+
+    return np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=shape)
+
+
 def _dicts_from_group(h5file: h5py.File, path: str) -> dict:
+    return _group_to_dict(h5file[path])
+
+
+def _group_to_dict(group: h5py.Group) -> dict:
     ans = {}
-    for key, item in h5file[path].items():
-        if isinstance(item, h5py._hl.dataset.Dataset):
-            if item.attrs.__contains__('dtype'):
-                ans[key] = item[()].astype(item.attrs['dtype'])
+    for key, item in group.items():
+        if isinstance(item, h5py.Dataset):
+            if item.attrs.get(_PACKED) == 'scalars':
+                ans.update(_read_packed_scalars(item))
+            else:
+                ans[key] = _read_leaf(item)
+
+        elif isinstance(item, h5py.Group):
+            if item.attrs.get(_PACKED) == 'records':
+                ans[key] = _read_packed_records(item)
             else:
-                ans[key] = item[()]
-        elif isinstance(item, h5py._hl.group.Group):
-            ans[key] = _dicts_from_group(h5file, path + key + '/')
-    return ans
\ No newline at end of file
+                ans[key] = _group_to_dict(item)
+    return ans
+
+
+def _read_leaf(ds: h5py.Dataset):
+    if 'dtype' in ds.attrs.keys():
+        return ds[()].astype(ds.attrs['dtype'])
+    return ds[()]
+
+
+def _unpack_value(value, dtype: np.dtype):
+    # h5py reads variable length strings as bytes
+    if h5py.check_string_dtype(dtype) is not None:
+        return value.decode() if isinstance(value, bytes) else value
+    return value
+
+
+def _read_packed_scalars(ds: h5py.Dataset) -> dict:
+    records = ds[()]
+    dtype = ds.dtype['value']
+    return {_unpack_value(k, ds.dtype['key']): _unpack_value(v, dtype) for k, v in zip(records['key'],
+                                                                                         records['value'])}
+
+
+def _read_packed_records(group: h5py.Group) -> dict:
+    keys = group['keys'].asstr()[()]
+    values = group['values'][()]
+    return {k: _unpack_record(r, values.dtype) for k, r in zip(keys, values)}
+
+
+def _unpack_record(record: np.void, dtype: np.dtype) -> dict:
+    return {f: _unpack_value(record[f], dtype[f]) for f in dtype.names}
+
+
+class LazyDict(Mapping):
+    """
+    Read-only dict-like view of a dict saved with ``save_dict()``, items are read from the file when they
+    are accessed. Nested dicts are returned as ``LazyDict``. Packed records are indexed by key so that
+    accessing one record only reads that record.
+
+    Use ``to_dict()`` to read everything, and ``close()`` or a ``with`` block to close the file.
+    """
+
+    def __init__(self, group: h5py.Group):
+        self._group = group
+        self._index = None
+
+    def _build_index(self):
+        # key: dataset or group of the item, or the packed dataset that holds it
+        if self._index is not None:
+            return
+
+        self._index = {}
+        self._scalars = {}
+
+        for name, item in self._group.items():
+            if isinstance(item, h5py.Dataset) and (item.attrs.get(_PACKED) == 'scalars'):
+                for k in item.fields('key')[()]:
+                    self._index[_unpack_value(k, item.dtype['key'])] = item
+            else:
+                self._index[name] = item
+
+    def __getitem__(self, key: str):
+        self._build_index()
+
+        item = self._index[key]
+
+        if isinstance(item, h5py.Group):
+            if item.attrs.get(_PACKED) == 'records':
+                return _LazyRecords(item)
+            return LazyDict(item)
+
+        if item.attrs.get(_PACKED) == 'scalars':
+            # all scalars of a packed dataset are read at once
+            if item.name not in self._scalars.keys():
+                self._scalars[item.name] = _read_packed_scalars(item)
+            return self._scalars[item.name][key]
+
+        return _read_leaf(item)
+
+    def __iter__(self):
+        self._build_index()
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        self._build_index()
+        return len(self._index)
+
+    def to_dict(self) -> dict:
+        """Read the entire dict"""
+        return _group_to_dict(self._group)
+
+    def close(self):
+        self._group.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _LazyRecords(Mapping):
+    """Packed dict of records, reads one record per access"""
+
+    def __init__(self, group: h5py.Group):
+        self._group = group
+        self._keys = None
+
+    def _build_index(self):
+        if self._keys is None:
+            self._keys = {k: i for i, k in enumerate(self._group['keys'].asstr()[()])}
+
+    def __getitem__(self, key: str) -> dict:
+        self._build_index()
+        ds = self._group['values']
+        return _unpack_record(ds[self._keys[key]], ds.dtype)
+
+    def __iter__(self):
+        self._build_index()
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        self._build_index()
+        return len(self._keys)
+
+    def to_dict(self) -> dict:
+        return _read_packed_records(self._group)
+
+
+def append_columns(path: str, columns: Dict[str, np.ndarray], index: np.ndarray, key: str = 'DATAFRAME',
+                   compression: Optional[str] = None, compression_opts: Optional[int] = None,
+                   layouts: Optional[Dict[str, str]] = None):
+    """
+    Append rows to a DataFrame stored in the columnar layout, the file and datasets are created if they don't exist.
+
+    The columnar layout stores the index and each column as a separate chunked dataset which is resizable along
+    the rows, so that rows can be appended and a subset of the columns and rows can be read with
+    ``read_columns()``. Numeric columns are stored as 1D datasets, str columns as variable length strings,
+    columns of equal-size arrays as 2D datasets and columns of arrays with different sizes as variable length
+    datasets. The layout of a column is chosen when its dataset is created, from ``layouts`` or else from the
+    first rows. A 2D dataset is converted to a variable length dataset when arrays of another size are appended.
+
+    :param path:    path to the hdf5 file
+    :type path:     str
+
+    :param columns: column name: values. Values are either 1D arrays, where elements can be scalars, str or
+                    1D arrays, or 2D arrays where each row is the array of one row of the DataFrame
+    :type columns:  Dict[str, np.ndarray]
+
+    :param index:   index of the rows
+    :type index:    np.ndarray
+
+    :param key:     name of the hdf5 group
+    :type key:      str
+
+    :param compression:      hdf5 compression filter of the datasets, such as 'lzf' or 'gzip'.
+                             Only used when the datasets are created.
+    :type compression:       Optional[str]
+
+    :param compression_opts: options of the compression filter, such as the gzip level
+    :type compression_opts:  Optional[int]
+
+    :param layouts: column name: 'array' or 'vlen', layout of columns of arrays. Use 'vlen' for columns where
+                    later rows can have arrays of other sizes than the first rows. Only used when the datasets
+                    are created.
+    :type layouts:  Optional[Dict[str, str]]
+    """
+
+    if layouts is None:
+        layouts = {}
+
+    n_new = len(index)
+
+    for name, values in columns.items():
+        if len(values) != n_new:
+            raise ValueError(f"Column '{name}' has {len(values)} rows, the index has {n_new} rows")
+
+    with h5py.File(path, 'a') as f:
+        if key not in f.keys():
+            if n_new == 0:
+                raise ValueError("Cannot create columns from zero rows")
+
+            # raises for unsupported columns before anything is created
+            _column_layout('index', index)
+            for name, values in columns.items():
+                _column_layout(name, values, layouts.get(name))
+
+            group = f.create_group(key)
+            group.attrs['layout'] = 'columnar'
+            group.attrs['columns'] = json.dumps(list(columns.keys()))
+            group.attrs['n_rows'] = 0
+
+            filters = dict(compression=compression, compression_opts=compression_opts)
+
+            _create_column(group, 'index', index, **filters)
+
+            cg = group.create_group('columns')
+            for name, values in columns.items():
+                _create_column(cg, name, values, layout=layouts.get(name), **filters)
+
+        else:
+            group = _get_columnar_group(f, key, path)
+
+            stored = json.loads(group.attrs['columns'])
+            if set(stored) != set(columns.keys()):
+                raise KeyError(f"Columns do not match the stored columns: {stored}")
+
+        n_rows = int(group.attrs['n_rows'])
+
+        cg = group['columns']
+
+        # validate every column before anything is written, so a bad append leaves the file unchanged
+        ragged = [name for name, values in columns.items() if _is_ragged_append(cg[name], values)]
+        prepared = {
+            name: _prepare_values(cg[name], values, kind='vlen' if name in ragged else None)
+            for name, values in columns.items()
+        }
+        index = _prepare_values(group['index'], index)
+
+        for name in ragged:
+            _convert_to_vlen(cg, name, n_rows)
+
+        _append_column(group['index'], index, n_rows)
+        for name, values in prepared.items():
+            _append_column(group['columns'][name], values, n_rows)
+
+        # rows are only valid once n_rows is updated, readers ignore rows past n_rows
+        group.attrs['n_rows'] = n_rows + n_new
+
+
+def write_column(path: str, name: str, values: np.ndarray, key: str = 'DATAFRAME',
+                 compression: Optional[str] = None, compression_opts: Optional[int] = None,
+                 layout: Optional[str] = None):
+    """
+    Add a column to a DataFrame stored in the columnar layout, or replace an existing column.
+    The other columns are not rewritten.
+
+    A column with the same kind, dtype and shape is overwritten in place, otherwise its dataset is replaced.
+    HDF5 does not reclaim the space of deleted datasets, use ``h5repack`` to shrink a file after replacing
+    many columns.
+
+    :param path:    path to the hdf5 file
+    :type path:     str
+
+    :param name:    column name
+    :type name:     str
+
+    :param values:  values of every row, see ``append_columns()``
+    :type values:   np.ndarray
+
+    :param key:     name of the hdf5 group
+    :type key:      str
+
+    :param compression:      hdf5 compression filter of the dataset, see ``append_columns()``
+    :type compression:       Optional[str]
+
+    :param compression_opts: options of the compression filter
+    :type compression_opts:  Optional[int]
+
+    :param layout:  'array' or 'vlen', layout of a column of arrays, see ``append_columns()``
+    :type layout:   Optional[str]
+    """
+
+    with h5py.File(path, 'a') as f:
+        group = _get_columnar_group(f, key, path)
+        n_rows = int(group.attrs['n_rows'])
+
+        if len(values) != n_rows:
+            raise ValueError(f"Column '{name}' has {len(values)} rows, the stored DataFrame has {n_rows} rows")
+
+        columns = json.loads(group.attrs['columns'])
+        cg = group['columns']
+
+        if name not in cg.keys():
+            columns.append(name)
+
+        else:
+            ds = cg[name]
+            kind, dtype, shape = _column_layout(name, values, layout)
+
+            # overwrite in place if the new column is stored the same way as the old one
+            if (kind != ds.attrs['kind']) or (dtype != ds.dtype) or (shape[1:] != ds.shape[1:]) or \
+                    (h5py.check_vlen_dtype(dtype) != h5py.check_vlen_dtype(ds.dtype)) or \
+                    (compression != ds.compression):
+                del cg[name]
+
+        if name not in cg.keys():
+            _create_column(cg, name, values, layout=layout, compression=compression,
+                           compression_opts=compression_opts)
+
+        _append_column(cg[name], _prepare_values(cg[name], values), 0)
+
+        group.attrs['columns'] = json.dumps(columns)
+
+
+def delete_column(path: str, name: str, key: str = 'DATAFRAME'):
+    """
+    Delete a column of a DataFrame stored in the columnar layout
+
+    :param path: path to the hdf5 file
+    :type path:  str
+
+    :param name: column name
+    :type name:  str
+
+    :param key:  name of the hdf5 group
+    :type key:   str
+    """
+
+    with h5py.File(path, 'a') as f:
+        group = _get_columnar_group(f, key, path)
+
+        columns = json.loads(group.attrs['columns'])
+        if name not in columns:
+            raise KeyError(f"Column '{name}' not in the stored columns: {columns}")
+
+        del group['columns'][name]
+
+        columns.remove(name)
+        group.attrs['columns'] = json.dumps(columns)
+
+
+def append_dataframe(path: str, dataframe: pd.DataFrame, key: str = 'DATAFRAME', **kwargs):
+    """
+    Append the rows of a DataFrame to a DataFrame stored in the columnar layout, the file and datasets are created
+    if they don't exist. kwargs are passed to ``append_columns()``. Use ``load_columns()`` to load it.
+
+    :param path:      path to the hdf5 file
+    :type path:       str
+
+    :param dataframe: DataFrame with the same columns as the stored DataFrame
+    :type dataframe:  pd.DataFrame
+
+    :param key:       name of the hdf5 group
+    :type key:        str
+    """
+
+    columns = {c: np.asarray(dataframe[c].values) for c in dataframe.columns}
+    append_columns(path, columns, dataframe.index.values, key=key, **kwargs)
+
+
+def _get_columnar_group(f: h5py.File, key: str, path: str) -> h5py.Group:
+    if (key not in f.keys()) or (f[key].attrs.get('layout') != 'columnar'):
+        raise TypeError(f"'{key}' in file: {path} is not a DataFrame in the columnar layout")
+    return f[key]
+
+
+# target size of a chunk of a column's dataset, and the maximum number of rows of a chunk so that small tables
+# of scalars do not allocate a whole target size per column
+_CHUNK_BYTES = 1024 ** 2
+_CHUNK_ROWS = 4096
+
+
+def _create_column(group: h5py.Group, name: str, values: np.ndarray, layout: Optional[str] = None,
+                   compression: Optional[str] = None, compression_opts: Optional[int] = None):
+    if '/' in name:
+        raise ValueError(f"Column names cannot contain '/', got: {name}")
+
+    kind, dtype, shape = _column_layout(name, values, layout)
+
+    # chunks of whole rows, so that reading a range of rows only decompresses the chunks of those rows
+    if kind == 'array':
+        row_bytes = max(1, shape[1]) * np.dtype(dtype).itemsize
+    elif kind == 'scalar':
+        row_bytes = np.dtype(dtype).itemsize
+    else:
+        row_bytes = 256
+
+    # from the row size only, the first rows can be a small part of the rows that are appended later
+    chunks = (max(1, min(_CHUNK_BYTES // row_bytes, _CHUNK_ROWS)),) + tuple(max(1, n) for n in shape[1:])
+
+    ds = group.create_dataset(name, shape=shape, maxshape=(None,) + shape[1:], dtype=dtype, chunks=chunks,
+                              compression=compression, compression_opts=compression_opts,
+                              shuffle=(compression is not None) and (kind in ('scalar', 'array')))
+    ds.attrs['kind'] = kind
+
+
+def _column_layout(name: str, values: np.ndarray, layout: Optional[str] = None) -> Tuple[str, np.dtype, tuple]:
+    """kind, dtype and initial shape of the dataset of a column, ``layout`` is one of None, 'array' or 'vlen'"""
+    values = np.asarray(values)
+
+    if layout not in (None, 'array', 'vlen'):
+        raise ValueError(f"layout of column '{name}' must be one of None, 'array' or 'vlen', got: {layout}")
+
+    if values.ndim == 2:
+        if layout == 'vlen':
+            kind = 'vlen'
+            dtype = h5py.vlen_dtype(values.dtype)
+            shape = (0,)
+        else:
+            kind = 'array'
+            dtype = values.dtype
+            shape = (0, values.shape[1])
+
+    elif values.dtype.kind in 'biufc':
+        kind = 'scalar'
+        dtype = values.dtype
+        shape = (0,)
+
+    elif values.dtype.kind in 'OSU' and isinstance(values[0], (str, bytes)):
+        kind = 'string'
+        dtype = h5py.string_dtype()
+        shape = (0,)
+
+    elif values.dtype.kind == 'O' and isinstance(values[0], np.ndarray):
+        sizes = np.fromiter(map(np.size, values), dtype=np.int64, count=values.size)
+        dtype = np.result_type(*set(a.dtype for a in values))
+
+        if (sizes == sizes[0]).all() and (layout != 'vlen'):
+            kind = 'array'
+            shape = (0, sizes[0])
+        elif layout == 'array':
+            raise ValueError(f"Column '{name}' has arrays of different sizes, it cannot use the 'array' layout")
+
+        else:
+            kind = 'vlen'
+            dtype = h5py.vlen_dtype(dtype)
+            shape = (0,)
+
+    else:
+        raise TypeError(f"Column '{name}' of dtype {values.dtype} with elements of type {type(values[0])} "
+                        f"is not supported by the columnar layout")
+
+    return kind, dtype, shape
+
+
+def _prepare_values(ds: h5py.Dataset, values: np.ndarray, kind: Optional[str] = None) -> np.ndarray:
+    """
+    Check that values can be appended to the dataset of a column and convert them to the dataset's layout.
+    Does not modify the dataset. ``kind='vlen'`` prepares values for a 2D dataset converted with
+    ``_convert_to_vlen()``.
+
+    :raises ValueError: if the arrays are not the size of the stored arrays
+    :raises TypeError:  if the values are not of the stored kind or cannot be cast to the stored dtype
+    """
+    values = np.asarray(values)
+
+    if kind is None:
+        kind = ds.attrs['kind']
+
+    if len(values) == 0:
+        return values
+
+    if kind == 'array':
+        if values.ndim == 1:
+            if not all(isinstance(v, np.ndarray) for v in values):
+                raise TypeError(f"'{ds.name}' stores arrays, got elements of type {type(values[0])}")
+
+            sizes = set(map(np.size, values))
+            if sizes != {ds.shape[1]}:
+                raise ValueError(f"Arrays of sizes {sorted(sizes)} cannot be appended to '{ds.name}' which "
+                                 f"stores arrays of size {ds.shape[1]}")
+
+            values = np.stack(values)
+
+        if values.shape[1:] != ds.shape[1:]:
+            raise ValueError(f"Arrays of size {values.shape[1]} cannot be appended to '{ds.name}' which stores "
+                             f"arrays of size {ds.shape[1]}")
+
+        _check_cast(ds, values.dtype, ds.dtype)
+
+    elif kind == 'scalar':
+        if (values.ndim != 1) or (values.dtype.kind not in 'biufc'):
+            raise TypeError(f"'{ds.name}' stores numbers, got values of dtype {values.dtype}")
+
+        _check_cast(ds, values.dtype, ds.dtype)
+
+    elif kind == 'string':
+        if not all(isinstance(v, (str, bytes)) for v in values):
+            raise TypeError(f"'{ds.name}' stores str, got elements of type {type(values[0])}")
+
+        values = values.astype(object)
+
+    elif kind == 'vlen':
+        if values.ndim == 2:
+            values = _as_rows(values)
+
+        if not all(isinstance(v, np.ndarray) and (v.ndim == 1) for v in values):
+            raise TypeError(f"'{ds.name}' stores 1D arrays, got elements of type {type(values[0])}")
+
+        base = h5py.check_vlen_dtype(ds.dtype) or ds.dtype
+        for dtype in set(v.dtype for v in values):
+            _check_cast(ds, dtype, base)
+
+    return values
+
+
+def _check_cast(ds: h5py.Dataset, dtype: np.dtype, stored: np.dtype):
+    if not np.can_cast(dtype, stored, casting='same_kind'):
+        raise TypeError(f"Values of dtype {dtype} cannot be appended to '{ds.name}' which stores {stored}")
+
+
+def _is_ragged_append(ds: h5py.Dataset, values: np.ndarray) -> bool:
+    """True if arrays of another size than the arrays stored in a 2D dataset are appended"""
+    values = np.asarray(values)
+
+    if (ds.attrs['kind'] != 'array') or (len(values) == 0):
+        return False
+
+    if values.ndim == 2:
+        return values.shape[1] != ds.shape[1]
+
+    return (values.ndim == 1) and all(isinstance(v, np.ndarray) and (v.ndim == 1) for v in values) and \
+        (set(map(np.size, values)) != {ds.shape[1]})
+
+
+def _convert_to_vlen(group: h5py.Group, name: str, n_rows: int):
+    """Replace the 2D dataset of a column by a variable length dataset with the same rows"""
+    ds = group[name]
+    data = ds[:n_rows]
+    filters = dict(compression=ds.compression, compression_opts=ds.compression_opts)
+
+    del group[name]
+
+    _create_column(group, name, data, layout='vlen', **filters)
+    _append_column(group[name], _prepare_values(group[name], data), 0)
+
+
+def _as_rows(values: np.ndarray) -> np.ndarray:
+    """1D object array of the rows of a 2D array"""
+    rows = np.empty(len(values), dtype=object)
+    for i, row in enumerate(values):
+        rows[i] = row
+    return rows
+
+
+def _append_column(ds: h5py.Dataset, values: np.ndarray, n_rows: int):
+    """Write values returned by ``_prepare_values()`` from row ``n_rows`` on"""
+    if len(values) == 0:
+        return
+
+    ds.resize(n_rows + len(values), axis=0)
+
+    if ds.attrs['kind'] == 'vlen':
+        # h5py broadcasts an object array of equal-size arrays as a 2D array in __setitem__
+        ds.write_direct(values, dest_sel=np.s_[n_rows:n_rows + len(values)])
+    else:
+        ds[n_rows:n_rows + len(values)] = values
+
+
+def read_columns(path: str, key: str = 'DATAFRAME', columns: Optional[List[str]] = None,
+                 start: Optional[int] = None, stop: Optional[int] = None,
+                 slices: Optional[Dict[str, slice]] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Read columns of a DataFrame stored in the columnar layout, see ``append_columns()``.
+    Only the requested columns and rows are read from the file.
+
+    :param path:    path to the hdf5 file
+    :type path:     str
+
+    :param key:     name of the hdf5 group
+    :type key:      str
+
+    :param columns: columns to read, reads all columns if None
+    :type columns:  Optional[List[str]]
+
+    :param start:   first row to read
+    :type start:    Optional[int]
+
+    :param stop:    stop reading before this row
+    :type stop:     Optional[int]
+
+    :param slices:  column name: slice of the arrays in the column. Only the slice is read from
+                    columns of equal-size arrays.
+    :type slices:   Optional[Dict[str, slice]]
+
+    :return: tuple, (index, dict of column name: values). Columns of equal-size arrays are 2D arrays.
+    :rtype: Tuple[np.ndarray, Dict[str, np.ndarray]]
+    """
+
+    with h5py.File(path, 'r') as f:
+        group = f[key]
+
+        if columns is None:
+            columns = json.loads(group.attrs['columns'])
+
+        if slices is None:
+            slices = {}
+
+        # datasets can have rows past n_rows from an append that failed before n_rows was updated
+        rows = slice(*slice(start, stop).indices(int(group.attrs['n_rows']))[:2])
+
+        index = _read_column(group['index'], rows)
+        data = {name: _read_column(group['columns'][name], rows, slices.get(name)) for name in columns}
+
+    return index, data
+
+
+def _read_column(ds: h5py.Dataset, rows: slice, cols: Optional[slice] = None) -> np.ndarray:
+    kind = ds.attrs['kind']
+
+    if kind == 'string':
+        return ds.asstr()[rows].astype(object)
+
+    if cols is None:
+        return ds[rows]
+
+    if kind == 'array':
+        return ds[rows, cols]
+
+    if kind == 'vlen':
+        values = ds[rows]
+        for i in range(values.size):
+            values[i] = values[i][cols]
+        return values
+
+    raise ValueError(f"Cannot slice the elements of '{ds.name}' which stores scalars")
+
+
+def is_columnar(path: str, key: str = 'DATAFRAME') -> bool:
+    """
+    Whether a group of an hdf5 file stores a DataFrame in the columnar layout
+
+    :param path: path to the hdf5 file
+    :type path:  str
+
+    :param key:  name of the hdf5 group
+    :type key:   str
+    """
+
+    with h5py.File(path, 'r') as f:
+        return (key in f.keys()) and (f[key].attrs.get('layout') == 'columnar')
+
+
+def get_n_rows(path: str, key: str = 'DATAFRAME') -> int:
+    """
+    Number of rows of a DataFrame stored in the columnar layout
+
+    :param path: path to the hdf5 file
+    :type path:  str
+
+    :param key:  name of the hdf5 group
+    :type key:   str
+    """
+
+    with h5py.File(path, 'r') as f:
+        return int(f[key].attrs['n_rows'])
+
+
+def get_column_names(path: str, key: str = 'DATAFRAME') -> List[str]:
+    """
+    Names of the columns of a DataFrame stored in the columnar layout
+
+    :param path: path to the hdf5 file
+    :type path:  str
+
+    :param key:  name of the hdf5 group
+    :type key:   str
+    """
+
+    with h5py.File(path, 'r') as f:
+        return json.loads(f[key].attrs['columns'])
+
+
+def load_columns(path: str, key: str = 'DATAFRAME', columns: Optional[List[str]] = None,
+                 start: Optional[int] = None, stop: Optional[int] = None) -> pd.DataFrame:
+    """
+    Load a DataFrame stored in the columnar layout, see ``read_columns()`` for the arguments.
+    Columns of arrays are returned as object columns where each element is a 1D array.
+
+    :rtype: pd.DataFrame
+    """
+
+    index, data = read_columns(path, key, columns=columns, start=start, stop=stop)
+
+    for name, values in data.items():
+        if values.ndim == 2:
+            rows = np.empty(values.shape[0], dtype=object)
+            for i in range(values.shape[0]):
+                rows[i] = values[i]
+            data[name] = rows
+
+    return pd.DataFrame(data, index=index)
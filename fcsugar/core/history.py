@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from . import hdftools
+from time import time
+from typing import *
+import json
+import numpy as np
+import pandas as pd
+
+
+# status of a record
+EXECUTED = 'executed'    # the node was executed
+CACHED = 'cached'        # the node's output was restored from the node cache
+RESUMED = 'resumed'      # the node's output was restored from a checkpoint
+STREAMED = 'streamed'    # the node was executed on chunks of rows, see DataFrameStream
+
+
+class ExecutionLog:
+    """
+    Append-only log of pipeline executions. Every execution of a pipeline is a run with an id, each node of
+    a run is a record with the columns:
+
+        - ``run``:    id of the run, increases by 1 for every execution
+        - ``ix``:     index of the node in the pipeline
+        - ``name``:   name of the node
+        - ``params``: the node's params at the time of the execution
+        - ``status``: one of 'executed', 'cached', 'resumed' or 'streamed'
+        - ``time``:   unix time when the record was added
+
+    Records are stored in columns so that appending is O(1), and the records of a run are contiguous.
+    """
+
+    def __init__(self):
+        self.run = []
+        self.ix = []
+        self.name = []
+        self.params = []
+        self.status = []
+        self.time = []
+
+        # run id: index of its first record
+        self._run_starts = {}
+        self.current_run = None
+
+    def __len__(self) -> int:
+        return len(self.run)
+
+    def start_run(self) -> int:
+        """Start a new run, records are added to it until the next run is started"""
+        self.current_run = 0 if self.current_run is None else self.current_run + 1
+        self._run_starts[self.current_run] = len(self.run)
+        return self.current_run
+
+    def append(self, node, ix: int, status: str = EXECUTED):
+        """
+        Add a record of a node to the current run. Composite nodes, such as fused nodes of lazy containers,
+        add a record for each of the nodes they are made of, at the positions in their ``positions`` attribute
+        if they have one.
+
+        :param node:   the node
+        :param ix:     index of the node in the pipeline
+        :param status: see the class docs
+        """
+        if self.current_run is None:
+            self.start_run()
+
+        if hasattr(node, 'nodes'):
+            positions = getattr(node, 'positions', None)
+            for i, n in enumerate(node.nodes):
+                self.append(n, ix if positions is None else positions[i], status)
+            return
+
+        self.run.append(self.current_run)
+        self.ix.append(ix)
+        self.name.append(node.name)
+        # copy, since params can later be changed from the GUI
+        self.params.append(dict(node.params) if node.params is not None else {})
+        self.status.append(status)
+        self.time.append(time())
+
+    @property
+    def runs(self) -> List[int]:
+        """ids of the runs"""
+        return list(self._run_starts.keys())
+
+    def get_run(self, run: int = -1) -> List[dict]:
+        """
+        Records of a run
+
+        :param run: id of the run, -1 for the last run
+        """
+        if run == -1:
+            run = self.current_run
+
+        start = self._run_starts[run]
+        stop = self._run_starts.get(run + 1, len(self.run))
+
+        return [self._record(i) for i in range(start, stop)]
+
+    def query(self, run: Optional[int] = None, name: Optional[str] = None,
+              status: Optional[str] = None) -> List[dict]:
+        """
+        Records that match all the given conditions
+
+        :param run:    id of the run, -1 for the last run
+        :param name:   name of the node
+        :param status: status of the records
+        """
+        if run is not None:
+            records = self.get_run(run) if (run in self._run_starts.keys()) or (run == -1) else []
+        else:
+            records = (self._record(i) for i in range(len(self.run)))
+
+        return [r for r in records
+                if ((name is None) or (r['name'] == name)) and ((status is None) or (r['status'] == status))]
+
+    def _record(self, i: int) -> dict:
+        return {
+            'run': self.run[i],
+            'ix': self.ix[i],
+            'name': self.name[i],
+            'params': self.params[i],
+            'status': self.status[i],
+            'time': self.time[i]
+        }
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """All records as a DataFrame"""
+        return pd.DataFrame(
+            {
+                'run': np.array(self.run, dtype=np.int64),
+                'ix': np.array(self.ix, dtype=np.int64),
+                'name': self.name,
+                'params': self.params,
+                'status': self.status,
+                'time': np.array(self.time, dtype=np.float64)
+            }
+        )
+
+    def to_hdf5(self, path: str, key: str = 'HISTORY', start: int = 0):
+        """
+        Append the records to the columnar layout of an hdf5 file, see ``hdftools.append_columns()``.
+        Params are stored as json with a str fallback.
+
+        :param path:  path to the hdf5 file
+        :param key:   name of the hdf5 group
+        :param start: only append the records from this index on, such as the number of records that
+                      were already saved, for appending the records of new runs to the file
+        """
+        if start >= len(self):
+            return
+
+        columns = {
+            'run': np.array(self.run[start:], dtype=np.int64),
+            'ix': np.array(self.ix[start:], dtype=np.int64),
+            'name': np.array(self.name[start:], dtype=object),
+            'params': np.array([json.dumps(p, default=str) for p in self.params[start:]], dtype=object),
+            'status': np.array(self.status[start:], dtype=object),
+            'time': np.array(self.time[start:], dtype=np.float64)
+        }
+
+        hdftools.append_columns(path, columns, np.arange(start, len(self)), key=key)
+
+    @classmethod
+    def from_hdf5(cls, path: str, key: str = 'HISTORY'):
+        """Load a log saved with ``to_hdf5()``, params are loaded as the dicts decoded from json"""
+        index, columns = hdftools.read_columns(path, key)
+
+        log = cls()
+
+        for i in range(index.size):
+            run = int(columns['run'][i])
+
+            if run != log.current_run:
+                log.current_run = run
+                log._run_starts[run] = i
+
+            log.run.append(run)
+            log.ix.append(int(columns['ix'][i]))
+            log.name.append(columns['name'][i])
+            log.params.append(json.loads(columns['params'][i]))
+            log.status.append(columns['status'][i])
+            log.time.append(float(columns['time'][i]))
+
+        return log
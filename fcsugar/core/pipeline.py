@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from . import executors
+from .bases import Container, Node
+from glob import glob
+from time import perf_counter
+from traceback import format_exc
+from typing import *
+import os
+import pandas as pd
+
+
+class BatchResult:
+    """
+    Outcome of a pipeline run on one source of a batch, see ``Pipeline.run()``.
+    """
+
+    def __init__(self, source: Union[str, int], success: bool, wall_time: float, output: Any = None,
+                 error: Optional[str] = None, node_stats: Optional[List[dict]] = None):
+        """
+        :param source:     path of the file, or index of the container in the list of containers
+        :param success:    whether the pipeline completed without errors
+        :param wall_time:  seconds taken to load, process and save the source
+        :param output:     output container, or the path it was saved to if an output directory was given
+        :param error:      traceback if the pipeline failed
+        :param node_stats: ``node_stats`` of the execution
+        """
+        self.source = source
+        self.success = success
+        self.wall_time = wall_time
+        self.output = output
+        self.error = error
+        self.node_stats = node_stats if node_stats is not None else []
+
+    def __repr__(self):
+        status = 'ok' if self.success else 'failed'
+        return f"BatchResult({self.source!r}, {status}, {self.wall_time:.3f}s)"
+
+
+class Pipeline:
+    """
+    Reusable pipeline that is not bound to a container. It can be applied to a single container or run on
+    a batch of containers or hdf5 files.
+
+    Example:
+
+    .. code-block:: python
+
+        pipeline = Pipeline() >> splice('_RAW_CURVE', 0, 2990) >> normalize('spliced') >> rfft('normalize')
+
+        results = pipeline.run('/data/sessions/*.h5', output_dir='/data/processed')
+        print(Pipeline.report(results))
+    """
+
+    def __init__(self, *nodes: Node):
+        """
+        :param nodes: nodes of the pipeline, in order
+        """
+        self.nodes = []
+
+        for n in nodes:
+            self >> n
+
+    def __rshift__(self, node: Node):
+        node.bind()
+        self.nodes.append(node)
+        return self
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def apply(self, container: Container, **kwargs) -> Container:
+        """
+        Execute the pipeline on a container. Each container gets its own copy of the nodes and no GUI is made.
+        kwargs are passed to ``Container.execute_pipeline()``.
+
+        The nodes are appended to the container's own pipeline and the container is modified in place, nodes
+        that were already added to the container are executed first. Use ``container.deepcopy()`` to keep the
+        original container.
+
+        :param container: container to process
+        :return:          output of the pipeline
+        """
+        for n in self.nodes:
+            container.pipeline.append(n.copy())
+
+        return container.execute_pipeline(**kwargs)
+
+    def run(self, sources: Union[str, List[str], List[Container]], container_cls: type = None,
+            key: str = None, output_dir: Optional[str] = None, executor: Optional[str] = None,
+            **kwargs) -> List[BatchResult]:
+        """
+        Run the pipeline on a batch of containers or hdf5 files. The sources are processed in parallel with
+        the executor set in ``config.executor``, nodes are then executed serially within each source.
+        Exceptions are caught for each source and returned in its ``BatchResult``, also for containers with
+        a status widget. With the serial and thread executors containers are modified in place, see ``apply()``.
+
+        With the process executor the workers modify copies of the containers, the containers that are passed
+        are not changed and the output is only in the returned results. Output containers are sent back from
+        the worker processes, provide an ``output_dir`` to save them in the workers instead when processing many
+        large files.
+
+        :param sources:       glob pattern of hdf5 files, list of hdf5 files, or list of containers
+        :param container_cls: class used to load files with its ``from_hdf5()``, DataFrameContainer by default
+        :param key:           hdf5 key to load files with, uses the default of ``container_cls.from_hdf5()`` if None
+        :param output_dir:    directory to save the output of each file to with ``to_hdf5()``, using the same
+                              file name. Outputs are returned instead of saved if None.
+        :param executor:      one of 'serial', 'thread' or 'process', uses ``config.executor`` if None
+        :param kwargs:        passed to ``Container.execute_pipeline()``
+        :return:              one result per source, in order
+        """
+        if isinstance(sources, str):
+            sources = sorted(glob(sources))
+
+        if container_cls is None:
+            from ..containers import DataFrameContainer
+            container_cls = DataFrameContainer
+
+        if (output_dir is not None) and not os.path.isdir(output_dir):
+            os.makedirs(output_dir)
+
+        load_kwargs = {} if key is None else {'key': key}
+
+        def run_one(i: int) -> BatchResult:
+            source = sources[i]
+            name = source if isinstance(source, str) else i
+            t0 = perf_counter()
+
+            try:
+                if isinstance(source, str):
+                    container = container_cls.from_hdf5(source, status_widget=False, **load_kwargs)
+                    output_path = None if output_dir is None else os.path.join(output_dir, os.path.basename(source))
+                else:
+                    container = source
+                    output_path = None if output_dir is None else os.path.join(output_dir, f"{i}.h5")
+
+                output = self.apply(container, executor=node_executor, raise_errors=True, **kwargs)
+                node_stats = container.node_stats
+
+                if output_path is not None:
+                    output.to_hdf5(output_path, **load_kwargs)
+                    output = output_path
+
+            except Exception:
+                return BatchResult(name, False, perf_counter() - t0, error=format_exc())
+
+            return BatchResult(name, True, perf_counter() - t0, output=output, node_stats=node_stats)
+
+        if executor is None:
+            executor = executors.get_executor()
+
+        # the sources are processed in parallel, don't also shard the rows of each source
+        node_executor = 'serial' if executor != 'serial' else None
+
+        return executors.map_items(run_one, len(sources), executor=executor)
+
+    @staticmethod
+    def report(results: List[BatchResult]) -> pd.DataFrame:
+        """
+        Summary of the results of a batch, one row per source with the columns:
+        'source', 'success', 'wall_time', 'output' and 'error'.
+        """
+        return pd.DataFrame(
+            [
+                {
+                    'source': r.source,
+                    'success': r.success,
+                    'wall_time': r.wall_time,
+                    'output': r.output if isinstance(r.output, str) else None,
+                    'error': r.error
+                }
+                for r in results
+            ]
+        )
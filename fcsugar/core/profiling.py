@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from time import perf_counter
+from typing import *
+import json
+import os
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def cpu_time() -> float:
+    """User + system CPU time of this process and its terminated child processes, such as process pool workers"""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+
+def max_rss() -> int:
+    """Peak resident set size of this process in bytes, 0 if not available on this platform"""
+    if resource is None:
+        return 0
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kilobytes on linux, bytes on macOS
+    return rss if os.uname().sysname == 'Darwin' else rss * 1024
+
+
+class NodeProfiler:
+    """
+    Measures a node's execution, used by ``_execute_pipeline()`` when profiling is enabled.
+
+    The profile of a node is a dict with:
+
+        - ``node``:            name of the node
+        - ``start``:           start time in seconds, relative to the start of the pipeline execution
+        - ``wall_time``:       seconds
+        - ``cpu_time``:        seconds of CPU time, including process pool workers
+        - ``max_rss_increase``: bytes the peak resident memory of the process increased by
+        - ``peak_memory``:     peak memory in bytes allocated by the node, only if memory is traced
+        - ``memory_delta``:    bytes allocated by the node that are still allocated after it, only if memory is traced
+        - ``rows_in``, ``rows_out``: number of rows, if the container has rows
+        - ``columns_added``:   dict of the bytes of each column that was added by the node, if the container has columns
+    """
+
+    def __init__(self, t_zero: float):
+        """
+        :param t_zero: ``perf_counter()`` time of the start of the pipeline execution
+        """
+        self.t_zero = t_zero
+
+    def start(self, node, container):
+        self.info = container.get_profile_info()
+        self.t0 = perf_counter()
+        self.cpu0 = cpu_time()
+        self.rss0 = max_rss()
+
+    def stop(self, node, result, stats: dict) -> dict:
+        """
+        :param node:   the node that was executed
+        :param result: output of the node
+        :param stats:  stats recorded by the pipeline loop, such as traced memory
+        :return:       profile of the node
+        """
+        wall_time = perf_counter() - self.t0
+
+        profile = {
+            'node': node.name,
+            'start': self.t0 - self.t_zero,
+            'wall_time': wall_time,
+            'cpu_time': cpu_time() - self.cpu0,
+            'max_rss_increase': max_rss() - self.rss0,
+            **{k: v for k, v in stats.items() if k not in ('node', 'wall_time')}
+        }
+
+        if 'n_rows' in self.info.keys():
+            profile['rows_in'] = self.info['n_rows']
+
+        info = result.get_profile_info() if hasattr(result, 'get_profile_info') else {}
+
+        if 'n_rows' in info.keys():
+            profile['rows_out'] = info['n_rows']
+
+        if 'columns' in info.keys():
+            added = [c for c in info['columns'] if c not in self.info.get('columns', [])]
+            profile['columns_added'] = result.get_column_nbytes(added)
+
+        return profile
+
+
+def to_chrome_trace(profiles: List[dict], path: Optional[str] = None) -> dict:
+    """
+    Convert node profiles to the Chrome trace event format, can be viewed in chrome://tracing or https://ui.perfetto.dev
+
+    :param profiles: profiles of the nodes, such as ``Container.node_stats`` after a profiled execution
+    :param path:     optional json file to write to
+    :return:         trace as a dict
+    """
+    events = []
+    for p in profiles:
+        events.append(
+            {
+                'name': p['node'],
+                'cat': 'node',
+                'ph': 'X',
+                'ts': p.get('start', 0.0) * 1e6,
+                'dur': p['wall_time'] * 1e6,
+                'pid': os.getpid(),
+                'tid': 0,
+                'args': {k: v for k, v in p.items() if k not in ('node', 'start', 'wall_time')}
+            }
+        )
+
+    trace = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    if path is not None:
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+    return trace
+
+
+def to_speedscope(profiles: List[dict], path: Optional[str] = None, name: str = 'pipeline') -> dict:
+    """
+    Convert node profiles to the speedscope evented profile format, can be viewed in https://www.speedscope.app
+
+    :param profiles: profiles of the nodes, such as ``Container.node_stats`` after a profiled execution
+    :param path:     optional json file to write to
+    :param name:     name of the profile
+    :return:         profile as a dict
+    """
+    frames = []
+    frame_ix = {}
+    events = []
+
+    t = 0.0
+    for p in profiles:
+        if p['node'] not in frame_ix.keys():
+            frame_ix[p['node']] = len(frames)
+            frames.append({'name': p['node']})
+
+        # nodes are executed one after the other, make sure events never overlap due to rounding
+        start = max(t, p.get('start', t))
+        end = start + p['wall_time']
+
+        events.append({'type': 'O', 'frame': frame_ix[p['node']], 'at': start})
+        events.append({'type': 'C', 'frame': frame_ix[p['node']], 'at': end})
+
+        t = end
+
+    profile = {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'shared': {'frames': frames},
+        'profiles': [
+            {
+                'type': 'evented',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0.0,
+                'endValue': t,
+                'events': events
+            }
+        ],
+        'name': name,
+        'exporter': 'fcsugar'
+    }
+
+    if path is not None:
+        with open(path, 'w') as f:
+            json.dump(profile, f)
+
+    return profile
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+Process-wide registry of the functions of nodes, used for the ``functions`` of containers.
+
+Functions are keyed by their qualified name and a hash of their code, such as
+'fcsugar.library.data.splice:3f2a...'. Registering a function does not read its source, the source is only read
+when it's needed, such as when saving a container, and then kept for the lifetime of the process.
+"""
+
+from . import hdftools
+from importlib import import_module
+from inspect import getsource
+from typing import *
+import h5py
+import hashlib
+import json
+import numpy as np
+import os
+
+
+# key: function
+_functions = {}
+
+# key: source
+_sources = {}
+
+# code object: key
+_keys = {}
+
+# key: compiled source, see exec_functions()
+_compiled = {}
+
+
+def code_hash(func: callable) -> str:
+    """Hash of a function's bytecode, constants and names. Does not read the source file."""
+    h = hashlib.blake2b(digest_size=8)
+    _update_code_hash(h, func.__code__)
+    return h.hexdigest()
+
+
+def _update_code_hash(h, code):
+    h.update(code.co_code)
+    h.update(repr(code.co_names).encode())
+
+    # the repr of nested code objects, such as of lambdas, has their memory address
+    for const in code.co_consts:
+        if isinstance(const, type(code)):
+            _update_code_hash(h, const)
+        else:
+            h.update(repr(const).encode())
+
+
+def register(func: callable) -> str:
+    """
+    Register a function, computed once per code object.
+
+    :param func: function or bound method
+    :return:     key of the function
+    """
+    func = getattr(func, '__func__', func)
+    code = func.__code__
+
+    if code not in _keys:
+        key = f"{func.__module__}.{func.__qualname__}:{code_hash(func)}"
+        _keys[code] = key
+        _functions[key] = func
+
+    return _keys[code]
+
+
+def register_source(source: str, key: Optional[str] = None) -> str:
+    """
+    Register the source of a function without the function, such as a source loaded from a file.
+
+    :param source: source code
+    :param key:    key of the function, a key is made from a hash of the source if None
+    :return:       key of the source
+    """
+    if key is None:
+        key = f"source:{hashlib.blake2b(source.encode(), digest_size=8).hexdigest()}"
+
+    _sources.setdefault(key, source)
+
+    return key
+
+
+def get_source(key: str) -> str:
+    """Source of a registered function, read from its file on first access"""
+    if key not in _sources:
+        _sources[key] = getsource(_get_function(key))
+
+    return _sources[key]
+
+
+def _get_function(key: str) -> callable:
+    if key in _functions:
+        return _functions[key]
+
+    # functions registered in another process, such as a worker of a process pool, are found by their name
+    name, _, h = key.rpartition(':')
+
+    # the module name can contain dots, find the longest importable module
+    parts = name.split('.')
+    for i in reversed(range(1, len(parts))):
+        try:
+            obj = import_module('.'.join(parts[:i]))
+        except ImportError:
+            continue
+
+        try:
+            for attr in parts[i:]:
+                obj = getattr(obj, attr)
+        except AttributeError:
+            continue
+
+        # functions decorated with @node
+        obj = getattr(obj, '__wrapped__', obj)
+
+        if hasattr(obj, '__code__') and (code_hash(obj) == h):
+            _functions[key] = obj
+            return obj
+
+    raise KeyError(f"Function not in the registry: {key}")
+
+
+def to_table(keys: Iterable[str]) -> Dict[str, str]:
+    """Deduplicated table of key: source, for saving"""
+    return {k: get_source(k) for k in dict.fromkeys(keys)}
+
+
+def save_table(path: str, keys: Iterable[str], group: str = 'FUNCTIONS'):
+    """
+    Add the sources of functions to a table in an hdf5 file, functions that are already in the table
+    are not added again. The table is stored in the columnar layout of ``hdftools``.
+
+    :param path:  path to the hdf5 file
+    :param keys:  keys of the functions
+    :param group: name of the hdf5 group of the table
+    """
+    table = to_table(keys)
+
+    if os.path.isfile(path) and hdftools.is_columnar(path, group):
+        with h5py.File(path, 'r') as f:
+            saved = set(f[group]['columns']['key'].asstr()[()])
+        table = {k: v for k, v in table.items() if k not in saved}
+
+    if len(table) == 0:
+        return
+
+    columns = {
+        'key': np.array(list(table.keys()), dtype=object),
+        'source': np.array(list(table.values()), dtype=object)
+    }
+
+    start = hdftools.get_n_rows(path, group) if os.path.isfile(path) and hdftools.is_columnar(path, group) else 0
+
+    hdftools.append_columns(path, columns, np.arange(start, start + len(table)), key=group)
+
+
+def load_table(path: str, group: str = 'FUNCTIONS') -> List[str]:
+    """
+    Register the sources of a table saved with ``save_table()``.
+
+    :return: keys of the functions in the table
+    """
+    _, columns = hdftools.read_columns(path, group)
+
+    for k, source in zip(columns['key'], columns['source']):
+        register_source(source, key=k)
+
+    return list(columns['key'])
+
+
+def exec_functions(keys: Iterable[str], globals: dict, locals: dict):
+    """
+    Define the functions in a namespace by executing their sources. Sources are compiled once per process and
+    are executed again only if the namespace does not have the function that they define.
+    """
+    for k in dict.fromkeys(keys):
+        if k not in _compiled:
+            _compiled[k] = compile(get_source(k), f"<fcsugar function {k}>", 'exec')
+
+        code = _compiled[k]
+
+        # code objects of the functions defined by the source, the namespace can have been changed since the
+        # source was executed so the functions in it are compared instead of remembering the namespace
+        defined = [c for c in code.co_consts if isinstance(c, type(code))]
+
+        if (len(defined) > 0) and all(_unwrap(locals.get(c.co_name)) is c for c in defined):
+            continue
+
+        exec(code, globals, locals)
+
+
+def _unwrap(func) -> Any:
+    """Code object of a function, or of the function wrapped by decorators such as @node"""
+    while hasattr(func, '__wrapped__'):
+        func = func.__wrapped__
+
+    return getattr(func, '__code__', None)
+
+
+def save_functions(path: str, group: str, functions: Dict[str, str], table: str = 'FUNCTIONS'):
+    """
+    Save the functions of a container. The node name: key mapping is stored as an attribute of the container's
+    group and the sources are added to the table shared by all containers in the file, see ``save_table()``.
+
+    :param path:      path to the hdf5 file
+    :param group:     hdf5 group of the container, must exist
+    :param functions: node name: key of the function, i.e. ``Container._functions``
+    :param table:     name of the hdf5 group of the table
+    """
+    if len(functions) == 0:
+        return
+
+    save_table(path, functions.values(), group=table)
+
+    with h5py.File(path, 'r+') as f:
+        f[group].attrs['functions'] = json.dumps(functions)
+
+
+def load_functions(path: str, group: str, table: str = 'FUNCTIONS') -> Dict[str, str]:
+    """
+    Load the functions of a container saved with ``save_functions()``, the sources are added to the registry.
+
+    :return: node name: key of the function, empty if the container has no saved functions
+    """
+    with h5py.File(path, 'r') as f:
+        if (group not in f.keys()) or ('functions' not in f[group].attrs.keys()) or (table not in f.keys()):
+            return {}
+
+        functions = json.loads(f[group].attrs['functions'])
+
+    load_table(path, group=table)
+
+    return functions
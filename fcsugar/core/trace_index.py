@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (C) 2019 Kushal Kolar
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from typing import *
+import h5py
+import numpy as np
+
+
+METRICS = ('euclidean', 'sbd')
+
+
+class TraceIndex:
+    """
+    Nearest-neighbour index over a block of traces, such as a column of a DataFrameContainer.
+
+    Queries are answered in two steps. Candidates are found by brute force in a low dimensional random
+    projection of the traces, then the candidates are ranked by their exact distance to the query.
+
+    The index keeps a float32 copy of the traces for the exact distances, z-normalized for 'sbd', which takes
+    ``4 * n_traces * trace size`` bytes in memory and is written to the file by ``to_hdf5()``.
+
+    Metrics:
+
+        - ``'euclidean'``: euclidean distance of the traces
+        - ``'sbd'``:       shape-based distance used by k-Shape, 1 - the maximum normalized cross-correlation over all
+                           shifts. Candidates are found with the magnitude spectra of the z-normalized traces, which
+                           do not depend on the shift, and the exact distance is computed with FFTs.
+
+    Example:
+
+    .. code-block:: python
+
+        index = TraceIndex(metric='sbd').fit(container.get_block('_RAW_CURVE'))
+        rows, distances = index.query(trace, k=10)
+    """
+
+    def __init__(self, metric: str = 'euclidean', n_components: int = 64, random_state: Union[int, None] = None):
+        """
+        :param metric:       one of 'euclidean' or 'sbd', see the class docs
+        :param n_components: number of dimensions of the random projection used to find candidates.
+                             More dimensions find the true neighbours more often but make queries slower.
+        :param random_state: seed of the random projection
+        """
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got: {metric}")
+
+        self.metric = metric
+        self.n_components = n_components
+        self.random_state = random_state
+
+        # [n_traces, trace size], traces prepared for the metric, see _prepare()
+        self.traces = None
+
+        # [n_features, n_components] and [n_traces, n_components]
+        self.projection = None
+        self.sketch = None
+
+        # squared norms of the rows of the sketch, computed on the first query
+        self._sketch_norms = None
+
+    def __len__(self) -> int:
+        return 0 if self.traces is None else self.traces.shape[0]
+
+    def fit(self, X: np.ndarray):
+        """
+        Build the index.
+
+        :param X: 2D array of traces, shape [n_traces, trace size]
+        :return:  self
+        """
+        self.traces = self._prepare(np.atleast_2d(X))
+
+        features = self._features(self.traces)
+
+        rng = np.random.default_rng(self.random_state)
+        n_components = min(self.n_components, features.shape[1])
+
+        self.projection = (
+            rng.standard_normal((features.shape[1], n_components)) / np.sqrt(n_components)
+        ).astype(np.float32)
+
+        self.sketch = features @ self.projection
+        self._sketch_norms = None
+
+        return self
+
+    def _prepare(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+
+        if self.metric == 'euclidean':
+            return X
+
+        # z-normalized, as k-Shape does
+        X = X - X.mean(axis=1, keepdims=True)
+        std = X.std(axis=1, keepdims=True)
+
+        return X / np.where(std > 0, std, 1)
+
+    def _features(self, X: np.ndarray) -> np.ndarray:
+        if self.metric == 'euclidean':
+            return X
+
+        S = np.abs(np.fft.rfft(X, axis=1)).astype(np.float32)
+        norms = np.linalg.norm(S, axis=1, keepdims=True)
+
+        return S / np.where(norms > 0, norms, 1)
+
+    def query(self, Q: np.ndarray, k: int = 10, n_candidates: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest traces of one or more query traces.
+
+        :param Q:            query trace, or 2D array of query traces, of the same size as the indexed traces
+        :param k:            number of neighbours
+        :param n_candidates: number of candidates that are ranked by their exact distance, ``max(100 * k, 1000)`` if None.
+                             All traces are ranked if it is larger than the number of traces, which is exact.
+        :return:             (rows, distances) of the neighbours, sorted by distance. Arrays of shape [k] for a
+                             single query or [n_queries, k] for a 2D array of queries.
+        """
+        if self.traces is None:
+            raise ValueError("The index has not been built, call fit() first")
+
+        single = np.ndim(Q) == 1
+        Q = self._prepare(np.atleast_2d(Q))
+
+        if Q.shape[1] != self.traces.shape[1]:
+            raise ValueError(f"Query traces must be of size {self.traces.shape[1]}, got: {Q.shape[1]}")
+
+        n = len(self)
+        k = min(k, n)
+
+        if n_candidates is None:
+            n_candidates = max(100 * k, 1000)
+
+        n_candidates = min(max(n_candidates, k), n)
+
+        if n_candidates < n:
+            # squared euclidean distances in the projection, without the norm of the query which is the same
+            # for all candidates
+            if self._sketch_norms is None:
+                self._sketch_norms = np.einsum('ij,ij->i', self.sketch, self.sketch)
+
+            q_sketch = self._features(Q) @ self.projection
+            d = self._sketch_norms[None, :] - 2 * (q_sketch @ self.sketch.T)
+            candidates = np.argpartition(d, n_candidates - 1, axis=1)[:, :n_candidates]
+        else:
+            candidates = np.broadcast_to(np.arange(n), (Q.shape[0], n))
+
+        rows = np.empty((Q.shape[0], k), dtype=np.int64)
+        distances = np.empty((Q.shape[0], k), dtype=np.float64)
+
+        for i in range(Q.shape[0]):
+            d = self._distances(Q[i], self.traces[candidates[i]])
+            order = np.argsort(d)[:k]
+
+            rows[i] = candidates[i][order]
+            distances[i] = d[order]
+
+        if single:
+            return rows[0], distances[0]
+
+        return rows, distances
+
+    def _distances(self, q: np.ndarray, C: np.ndarray) -> np.ndarray:
+        """Exact distances between a prepared query trace and prepared candidate traces"""
+        if self.metric == 'euclidean':
+            return np.linalg.norm(C - q[None, :], axis=1)
+
+        from scipy import fft
+
+        # zero-padded so the correlation is not circular, scipy.fft keeps float32
+        n_fft = fft.next_fast_len(2 * q.size - 1, real=True)
+
+        # cross-correlation at all shifts, then normalized by the norms
+        F = fft.rfft(C, n_fft, axis=1)
+        F *= np.conj(fft.rfft(q, n_fft))[None, :]
+        cc = fft.irfft(F, n_fft, axis=1)
+
+        norms = np.linalg.norm(C, axis=1) * np.linalg.norm(q)
+        ncc = cc.max(axis=1) / np.where(norms > 0, norms, np.inf)
+
+        return 1 - ncc
+
+    def to_hdf5(self, path: str, key: str):
+        """
+        Save the index to an hdf5 group, an existing group is replaced.
+
+        :param path: path to the hdf5 file
+        :param key:  name of the hdf5 group
+        """
+        with h5py.File(path, 'a') as f:
+            if key in f:
+                del f[key]
+
+            g = f.create_group(key)
+            g.attrs['metric'] = self.metric
+            g.attrs['n_components'] = self.n_components
+            g.attrs['random_state'] = -1 if self.random_state is None else self.random_state
+
+            g.create_dataset('traces', data=self.traces)
+            g.create_dataset('projection', data=self.projection)
+            g.create_dataset('sketch', data=self.sketch)
+
+    @classmethod
+    def from_hdf5(cls, path: str, key: str):
+        """Load an index saved with ``to_hdf5()``"""
+        with h5py.File(path, 'r') as f:
+            g = f[key]
+
+            random_state = int(g.attrs['random_state'])
+            index = cls(
+                metric=str(g.attrs['metric']),
+                n_components=int(g.attrs['n_components']),
+                random_state=None if random_state < 0 else random_state
+            )
+
+            index.traces = g['traces'][()]
+            index.projection = g['projection'][()]
+            index.sketch = g['sketch'][()]
+
+        return index
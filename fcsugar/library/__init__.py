@@ -1,6 +1,7 @@
 from .cluster import *
 from .data import *
 from .misc_math import *
+from .search import *
 from .signal import *
 from .stats import *
 from .transform import *
@@ -18,13 +18,15 @@
 
 
 from ..core import *
+from ..core import cache, executors
 from ..containers import DataFrameContainer
+from .data import _sample_rows
 import numpy as np
-from tslearn.clustering import KShape
+from time import perf_counter
 from typing import *
 
 
-@node
+@node(output_column='KSHAPE_CLUSTER')
 def kshape(container: DataFrameContainer,
            data_column: str,
            n_clusters: int,
@@ -34,8 +36,14 @@ def kshape(container: DataFrameContainer,
            verbose: bool = True,
            random_state: Union[int, None] = None,
            init: np.ndarray = 'random',
-           centroid_seeds: np.ndarray = None):
+           centroid_seeds: np.ndarray = None,
+           fit_size: Union[int, None] = None,
+           fit: bool = True,
+           warm_start: bool = False,
+           early_stop: bool = True):
     """
+    Fitted models are kept in ``cache.models``, executing the node again on the same data with the same fit params
+    reuses the model instead of refitting, such as when only ``verbose`` is changed from the GUI.
 
     :param container:
     :param data_column:
@@ -47,19 +55,165 @@ def kshape(container: DataFrameContainer,
     :param random_state:
     :param init:
     :param centroid_seeds: arrays of shape [n_clusters, ts_size]
+    :param fit_size:       fit on a random sample of this many rows and predict the clusters of all rows,
+                           fit on all rows if None
+    :param fit:            if False, predict with the latest model fit with the same params instead of fitting,
+                           such as for rows appended after the fit. Requires ``config.model_cache_size`` > 0
+    :param warm_start:     initialize from the centroids of the latest model fit with the same params, with a
+                           single init, when the data has changed
+    :param early_stop:     stop the random inits once two of them converge to the best partition, see
+                           ``_fit_kshape_inits()``
     :return:
     """
-    if centroid_seeds is not None:
-        init = np.swapaxes(np.array([centroid_seeds]).T, 0, 1)
+    # imported here since tslearn takes seconds to import
+    from tslearn.clustering import KShape
 
-    ks = KShape(n_clusters=n_clusters, max_iter=max_iter,
-                tol=tol, n_init=n_init, verbose=verbose,
-                random_state=random_state, init=init)
+    X = container.get_block(data_column)
 
-    X = np.vstack(container.dataframe[data_column].values)
+    fit_params = dict(data_column=data_column, n_clusters=n_clusters, max_iter=max_iter, tol=tol, n_init=n_init,
+                      random_state=random_state, init=init, centroid_seeds=centroid_seeds, fit_size=fit_size,
+                      early_stop=early_stop)
 
-    y = ks.fit_predict(X)
+    latest_key = cache.models.key('kshape', fit_params)
+
+    if not fit:
+        ks = cache.models.get(latest_key)
+
+        if ks is None:
+            raise ValueError("No kshape model has been fit with these params, execute with fit=True first. "
+                             "Models are not kept if config.model_cache_size is 0.")
+
+        container.dataframe['KSHAPE_CLUSTER'] = ks.predict(X)
+        return container
+
+    ixs = _sample_rows(X.shape[0], fit_size, random_state)
+    X_fit = X[ixs] if ixs.size < X.shape[0] else X
+
+    key = cache.models.key('kshape', fit_params, X_fit)
+    ks = cache.models.get(key)
+
+    if ks is None:
+        if centroid_seeds is not None:
+            init = np.swapaxes(np.array([centroid_seeds]).T, 0, 1)
+
+        previous = cache.models.get(latest_key) if warm_start else None
+
+        if (previous is not None) and (previous.cluster_centers_.shape[1] == X.shape[1]):
+            init = previous.cluster_centers_
+            n_init = 1
+
+        if (n_init > 1) and isinstance(init, str):
+            ks = _fit_kshape_inits(container, X_fit, n_clusters=n_clusters, max_iter=max_iter, tol=tol,
+                                   n_init=n_init, verbose=verbose, random_state=random_state, init=init,
+                                   early_stop=early_stop)
+        else:
+            ks = KShape(n_clusters=n_clusters, max_iter=max_iter,
+                        tol=tol, n_init=n_init, verbose=verbose,
+                        random_state=random_state, init=init)
+
+            ks.fit(X_fit)
+
+        # the training data is not needed to predict, don't keep it in the cache
+        ks._X_fit = None
+
+    cache.models.put(ks, key, latest_key)
+
+    if X_fit is X:
+        y = ks.labels_
+    else:
+        y = ks.predict(X)
 
     container.dataframe['KSHAPE_CLUSTER'] = y
 
     return container
+
+
+def _same_partition(a: np.ndarray, b: np.ndarray) -> bool:
+    """Whether two label arrays are the same partition, up to the numbering of the clusters"""
+    n_pairs = np.unique(np.stack([a, b]), axis=1).shape[1]
+    return n_pairs == np.unique(a).size == np.unique(b).size
+
+
+def _fit_kshape_inits(container: DataFrameContainer, X: np.ndarray, n_clusters: int, max_iter: int, tol: float,
+                      n_init: int, verbose: bool, random_state: Union[int, None], init: str, early_stop: bool):
+    """
+    Fit kshape with ``n_init`` random inits in parallel with the executor set in ``config.executor``, and keep
+    the model with the lowest inertia. With the process executor the workers are forked, so ``X`` is shared with
+    them instead of being pickled.
+
+    The inits are run in rounds of ``config.n_workers``. With ``early_stop`` no more rounds are started once two
+    inits have converged to the same partition as the best one. Progress is reported after every round with
+    ``Container.report_progress()``, and the inertia, number of iterations and time of each init are added to
+    the node's stats as 'kshape_inits'.
+
+    :return: fitted ``tslearn.clustering.KShape``
+    """
+    from tslearn.clustering import KShape, EmptyClusterError
+
+    # an independent seed for each init
+    seeds = np.random.SeedSequence(random_state).generate_state(n_init)
+
+    def _fit_one(i: int) -> Union[dict, None]:
+        t0 = perf_counter()
+
+        ks = KShape(n_clusters=n_clusters, max_iter=max_iter, tol=tol, n_init=1, verbose=False,
+                    random_state=int(seeds[i]), init=init)
+
+        try:
+            ks.fit(X)
+        except EmptyClusterError:
+            return None
+
+        # tslearn gives up after too many empty clusters and leaves an infinite inertia instead of raising
+        if not np.isfinite(ks.inertia_):
+            return None
+
+        ks._X_fit = None
+
+        return {'model': ks, 'inertia': ks.inertia_, 'n_iter': ks.n_iter_, 'time': perf_counter() - t0}
+
+    round_size = executors.get_n_workers() if executors.get_executor() != 'serial' else 1
+
+    fits = []
+    best = None
+    n_same = 0
+
+    for start in range(0, n_init, round_size):
+        stop = min(start + round_size, n_init)
+
+        results = executors.map_items(lambda i: _fit_one(start + i), stop - start)
+
+        for r in results:
+            if r is None:
+                continue
+
+            fits.append(r)
+
+            if (best is None) or (r['inertia'] < best['inertia']):
+                # the new best counts as the same partition as the previous best if they match
+                n_same = 1 + (n_same if (best is not None) and
+                                        _same_partition(r['model'].labels_, best['model'].labels_) else 0)
+                best = r
+
+            elif _same_partition(r['model'].labels_, best['model'].labels_):
+                n_same += 1
+
+        message = f"kshape: {stop}/{n_init} inits"
+        if best is not None:
+            message += f", best inertia: {best['inertia']:.5f}"
+
+        if verbose:
+            print(message)
+
+        container.report_progress(
+            message,
+            kshape_inits=[{k: v for k, v in r.items() if k != 'model'} for r in fits]
+        )
+
+        if early_stop and (n_same >= 2):
+            break
+
+    if best is None:
+        raise ValueError("kshape failed to converge in all inits because of empty clusters")
+
+    return best['model']
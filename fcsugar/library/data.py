@@ -19,17 +19,26 @@
 
 from fcsugar import *
 from ..containers import DataFrameContainer
+from ..core import config
 import numpy as np
 from typing import *
 
 
-@node
+def _splice(X: np.ndarray, start: int, stop: int) -> np.ndarray:
+    return X[:, start:stop]
+
+
+# lazy containers can read only this slice of the arrays from a file instead of applying the kernel
+_splice.pushdown = lambda start, stop: slice(start, stop)
+
+
+@node(row_local=True, output_column='spliced', kernel=_splice)
 def splice(container: DataFrameContainer, data_column: str, start: int, stop: int):
-    container.dataframe['spliced'] = container.dataframe[data_column].apply(lambda a: a[start:stop])
+    container.map_blocks(lambda X: _splice(X, start, stop), data_column, 'spliced')
     return container
 
 
-@node
+@node(output_column='partition')
 def partition(container: DataFrameContainer, n_partitions: int):
     size = container.dataframe.index.size
 
@@ -62,8 +71,25 @@ def sample_partition(contrainer: DataFrameContainer, data_column: str, labels_co
     return samples
 
 
+def _sample_rows(n_rows: int, size: Union[int, None], random_state: Union[int, None] = None) -> np.ndarray:
+    """
+    Sorted indices of a random subsample of rows, such as the rows a model is fit on.
+
+    :param n_rows:       number of rows
+    :param size:         number of rows in the sample, all rows if None or larger than ``n_rows``
+    :param random_state: seed of the sample
+    :return:             1D array of row indices
+    """
+    if (size is None) or (size >= n_rows):
+        return np.arange(n_rows)
+
+    rng = np.random.default_rng(random_state)
+
+    return np.sort(rng.choice(n_rows, size=size, replace=False))
+
+
 def _pad_arrays(a: np.ndarray, method: str = 'random', output_size: int = None, mode: str = 'minimum',
-               constant: Any = None) -> np.ndarray:
+                constant: Any = None, rng: np.random.Generator = None) -> np.ndarray:
     """
     Pad all the input arrays so that are of the same length. The length is determined by the largest input array.
     The padding value for each input array is the minimum value in that array.
@@ -72,6 +98,10 @@ def _pad_arrays(a: np.ndarray, method: str = 'random', output_size: int = None,
     largest input array (method 'fill-size') or the padding is randomly flanked to the input array (method 'random')
     for easier visualization.
 
+    The lengths and offsets of all arrays are computed at once and the arrays are written into a preallocated
+    2D array with a fancy-indexed assignment per chunk of ``config.chunk_rows`` arrays, which bounds the size of
+    the temporary index arrays.
+
     :param a: 1D array where each element is a 1D array
     :type a: np.ndarray
 
@@ -88,56 +118,86 @@ def _pad_arrays(a: np.ndarray, method: str = 'random', output_size: int = None,
     :param constant: padding value if 'mode' is set to 'constant'
     :type constant: Any
 
+    :param rng: random generator for the offsets of method 'random', a new unseeded generator is used if None
+    :type rng: np.random.Generator
+
     :return: Arrays padded according to the chosen method. 2D array of shape [n_arrays, size of largest input array]
     :rtype: np.ndarray
     """
 
-    l = 0  # size of largest time series
+    if method not in ('random', 'fill-size'):
+        raise ValueError('Must specific method as either "random" or "fill-size"')
+
+    sizes = np.fromiter((c.size for c in a), dtype=np.int64, count=a.size)
 
-    # Get size of largest time series
-    for c in a:
-        s = c.size
-        if s > l:
-            l = s
+    # size of largest time series
+    l = int(sizes.max()) if sizes.size > 0 else 0
 
     if (output_size is not None) and (output_size < l):
         raise ValueError('Output size must be equal to larger than the size of the largest input array')
 
+    if a.size == 0:
+        return np.zeros(shape=(0, l))
+
+    dtype = np.result_type(*set(np.asarray(c).dtype for c in a))
+
+    # offset of the start of each array in the padded output, drawn for all arrays so that they
+    # do not depend on the chunk size
+    if method == 'random':
+        if rng is None:
+            rng = np.random.default_rng()
+
+        # same range as before: [0, l - size), and 0 for arrays of the largest size
+        pre = rng.integers(0, np.maximum(l - sizes, 1))
+    else:
+        pre = np.zeros(a.size, dtype=np.int64)
+
     # pre-allocate output array
-    p = np.zeros(shape=(a.size, l), dtype=a[0].dtype)
+    p = np.empty(shape=(a.size, l), dtype=dtype)
 
-    # pad each 1D time series
-    for i in range(p.shape[0]):
-        s = a[i].size
+    for start in range(0, a.size, config.chunk_rows):
+        stop = min(start + config.chunk_rows, a.size)
+        _pad_chunk(p[start:stop], a[start:stop], sizes[start:stop], pre[start:stop], mode, constant)
 
-        if s == l:
-            p[i, :] = a[i]
-            continue
+    return p
 
-        max_pad_en_ix = l - s
 
-        if method == 'random':
-            pre = np.random.randint(0, max_pad_en_ix)
-        elif method == 'fill-size':
-            pre = 0
-        else:
-            raise ValueError('Must specific method as either "random" or "fill-size"')
+def _pad_chunk(p: np.ndarray, a: np.ndarray, sizes: np.ndarray, pre: np.ndarray, mode: str, constant: Any):
+    """Write a chunk of arrays into their rows ``p`` of the padded output, see ``_pad_arrays()``"""
+    flat = np.concatenate([np.asarray(c).ravel() for c in a]).astype(p.dtype, copy=False)
 
-        post = l - (pre + s)
+    # padding value of each row
+    if mode == 'constant':
+        fill = np.full(a.size, constant)
+    else:
+        fill = np.zeros(a.size, dtype=p.dtype)
+        nonempty = sizes > 0
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        fill[nonempty] = np.minimum.reduceat(flat, starts[nonempty])
 
-        if mode == 'constant':
-            p[i, :] = np.pad(a[i], (pre, post), 'constant', constant_values=constant)
-        else:
-            p[i, :] = np.pad(a[i], (pre, post), 'minimum')
+    p[:] = fill[:, None]
 
-    return p
+    # row and column of every element of the input arrays
+    rows = np.repeat(np.arange(a.size), sizes)
+    cols = np.arange(flat.size) - np.repeat(np.cumsum(sizes) - sizes - pre, sizes)
 
+    p[rows, cols] = flat
 
-@node
-def pad_arrays(container: DataFrameContainer, data_column, method: str = 'random'):
-    data = _pad_arrays(container.dataframe[data_column].values, method=method)
 
-    container.dataframe['pad_arrays'] = data.tolist()
-    container.dataframe['pad_arrays'] = container.dataframe['pad_arrays'].apply(np.array)
+@node(output_column='pad_arrays')
+def pad_arrays(container: DataFrameContainer, data_column, method: str = 'random',
+               random_state: Union[int, None] = None):
+    """
+    :param random_state: seed of the random offsets of method 'random'
+    """
+    rng = np.random.default_rng(random_state)
+
+    if container.is_uniform(data_column):
+        # arrays of equal size have nothing to pad
+        data = container.get_block(data_column).copy()
+    else:
+        data = _pad_arrays(container.dataframe[data_column].values, method=method, rng=rng)
+
+    container.set_block('pad_arrays', data)
 
     return container
@@ -21,13 +21,13 @@ from ..containers import DataFrameContainer
 import numpy as np
 
 
-@node
+@node(row_local=True, output_column='log', kernel=np.log10)
 def log(container: DataFrameContainer, data_column: str):
-    container.dataframe['log'] = container.dataframe[data_column].apply(lambda x: np.log10(x))
+    container.map_blocks(np.log10, data_column, 'log')
     return container
 
 
-@node
+@node(row_local=True, output_column='absval', kernel=np.abs)
 def absval(container: DataFrameContainer, data_column: str):
-    container.dataframe['absval'] = container.dataframe[data_column].apply(lambda x: np.abs(x))
+    container.map_blocks(np.abs, data_column, 'absval')
     return container
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2019 Kushal Kolar
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from ..containers import DataFrameContainer
+from ..core import *
+import pandas as pd
+from typing import Union
+
+
+@node
+def build_index(container: DataFrameContainer, data_column: str, metric: str = 'euclidean', n_components: int = 64,
+                random_state: Union[int, None] = None):
+    """
+    Build a nearest-neighbour index of a column of traces, stored in ``container.indexes`` and saved with the
+    container by ``to_hdf5()``. See ``TraceIndex``. The index keeps a float32 copy of the traces, which takes
+    4 bytes per sample in memory and in the saved file.
+
+    :param data_column:  column of equal-size traces
+    :param metric:       one of 'euclidean' or 'sbd', the shape-based distance used by kshape
+    :param n_components: number of dimensions of the random projection used to find candidates
+    :param random_state: seed of the random projection
+    """
+    index = TraceIndex(metric=metric, n_components=n_components, random_state=random_state)
+
+    container.set_index(data_column, index.fit(container.get_block(data_column)))
+
+    return container
+
+
+@node
+def similar_traces(container: DataFrameContainer, data_column: str, row: int, k: int = 10) -> pd.DataFrame:
+    """
+    Rows with the traces most similar to the trace of a row, using the index built by ``build_index``.
+
+    :param data_column: column that was indexed
+    :param row:         position of the row of the query trace
+    :param k:           number of similar rows, including the row itself
+    :return:            the rows, sorted by their distance which is added as the column 'distance'
+    """
+    index = container.get_index(data_column)
+
+    rows, distances = index.query(container.dataframe[data_column].iloc[row], k=k)
+
+    df = container.dataframe.iloc[rows].copy()
+    df['distance'] = distances
+
+    return df
@@ -18,37 +18,259 @@
 
 
 from fcsugar import *
+from ..core import executors, config
 import numpy as np
-from scipy import signal as scipy_signal
+from typing import Tuple
 from ..containers import DataFrameContainer
-from scipy import fftpack
 
 
 
-@node
+def _normalize(X: np.ndarray) -> np.ndarray:
+    X = X - X.min(axis=1, keepdims=True)
+    return X / X.max(axis=1, keepdims=True)
+
+
+@node(row_local=True, output_column='normalize', kernel=_normalize)
 def normalize(container: DataFrameContainer, data_column: str):
-    func = lambda a: ((a - np.min(a)) / (np.max(a - np.min(a))))
-    container.dataframe['normalize'] = container.dataframe[data_column].apply(func)
+    container.map_blocks(_normalize, data_column, 'normalize')
     return container
 
 
-@node
+def _rfft(X: np.ndarray) -> np.ndarray:
+    from scipy import fftpack
+
+    return fftpack.rfft(X)
+
+
+@node(row_local=True, output_column='fft', kernel=_rfft)
 def rfft(container: DataFrameContainer, data_column: str):
-    data = np.vstack(container.dataframe[data_column].values)
+    container.map_blocks(_rfft, data_column, 'fft')
+    return container
+
+
+def _peak_widths(X: np.ndarray, rel_height: float = 0.5) -> np.ndarray:
+    """
+    Width of the highest peak of each row, same as ``scipy.signal.peak_widths(x, [np.argmax(x)], rel_height)``
+    for every row ``x`` but computed for all rows at once.
+
+    The prominence of the highest peak is its height above the larger of the minimums on either side of it.
+    The width is measured at ``rel_height`` of the prominence below the peak, between the positions where the
+    row crosses that height, with linear interpolation between samples.
+
+    :param X:          2D array, each row is a trace
+    :param rel_height: relative height at which the width is measured, 0.5 for the full width at half prominence
+    :return:           1D array of widths, in samples
+    """
+    X = np.asarray(X, dtype=np.float64)
+    n, size = X.shape
+
+    rows = np.arange(n)
+    ix = np.arange(size)[None, :]
+
+    peak = np.argmax(X, axis=1)
+    peak_height = X[rows, peak]
+
+    # the highest peak has no higher sample on either side, so its bases are the minimums of each side
+    left_min = np.minimum.accumulate(X, axis=1)[rows, peak]
+    right_min = np.minimum.accumulate(X[:, ::-1], axis=1)[rows, size - 1 - peak]
+
+    prominence = peak_height - np.maximum(left_min, right_min)
+    height = peak_height - prominence * rel_height
+
+    below = X <= height[:, None]
+
+    # last sample at or below the height left of the peak, and the first one right of the peak
+    left_cross = below & (ix <= peak[:, None])
+    right_cross = below & (ix >= peak[:, None])
+
+    has_left = left_cross.any(axis=1)
+    has_right = right_cross.any(axis=1)
+
+    i_left = size - 1 - np.argmax(left_cross[:, ::-1], axis=1)
+    i_right = np.argmax(right_cross, axis=1)
+
+    # below the bases, which happens for rel_height > 1, scipy stops at the bases.
+    # scipy takes the minimum closest to the peak as the base.
+    if not has_left.all():
+        left_base = size - 1 - np.argmax(((X == left_min[:, None]) & (ix <= peak[:, None]))[:, ::-1], axis=1)
+        i_left = np.where(has_left, i_left, left_base)
+
+    if not has_right.all():
+        right_base = np.argmax((X == right_min[:, None]) & (ix >= peak[:, None]), axis=1)
+        i_right = np.where(has_right, i_right, right_base)
+
+    # interpolate between the crossing sample and its neighbour towards the peak
+    x_left = X[rows, i_left]
+    x_left_next = X[rows, np.minimum(i_left + 1, size - 1)]
+    interp_left = x_left < height
+    left_ip = i_left + np.where(
+        interp_left,
+        (height - x_left) / np.where(interp_left, x_left_next - x_left, 1),
+        0
+    )
+
+    x_right = X[rows, i_right]
+    x_right_prev = X[rows, np.maximum(i_right - 1, 0)]
+    interp_right = x_right < height
+    right_ip = i_right - np.where(
+        interp_right,
+        (height - x_right) / np.where(interp_right, x_right_prev - x_right, 1),
+        0
+    )
+
+    return right_ip - left_ip
+
+
+def _fft_workers() -> int:
+    # with the thread or process executor the shards are already processed in parallel
+    return executors.get_n_workers() if executors.get_executor() == 'serial' else 1
+
+
+def _fft_input(X: np.ndarray, pad: bool, single_precision: bool) -> Tuple[np.ndarray, int]:
+    """Cast the block and get the FFT length, the next fast length of ``scipy.fft`` if ``pad`` is True"""
+    from scipy import fft
+
+    X = np.asarray(X, dtype=np.float32 if single_precision else None)
+
+    if X.dtype.kind != 'f':
+        X = X.astype(np.float64)
+
+    n = X.shape[1]
 
-    container.dataframe['fft'] = fftpack.rfft(data).tolist()
-    container.dataframe['fft'] = container.dataframe['fft'].apply(np.array)
+    if pad:
+        n = fft.next_fast_len(n, real=True)
 
+    return X, n
+
+
+def _rfft_magnitude(X: np.ndarray, pad: bool = False, single_precision: bool = False) -> np.ndarray:
+    from scipy import fft
+
+    X, n = _fft_input(X, pad, single_precision)
+
+    return np.abs(fft.rfft(X, n=n, axis=1, workers=_fft_workers()))
+
+
+def _log_power_spectrum(X: np.ndarray, pad: bool = False, single_precision: bool = False) -> np.ndarray:
+    from scipy import fft
+
+    X, n = _fft_input(X, pad, single_precision)
+
+    # log10(|F|^2) as 2 * log10(|F|), computed in place on the magnitude, which is cheaper than squaring
+    # the real and imaginary parts
+    S = np.abs(fft.rfft(X, n=n, axis=1, workers=_fft_workers()))
+    np.maximum(S, np.finfo(S.dtype).tiny, out=S)
+    np.log10(S, out=S)
+    S *= 2
+
+    return S
+
+
+def _welch_psd(X: np.ndarray, nperseg: int = 256, single_precision: bool = False) -> np.ndarray:
+    from scipy import signal as scipy_signal
+
+    X, n = _fft_input(X, False, single_precision)
+
+    return scipy_signal.welch(X, nperseg=min(nperseg, n), axis=1)[1]
+
+
+@node(row_local=True, output_column='rfft_magnitude', kernel=_rfft_magnitude)
+def rfft_magnitude(container: DataFrameContainer, data_column: str, pad: bool = False,
+                   single_precision: bool = False):
+    """
+    Magnitude of the real FFT of each trace, using ``scipy.fft`` with ``config.n_workers`` threads.
+    Equivalent to ``rfft >> absval`` but with the standard complex output of ``scipy.fft.rfft`` instead of the
+    packed format of ``scipy.fftpack``, so each output has ``n // 2 + 1`` frequencies.
+
+    :param data_column:      column of traces
+    :param pad:              zero-pad the traces to the next fast FFT length, see ``scipy.fft.next_fast_len``
+    :param single_precision: compute in float32, which is about twice as fast
+    """
+    container.map_blocks(
+        lambda X: _rfft_magnitude(X, pad=pad, single_precision=single_precision),
+        data_column,
+        'rfft_magnitude'
+    )
+    return container
+
+
+@node(row_local=True, output_column='log_power_spectrum', kernel=_log_power_spectrum)
+def log_power_spectrum(container: DataFrameContainer, data_column: str, pad: bool = False,
+                       single_precision: bool = False):
+    """
+    log10 of the power spectrum of each trace, the FFT, power and log are computed in a single pass over
+    each block. The magnitude is clipped to the smallest positive float so that zero power does not give -inf.
+
+    :param data_column:      column of traces
+    :param pad:              zero-pad the traces to the next fast FFT length, see ``scipy.fft.next_fast_len``
+    :param single_precision: compute in float32, which is about twice as fast
+    """
+    container.map_blocks(
+        lambda X: _log_power_spectrum(X, pad=pad, single_precision=single_precision),
+        data_column,
+        'log_power_spectrum'
+    )
+    return container
+
+
+@node(row_local=True, output_column='welch_psd', kernel=_welch_psd)
+def welch_psd(container: DataFrameContainer, data_column: str, nperseg: int = 256, single_precision: bool = False):
+    """
+    Power spectral density of each trace using Welch's method, see ``scipy.signal.welch``.
+
+    :param data_column:      column of traces
+    :param nperseg:          length of each segment, limited to the length of the traces
+    :param single_precision: compute in float32
+    """
+    container.map_blocks(
+        lambda X: _welch_psd(X, nperseg=nperseg, single_precision=single_precision),
+        data_column,
+        'welch_psd'
+    )
     return container
 
 
 @node
-def sort_peak_widths(container: DataFrameContainer, data_column: str):
-    peaks = container.dataframe[data_column]
-    widths = [scipy_signal.peak_widths(p, [np.argmax(p)])[0][0] for p in peaks]
+def sort_peak_widths(container: DataFrameContainer, data_column: str, permutation_only: bool = False):
+    """
+    Sort the rows by the width of the highest peak of each trace, see ``_peak_widths()``.
+
+    :param data_column:      column of traces
+    :param permutation_only: do not reorder the DataFrame, only add the sort order of the rows as
+                             the column 'peak_widths_sorter'
+    """
+    values = container.dataframe[data_column].values
+
+    if container.is_uniform(data_column):
+        block = container.get_block(data_column)
+
+        # in chunks to bound the size of the temporary arrays
+        def _widths(start: int, stop: int) -> np.ndarray:
+            return np.concatenate(
+                [_peak_widths(block[i:min(i + config.chunk_rows, stop)])
+                 for i in range(start, stop, config.chunk_rows)] + [np.empty(0)]
+            )
+
+        widths = np.concatenate(executors.map_shards(_widths, values.size))
+
+    else:
+        # rows of the same size are processed together
+        sizes = np.fromiter(map(np.size, values), dtype=np.int64, count=len(values))
+        widths = np.empty(len(values), dtype=np.float64)
+
+        for size in np.unique(sizes):
+            ixs = np.flatnonzero(sizes == size)
+
+            for start in range(0, ixs.size, config.chunk_rows):
+                chunk = ixs[start:start + config.chunk_rows]
+                widths[chunk] = _peak_widths(np.stack(values[chunk]))
 
     width_sorter = np.argsort(widths)
 
+    if permutation_only:
+        container.dataframe['peak_widths_sorter'] = width_sorter
+        return container
+
     container.dataframe = container.dataframe.reindex(index=width_sorter).reset_index(drop=True)
 
     return container
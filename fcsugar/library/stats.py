@@ -18,12 +18,21 @@
 
 
 from ..core import *
-from scipy.stats import zscore as _zscore
 import numpy as np
 from ..containers import DataFrameContainer
 
 
-@node
+def _zscore_block(X: np.ndarray, axis: int = None) -> np.ndarray:
+    # each element is a 1D array, so axis None, 0 or -1 of an element is a row of the block
+    if axis not in (None, 0, -1):
+        raise ValueError(f"axis must be one of None, 0 or -1 for 1D arrays, got: {axis}")
+
+    from scipy.stats import zscore as _zscore
+
+    return _zscore(X, axis=1)
+
+
+@node(row_local=True, output_column='zscore', kernel=_zscore_block)
 def zscore(container: DataFrameContainer, data_column: str, axis: int = None):
-    container.dataframe['zscore'] = container.dataframe[data_column].apply(lambda a: _zscore(a, axis=axis))
+    container.map_blocks(lambda X: _zscore_block(X, axis), data_column, 'zscore')
     return container
@@ -19,20 +19,64 @@
 
 from ..containers import DataFrameContainer
 from ..core import *
-import numpy as np
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+from ..core import cache
+from .data import _sample_rows
+from typing import Union
 
 
-@node
-def LDA(container: DataFrameContainer, data_column: str, labels_column: str, n_components: int):
-    X = np.vstack(container.dataframe[data_column].values)
-    y = container.dataframe[labels_column]
+@node(output_column='lda_transform')
+def LDA(container: DataFrameContainer, data_column: str, labels_column: str, n_components: int,
+        fit_size: Union[int, None] = None, random_state: Union[int, None] = None, fit: bool = True):
+    """
+    Fitted models are kept in ``cache.models``. The model is fit with all components and the transform is cut
+    to ``n_components``, so changing ``n_components`` or executing again on the same data reuses the model.
 
-    lda = LinearDiscriminantAnalysis(n_components=n_components)
+    :param data_column:   column of traces
+    :param labels_column: column of class labels
+    :param n_components:  number of components of the transform
+    :param fit_size:      fit on a random sample of this many rows and transform all rows, fit on all rows if None
+    :param random_state:  seed of the random sample of rows
+    :param fit:           if False, transform with the latest model fit with the same params instead of fitting,
+                          such as for rows appended after the fit. Requires ``config.model_cache_size`` > 0
+    """
+    # imported here since sklearn takes seconds to import
+    from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
 
-    X_ = lda.fit_transform(X, y)
+    X = container.get_block(data_column)
 
-    container.dataframe['lda_transform'] = X_.tolist()
-    container.dataframe['lda_transform'] = container.dataframe['lda_transform'].apply(np.array)
+    fit_params = dict(data_column=data_column, labels_column=labels_column, fit_size=fit_size, random_state=random_state)
+
+    latest_key = cache.models.key('LDA', fit_params)
+
+    if not fit:
+        lda = cache.models.get(latest_key)
+
+        if lda is None:
+            raise ValueError("No LDA model has been fit with these params, execute with fit=True first. "
+                             "Models are not kept if config.model_cache_size is 0.")
+
+    else:
+        ixs = _sample_rows(X.shape[0], fit_size, random_state)
+
+        X_fit = X[ixs] if ixs.size < X.shape[0] else X
+        y = container.dataframe[labels_column].values[ixs]
+
+        key = cache.models.key('LDA', fit_params, (X_fit, y))
+        lda = cache.models.get(key)
+
+        if lda is None:
+            lda = LinearDiscriminantAnalysis()
+            lda.fit(X_fit, y)
+
+        cache.models.put(lda, key, latest_key)
+
+    # the components of the svd solver are in order of explained variance, the first n_components of a fit with
+    # all components are the same as a fit with n_components
+    if n_components > min(X.shape[1], lda.classes_.size - 1):
+        raise ValueError("n_components cannot be larger than min(n_features, n_classes - 1).")
+
+    X_ = lda.transform(X)[:, :n_components]
+
+    container.set_block('lda_transform', X_)
 
     return container
@@ -1,4 +1,3 @@
-from matplotlib import cm as matplotlib_color_map
 from typing import *
 import numpy as np
 from collections import OrderedDict
@@ -40,6 +39,9 @@ def make_colormap(n_colors: int, cmap: str = 'hsv', output: str = 'bokeh',
     if alpha < 0.0 or alpha > 1.0:
         raise ValueError('alpha must be within 0.0 and 1.0')
 
+    # imported here so that importing fcsugar.plotting does not import matplotlib
+    from matplotlib import cm as matplotlib_color_map
+
     cm = matplotlib_color_map.get_cmap(cmap)
     cm._init()
 
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# no widgets in tests, also inherited by the subprocesses that tests start
+os.environ['FCSUGAR_HEADLESS'] = '1'
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,47 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, node
+
+
+@node
+def increment(container, value: int = 1):
+    container.dataframe['count'] += value
+    return container
+
+
+@node
+def allocate(container, n_bytes: int = 0):
+    container.dataframe.attrs['buffer'] = np.ones(n_bytes, dtype=np.uint8)
+    return container
+
+
+def _container():
+    return DataFrameContainer(pd.DataFrame({'count': np.zeros(5, dtype=np.int64)}), status_widget=False)
+
+
+def test_pipeline_longer_than_recursion_limit():
+    n = sys.getrecursionlimit() + 100
+
+    container = _container()
+    for _ in range(n):
+        container >> increment()
+
+    container.execute_pipeline()
+
+    assert (container.dataframe['count'] == n).all()
+    assert len(container.node_stats) == n
+    assert container.pipeline == []
+
+
+def test_node_stats():
+    container = _container()
+    container >> increment(2) >> allocate(n_bytes=10 * 1024 ** 2)
+    container.execute_pipeline(trace_memory=True)
+
+    assert [s['node'] for s in container.node_stats] == ['increment', 'allocate']
+    assert all(s['wall_time'] >= 0 for s in container.node_stats)
+    assert container.node_stats[1]['peak_memory'] >= 10 * 1024 ** 2
+    assert (container.dataframe['count'] == 2).all()
@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, node
+from fcsugar.core import TraceIndex
+from fcsugar.core.cache import NodeCache, sizeof
+from fcsugar.core.history import CACHED, EXECUTED
+from fcsugar.library import splice, normalize
+
+calls = []
+
+
+@node
+def count(container, value: int = 0):
+    calls.append(value)
+    return container
+
+
+def _container(n=50):
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(n)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((n, 100)))
+    return container
+
+
+def test_hit_and_miss():
+    container = _container()
+    container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced') >> count(value=1)
+
+    container.execute_pipeline(clear=False)
+    assert container.history.status == [EXECUTED] * 3
+
+    # nothing changed, every node is cached
+    calls.clear()
+    container.execute_pipeline(clear=False)
+    assert container.history.status[-3:] == [CACHED] * 3
+    assert calls == []
+
+    # a changed param invalidates its node and the nodes after it
+    container.pipeline[1].params['data_column'] = '_RAW_CURVE'
+    container.execute_pipeline(clear=False)
+    assert container.history.status[-3:] == [CACHED, EXECUTED, EXECUTED]
+    assert calls == [1]
+
+
+def test_shared_arrays_are_counted_once():
+    block = np.zeros((100, 1000))
+    rows = np.empty(100, dtype=object)
+    for i in range(100):
+        rows[i] = block[i]
+
+    # the rows are views of the block
+    assert sizeof(rows) == rows.nbytes + block.nbytes
+
+    df = pd.DataFrame({'a': rows, 'b': np.arange(100.0)})
+
+    cache = NodeCache(max_bytes=3 * block.nbytes)
+
+    # shallow copies, as get_state() makes after each node
+    for i in range(10):
+        state = df.copy(deep=False)
+        state[f'c{i}'] = np.arange(100.0)
+        cache.put(str(i), {'dataframe': state})
+
+    assert len(cache) == 10
+    assert cache.nbytes < 2 * block.nbytes
+
+    # evicting all results frees all arrays
+    cache.clear()
+    assert cache.nbytes == 0
+
+
+def test_eviction_frees_arrays_of_evicted_results_only():
+    a, b, c = np.zeros(1000), np.zeros(1000), np.zeros(1000)
+    cache = NodeCache(max_bytes=2 * a.nbytes + 200)
+
+    cache.put('1', [a])
+    cache.put('2', [a, b])
+    assert cache.nbytes == a.nbytes + b.nbytes
+
+    # evicting '1' does not free a, which is still held by '2', so '2' is also evicted
+    cache.put('3', [c])
+    assert ('1' not in cache) and ('2' not in cache) and ('3' in cache)
+    assert cache.nbytes == c.nbytes
+
+
+def test_trace_index_arrays_are_counted():
+    X = np.random.default_rng(0).standard_normal((500, 100))
+    index = TraceIndex(n_components=16, random_state=0).fit(X)
+
+    arrays = index.traces.nbytes + index.projection.nbytes + index.sketch.nbytes
+    assert sizeof(index) >= arrays
+    assert sizeof({'index': index, 'traces': index.traces}) == sizeof(index)
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer
+from fcsugar.core.history import EXECUTED, RESUMED
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = textwrap.dedent(
+    """
+    import sys
+    from fcsugar import DataFrameContainer
+    from fcsugar.library import splice, normalize
+
+    container = DataFrameContainer.from_hdf5(sys.argv[1], status_widget=False)
+    container.set_checkpoints(sys.argv[2])
+    container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced')
+    container.execute_pipeline(resume=True)
+
+    print(','.join(container.history.status))
+    """
+)
+
+
+def _run(data_path, checkpoint_dir):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    out = subprocess.run(
+        [sys.executable, '-c', SCRIPT, data_path, checkpoint_dir],
+        env=env, check=True, capture_output=True, text=True
+    )
+    return out.stdout.strip().splitlines()[-1].split(',')
+
+
+def _save_input(path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'_RAW_CURVE': list(rng.random((20, 100)))})
+    DataFrameContainer(df, status_widget=False).to_hdf5(path)
+
+
+def test_fingerprint_same_data_loaded_twice(tmp_path):
+    path = str(tmp_path / 'input.h5')
+    _save_input(path)
+
+    a = DataFrameContainer.from_hdf5(path, status_widget=False)
+    b = DataFrameContainer.from_hdf5(path, status_widget=False)
+
+    assert a.fingerprint() == b.fingerprint()
+
+
+def test_resume_in_fresh_process(tmp_path):
+    path = str(tmp_path / 'input.h5')
+    checkpoints = str(tmp_path / 'checkpoints')
+    _save_input(path)
+
+    assert _run(path, checkpoints) == [EXECUTED, EXECUTED]
+    files = sorted(os.listdir(checkpoints))
+
+    assert _run(path, checkpoints) == [RESUMED, RESUMED]
+    assert sorted(os.listdir(checkpoints)) == files
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import DataFrameContainer
+from fcsugar.library.cluster import _fit_kshape_inits
+
+
+def _fit(X, **kwargs):
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(len(X))}), status_widget=False)
+    params = dict(n_clusters=2, max_iter=5, tol=1e-6, n_init=2, verbose=False, random_state=0, init='random',
+                  early_stop=False)
+    params.update(kwargs)
+    return _fit_kshape_inits(container, X, **params)
+
+
+def test_errors_other_than_empty_clusters_are_raised():
+    X = np.random.default_rng(0).standard_normal((10, 20))
+
+    # an init of the wrong shape is a bug of the caller, not a failed init
+    with pytest.raises(Exception) as e:
+        _fit(X, init=np.zeros((3, 5, 1)))
+
+    assert 'empty clusters' not in str(e.value)
+
+
+def test_empty_clusters_fail_every_init():
+    # identical traces, every init has empty clusters
+    X = np.repeat(np.random.default_rng(0).standard_normal((1, 20)), 6, axis=0)
+
+    with pytest.raises(ValueError, match='empty clusters'):
+        _fit(X, n_clusters=4)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import ArrayContainer, DataFrameContainer
+from fcsugar.library import build_index, splice
+
+
+def _container(n=20):
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(n)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((n, 100)))
+    return container
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    container = _container()
+    container >> splice('_RAW_CURVE', 0, 50)
+    container.execute_pipeline()
+    container.to_hdf5(path)
+
+    loaded = DataFrameContainer.from_hdf5(path, status_widget=False)
+
+    assert list(loaded.dataframe.columns) == ['cell', '_RAW_CURVE', 'spliced']
+    np.testing.assert_array_equal(loaded.get_block('spliced'), container.get_block('spliced'))
+    assert list(loaded.functions.keys()) == ['splice']
+
+
+def test_empty_container(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    empty = DataFrameContainer(pd.DataFrame({'cell': np.array([], dtype=np.int64)}), status_widget=False)
+    empty.to_hdf5(path)
+
+    loaded = DataFrameContainer.from_hdf5(path, status_widget=False)
+    assert len(loaded.dataframe) == 0
+    assert list(loaded.dataframe.columns) == ['cell']
+
+
+def test_datetime_and_multiindex(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    df = pd.DataFrame({
+        'time': pd.date_range('2020-01-01', periods=4, freq='s'),
+        'value': np.arange(4.0)
+    }, index=pd.MultiIndex.from_product([['a', 'b'], [0, 1]]))
+
+    DataFrameContainer(df, status_widget=False).to_hdf5(path)
+
+    loaded = DataFrameContainer.from_hdf5(path, status_widget=False)
+    pd.testing.assert_frame_equal(loaded.dataframe, df)
+
+    # the table layout cannot be appended to
+    with pytest.raises(TypeError):
+        DataFrameContainer(df, status_widget=False).to_hdf5(path, append=True)
+
+
+def test_indexes_are_not_loaded_with_slices(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    container = _container()
+    container >> build_index('_RAW_CURVE', random_state=0)
+    container.execute_pipeline()
+    container.to_hdf5(path)
+
+    assert '_RAW_CURVE' in DataFrameContainer.from_hdf5(path, status_widget=False).indexes
+
+    sliced = DataFrameContainer.from_hdf5(path, slices={'_RAW_CURVE': slice(0, 50)}, status_widget=False)
+    assert sliced.get_block('_RAW_CURVE').shape == (20, 50)
+    assert len(sliced.indexes) == 0
+
+
+@pytest.mark.parametrize('mmap', [False, True])
+@pytest.mark.parametrize('with_labels', [False, True])
+def test_array_container_round_trip(tmp_path, mmap, with_labels):
+    path = str(tmp_path / 'array.h5')
+
+    rng = np.random.default_rng(0)
+    array = rng.standard_normal((10, 50))
+    labels = rng.integers(0, 3, size=array.shape) if with_labels else None
+
+    ArrayContainer(array, labels, status_widget=False).to_hdf5(path)
+    loaded = ArrayContainer.from_hdf5(path, mmap=mmap, status_widget=False)
+
+    np.testing.assert_array_equal(loaded.array, array)
+    assert loaded.is_memmap == mmap
+
+    if with_labels:
+        np.testing.assert_array_equal(loaded.labels, labels)
+    else:
+        assert loaded.labels is None
+
+
+def test_get_block_stacks_once():
+    rng = np.random.default_rng(0)
+    traces = [rng.standard_normal(100) for _ in range(20)]
+    container = DataFrameContainer(pd.DataFrame({'_RAW_CURVE': traces}), status_widget=False)
+
+    block = container.get_block('_RAW_CURVE')
+    np.testing.assert_array_equal(block, np.stack(traces))
+
+    # the rows are replaced by views of the block, which is then returned without copying
+    assert container.get_block('_RAW_CURVE') is block
+    assert all(np.shares_memory(row, block) for row in container.dataframe['_RAW_CURVE'])
+
+
+def test_set_block_rows_are_views():
+    container = _container()
+    block = container.get_block('_RAW_CURVE')
+
+    assert container.dataframe['_RAW_CURVE'].iloc[3].base is block
+    np.testing.assert_array_equal(container.dataframe['_RAW_CURVE'].iloc[3], block[3])
+
+
+def test_block_is_restacked_after_reordering():
+    container = _container()
+    block = container.get_block('_RAW_CURVE')
+
+    container.dataframe = container.dataframe.iloc[::-1].reset_index(drop=True)
+    reordered = container.get_block('_RAW_CURVE')
+
+    assert reordered is not block
+    np.testing.assert_array_equal(reordered, block[::-1])
+
+
+def test_get_block_of_ragged_column():
+    container = DataFrameContainer(pd.DataFrame({'a': [np.zeros(3), np.zeros(4)]}), status_widget=False)
+
+    assert not container.is_uniform('a')
+    with pytest.raises(ValueError):
+        container.get_block('a')
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import config
+from fcsugar.library import pad_arrays
+from fcsugar.library.data import _pad_arrays
+
+
+def _ragged(n=25, seed=0):
+    rng = np.random.default_rng(seed)
+    a = np.empty(n, dtype=object)
+    for i in range(n):
+        a[i] = rng.standard_normal(rng.integers(20, 60))
+    a[3] = rng.standard_normal(60)
+    return a
+
+
+def _reference(a, pre, mode='minimum', constant=None):
+    # padding of each array with np.pad
+    l = max(c.size for c in a)
+    kwargs = dict(constant_values=constant) if mode == 'constant' else {}
+    return np.stack([np.pad(c, (p, l - c.size - p), mode, **kwargs) for c, p in zip(a, pre)])
+
+
+@pytest.mark.parametrize('chunk_rows', [4, 1000])
+@pytest.mark.parametrize('mode, constant', [('minimum', None), ('constant', -1.0)])
+def test_random_offsets(monkeypatch, chunk_rows, mode, constant):
+    monkeypatch.setattr(config, 'chunk_rows', chunk_rows)
+
+    a = _ragged()
+    sizes = np.array([c.size for c in a])
+
+    # the offsets are drawn for all arrays at once, the same for any chunk size
+    pre = np.random.default_rng(0).integers(0, np.maximum(sizes.max() - sizes, 1))
+
+    padded = _pad_arrays(a, method='random', mode=mode, constant=constant, rng=np.random.default_rng(0))
+    np.testing.assert_array_equal(padded, _reference(a, pre, mode, constant))
+
+
+@pytest.mark.parametrize('chunk_rows', [4, 1000])
+def test_fill_size(monkeypatch, chunk_rows):
+    monkeypatch.setattr(config, 'chunk_rows', chunk_rows)
+
+    a = _ragged()
+    padded = _pad_arrays(a, method='fill-size')
+
+    np.testing.assert_array_equal(padded, _reference(a, np.zeros(a.size, dtype=int)))
+
+
+def test_pad_arrays_node_is_seeded():
+    def run(random_state):
+        container = DataFrameContainer(pd.DataFrame({'trace': _ragged()}), status_widget=False)
+        container >> pad_arrays('trace', random_state=random_state)
+        container.execute_pipeline()
+        return container.get_block('pad_arrays')
+
+    np.testing.assert_array_equal(run(0), run(0))
+    assert not np.array_equal(run(0), run(1))
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import zscore as scipy_zscore
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import config
+from fcsugar.library import absval, log, normalize, splice, zscore
+
+# log10 of the negative values is nan for both
+pytestmark = pytest.mark.filterwarnings('ignore:invalid value encountered in log10')
+
+# node, output column, the per-row function the node replaced
+ELEMENTWISE = [
+    (splice('_RAW_CURVE', 10, 60), 'spliced', lambda a: a[10:60]),
+    (normalize('_RAW_CURVE'), 'normalize', lambda a: (a - np.min(a)) / np.max(a - np.min(a))),
+    (zscore('_RAW_CURVE'), 'zscore', lambda a: scipy_zscore(a)),
+    (log('_RAW_CURVE'), 'log', np.log10),
+    (absval('_RAW_CURVE'), 'absval', np.abs),
+]
+
+
+def _traces(sizes, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.uniform(0.5, 2.0, size) * rng.choice([-1, 1], size) for size in sizes]
+
+
+def _run(traces, node):
+    rows = np.empty(len(traces), dtype=object)
+    for i, t in enumerate(traces):
+        rows[i] = t
+
+    container = DataFrameContainer(pd.DataFrame({'_RAW_CURVE': rows}), status_widget=False)
+    container >> node
+    container.execute_pipeline()
+    return container
+
+
+@pytest.mark.parametrize('node, column, func', ELEMENTWISE)
+def test_uniform_column(node, column, func):
+    traces = _traces([100] * 30)
+    container = _run(traces, node)
+
+    expected = np.stack([func(t) for t in traces])
+    np.testing.assert_allclose(container.get_block(column), expected)
+
+
+@pytest.mark.parametrize('node, column, func', ELEMENTWISE)
+def test_ragged_column(node, column, func, monkeypatch):
+    # rows of the same size are processed together, in chunks
+    monkeypatch.setattr(config, 'chunk_rows', 4)
+
+    traces = _traces([100, 80, 100, 120, 80, 100, 100, 100, 100, 120])
+    container = _run(traces, node)
+
+    for out, t in zip(container.dataframe[column].values, traces):
+        np.testing.assert_allclose(out, func(t))
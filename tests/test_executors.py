@@ -0,0 +1,34 @@
+import threading
+
+import numpy as np
+
+from fcsugar.core import config, executors
+
+
+def test_concurrent_process_maps_use_their_own_function():
+    previous = config.n_workers
+    config.n_workers = 2
+
+    results = {}
+
+    def run(offset):
+        # closures that cannot be pickled, each map must call its own
+        data = np.arange(20) + offset
+        results[offset] = [
+            executors.map_items(lambda i: int(data[i]), len(data), executor='process'),
+            sum(executors.map_shards(lambda start, stop: [int(x) for x in data[start:stop]], len(data),
+                                     executor='process'), [])
+        ]
+
+    try:
+        threads = [threading.Thread(target=run, args=(offset,)) for offset in (0, 1000, 2000)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        config.n_workers = previous
+
+    for offset in (0, 1000, 2000):
+        expected = list(range(offset, offset + 20))
+        assert results[offset] == [expected, expected]
@@ -0,0 +1,193 @@
+import h5py
+import numpy as np
+import pytest
+
+from fcsugar.core import hdftools
+
+
+def _columns(n, size=100, start=0):
+    rng = np.random.default_rng(start)
+    return {
+        'trace': rng.standard_normal((n, size)),
+        'ragged': np.array([rng.standard_normal(10 + i) for i in range(n)] + [None], dtype=object)[:-1],
+        'value': np.arange(start, start + n, dtype=np.float64),
+        'name': np.array([f'cell_{i}' for i in range(start, start + n)], dtype=object),
+    }
+
+
+def test_append_read_round_trip(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    first, second = _columns(5), _columns(3, start=5)
+    hdftools.append_columns(path, first, np.arange(5))
+    hdftools.append_columns(path, second, np.arange(5, 8))
+
+    index, data = hdftools.read_columns(path)
+
+    assert hdftools.get_n_rows(path) == 8
+    np.testing.assert_array_equal(index, np.arange(8))
+    np.testing.assert_array_equal(data['trace'], np.concatenate([first['trace'], second['trace']]))
+    np.testing.assert_array_equal(data['value'], np.arange(8))
+    assert list(data['name']) == [f'cell_{i}' for i in range(8)]
+
+    for a, b in zip(data['ragged'], np.concatenate([first['ragged'], second['ragged']])):
+        np.testing.assert_array_equal(a, b)
+
+    # subsets of rows and columns
+    index, data = hdftools.read_columns(path, columns=['value'], start=2, stop=6)
+    np.testing.assert_array_equal(index, np.arange(2, 6))
+    assert list(data.keys()) == ['value']
+
+
+def test_bad_append_leaves_file_unchanged(tmp_path):
+    path = str(tmp_path / 'data.h5')
+    hdftools.append_columns(path, _columns(5), np.arange(5))
+
+    # str values in a numeric column, the other columns are valid and must not be written
+    bad = _columns(2, start=5)
+    bad['value'] = np.array(['a', 'b'], dtype=object)
+
+    with pytest.raises(TypeError):
+        hdftools.append_columns(path, bad, np.arange(5, 7))
+
+    with h5py.File(path, 'r') as f:
+        assert f['DATAFRAME']['index'].shape[0] == 5
+        assert f['DATAFRAME']['columns']['trace'].shape[0] == 5
+
+    index, data = hdftools.read_columns(path)
+    np.testing.assert_array_equal(index, np.arange(5))
+    assert data['trace'].shape == (5, 100)
+
+    # a later valid append continues after the stored rows
+    hdftools.append_columns(path, _columns(2, start=5), np.arange(5, 7))
+    index, _ = hdftools.read_columns(path)
+    np.testing.assert_array_equal(index, np.arange(7))
+
+
+def test_read_ignores_rows_past_n_rows(tmp_path):
+    path = str(tmp_path / 'data.h5')
+    hdftools.append_columns(path, _columns(5), np.arange(5))
+
+    # as left by an append that failed before n_rows was updated
+    with h5py.File(path, 'a') as f:
+        f['DATAFRAME']['index'].resize(7, axis=0)
+
+    index, data = hdftools.read_columns(path)
+    np.testing.assert_array_equal(index, np.arange(5))
+    assert len(data['value']) == 5
+
+
+def test_chunks_do_not_depend_on_first_batch(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    for i in range(3):
+        hdftools.append_columns(path, _columns(1, start=i), np.arange(i, i + 1))
+
+    with h5py.File(path, 'r') as f:
+        columns = f['DATAFRAME']['columns']
+        assert columns['trace'].chunks[0] > 1
+        assert columns['value'].chunks[0] > 1
+
+
+def test_ragged_append_to_array_column(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    first = _columns(4)
+    hdftools.append_columns(path, first, np.arange(4))
+
+    # longer traces than the stored 2D dataset, the column is converted to variable length
+    second = _columns(2, size=120, start=4)
+    hdftools.append_columns(path, second, np.arange(4, 6))
+
+    with h5py.File(path, 'r') as f:
+        assert f['DATAFRAME']['columns']['trace'].attrs['kind'] == 'vlen'
+
+    _, data = hdftools.read_columns(path, columns=['trace'])
+    expected = list(first['trace']) + list(second['trace'])
+
+    assert [t.size for t in data['trace']] == [100] * 4 + [120] * 2
+    for a, b in zip(data['trace'], expected):
+        np.testing.assert_array_equal(a, b)
+
+
+def test_explicit_vlen_layout(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    hdftools.append_columns(path, _columns(3), np.arange(3), layouts={'trace': 'vlen'})
+
+    with h5py.File(path, 'r') as f:
+        assert f['DATAFRAME']['columns']['trace'].attrs['kind'] == 'vlen'
+
+    _, data = hdftools.read_columns(path, columns=['trace'])
+    assert [t.size for t in data['trace']] == [100] * 3
+
+
+def _metadata():
+    return {
+        'n_frames': 3000,
+        'fps': 30.5,
+        'n_cells': 50,
+        'name': 'experiment',
+        'spectrum': np.linspace(0, 1, 20),
+        'stimulus': {'onset': 10, 'offset': 20, 'name': 'flash'},
+        # per-trace parameter dicts with the same keys are packed into records
+        'params': {f'cell_{i}': {'tau': 0.1 * i, 'n_spikes': i} for i in range(50)},
+    }
+
+
+def _assert_dict_equal(loaded, expected):
+    assert set(loaded.keys()) == set(expected.keys())
+
+    for k, v in expected.items():
+        if isinstance(v, dict):
+            _assert_dict_equal(loaded[k], v)
+        elif isinstance(loaded[k], bytes):
+            # str leaves that are not packed are read as bytes by h5py
+            assert loaded[k].decode() == v
+        else:
+            np.testing.assert_array_equal(loaded[k], v)
+
+
+def _n_datasets(path):
+    datasets = []
+    with h5py.File(path, 'r') as f:
+        f.visititems(lambda name, item: datasets.append(name) if isinstance(item, h5py.Dataset) else None)
+    return len(datasets)
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_dict_round_trip(tmp_path, bulk):
+    path = str(tmp_path / 'meta.h5')
+    hdftools.save_dict(_metadata(), path, group='META', bulk=bulk)
+
+    _assert_dict_equal(hdftools.load_dict(path, 'META'), _metadata())
+
+    with hdftools.load_dict(path, 'META', lazy=True) as lazy:
+        _assert_dict_equal(lazy, _metadata())
+        _assert_dict_equal(lazy.to_dict(), _metadata())
+
+        assert lazy['params']['cell_7'] == _metadata()['params']['cell_7']
+
+
+def test_bulk_packs_scalars(tmp_path):
+    path, bulk_path = str(tmp_path / 'meta.h5'), str(tmp_path / 'bulk.h5')
+
+    hdftools.save_dict(_metadata(), path, group='META')
+    hdftools.save_dict(_metadata(), bulk_path, group='META', bulk=True)
+
+    assert _n_datasets(bulk_path) < 10 < _n_datasets(path)
+
+
+def test_update_packed_dict(tmp_path):
+    path = str(tmp_path / 'meta.h5')
+    hdftools.save_dict(_metadata(), path, group='META', bulk=True)
+
+    update = {'fps': 60.0, 'params': {'cell_3': {'tau': -1.0, 'n_spikes': 0}}, 'stimulus': {'onset': 5}}
+    hdftools.update_dict(update, path, group='META', bulk=True)
+
+    expected = _metadata()
+    expected['fps'] = 60.0
+    expected['params']['cell_3'] = {'tau': -1.0, 'n_spikes': 0}
+    expected['stimulus']['onset'] = 5
+
+    _assert_dict_equal(hdftools.load_dict(path, 'META'), expected)
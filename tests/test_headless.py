@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import sys
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import config
+from fcsugar.library import *
+
+{setup}
+
+container = DataFrameContainer(pd.DataFrame({{'cell': np.arange(10)}}))
+container.set_block('_RAW_CURVE', np.random.default_rng(0).standard_normal((10, 100)))
+container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced') >> absval('normalize')
+container.execute_pipeline()
+
+assert container.status_widget is None
+print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}})))
+"""
+
+
+@pytest.mark.parametrize('env_var, setup', [('1', ''), (None, 'config.headless = True')])
+def test_headless_does_not_import_gui_stack(env_var, setup):
+    env = dict(os.environ)
+    env.pop('FCSUGAR_HEADLESS', None)
+
+    if env_var is not None:
+        env['FCSUGAR_HEADLESS'] = env_var
+
+    out = subprocess.run([sys.executable, '-c', SCRIPT.format(setup=setup)], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    modules = set(out.stdout.split())
+
+    assert 'fcsugar' in modules
+    assert not modules & {'ipywidgets', 'IPython', 'bokeh', 'matplotlib'}
+
+    # heavy dependencies are only imported by the nodes that use them
+    assert not modules & {'sklearn', 'tslearn'}
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, DataFrameStream, LazyDataFrameContainer
+from fcsugar.core.history import EXECUTED, STREAMED
+from fcsugar.library import splice, normalize, partition
+
+
+def _container():
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(30)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((30, 100)))
+    return container
+
+
+def test_stream_positions(tmp_path):
+    path = str(tmp_path / 'data.h5')
+    _container().to_hdf5(path)
+
+    stream = DataFrameStream(path, output_path=str(tmp_path / 'out.h5'), chunk_rows=10, status_widget=False)
+    stream >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced') >> partition(3)
+    stream.execute_pipeline()
+
+    # one run, the in-memory node continues after the streamed nodes
+    assert stream.history.run == [0, 0, 0]
+    assert stream.history.ix == [0, 1, 2]
+    assert stream.history.status == [STREAMED, STREAMED, EXECUTED]
+
+
+def test_lazy_fused_positions():
+    lazy = LazyDataFrameContainer(_container(), status_widget=False)
+    lazy >> partition(3) >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced')
+    lazy.collect(keep=['partition'])
+
+    # splice and normalize are fused into one step
+    assert lazy.history.name == ['partition', 'splice', 'normalize']
+    assert lazy.history.ix == [0, 1, 2]
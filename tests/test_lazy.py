@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, LazyDataFrameContainer
+from fcsugar.library import absval, log, normalize, splice, zscore
+
+
+def _container(n=30):
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(n)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((n, 100)))
+    container.set_block('other', rng.standard_normal((n, 10)))
+    return container
+
+
+def _nodes():
+    return [splice('_RAW_CURVE', 10, 90), normalize('spliced'), zscore('normalize'), absval('zscore'),
+            log('absval')]
+
+
+def _eager():
+    container = _container()
+    for n in _nodes():
+        container >> n
+    container.execute_pipeline()
+    return container
+
+
+def _lazy(source):
+    lazy = LazyDataFrameContainer(source, status_widget=False)
+    for n in _nodes():
+        lazy >> n
+    return lazy
+
+
+def test_fused_output_matches_eager():
+    eager = _eager()
+    lazy = _lazy(_container())
+
+    # one fused pass over the data
+    assert len(lazy.plan()) == 1
+    assert 'fused' in lazy.explain()
+
+    output = lazy.collect()
+
+    np.testing.assert_allclose(output.get_block('log'), eager.get_block('log'))
+
+    # intermediate columns are not stored
+    assert list(output.dataframe.columns) == ['cell', '_RAW_CURVE', 'other', 'log']
+
+
+def test_keep_intermediate_column():
+    eager = _eager()
+    output = _lazy(_container()).collect(keep=['normalize'])
+
+    assert list(output.dataframe.columns) == ['cell', '_RAW_CURVE', 'other', 'normalize', 'log']
+    np.testing.assert_allclose(output.get_block('normalize'), eager.get_block('normalize'))
+    np.testing.assert_allclose(output.get_block('log'), eager.get_block('log'))
+
+
+def test_dead_nodes_are_skipped():
+    lazy = LazyDataFrameContainer(_container(), status_widget=False)
+
+    # the output of the first splice is overwritten before it is read
+    lazy >> splice('_RAW_CURVE', 0, 50) >> splice('_RAW_CURVE', 10, 20) >> absval('spliced')
+
+    steps = lazy.plan()
+    assert sum(len(s.nodes) for s in steps) == 2
+
+    output = lazy.collect()
+    np.testing.assert_array_equal(output.get_block('absval'), np.abs(_container().get_block('_RAW_CURVE')[:, 10:20]))
+
+
+def test_hdf5_source_reads_needed_columns(tmp_path):
+    path = str(tmp_path / 'data.h5')
+    _container().to_hdf5(path)
+
+    eager = _eager()
+    output = _lazy(path).collect()
+
+    # 'other' is not read, the splice is done on the read
+    assert 'other' not in output.dataframe.columns
+    np.testing.assert_allclose(output.get_block('log'), eager.get_block('log'))
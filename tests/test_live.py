@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, node
+from fcsugar.core import config
+from fcsugar.core.history import CACHED
+
+
+@node
+def slow(container, delay: float = 0.0):
+    time.sleep(delay)
+    return container
+
+
+@node
+def setcol(container, value: int = 0):
+    container.dataframe['out'] = value
+    return container
+
+
+def _wait(container):
+    container._live.timer.join()
+    with container._live.run_lock:
+        pass
+
+
+def test_param_edit_during_scheduled_run(monkeypatch):
+    monkeypatch.setattr(config, 'gui_debounce', 0.0)
+
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(2)}), status_widget=False)
+    container >> slow(delay=0.5) >> setcol(value=1)
+
+    container.schedule_execution()
+    time.sleep(0.2)
+
+    # edited from the GUI while slow is executing, after the keys of the run were computed
+    container.pipeline[1].params['value'] = 2
+    _wait(container)
+
+    # the run used the params of its start, and cached the result under their key
+    assert container.dataframe['out'].tolist() == [1, 1]
+
+    container.execute_pipeline(clear=False)
+    assert container.dataframe['out'].tolist() == [2, 2]
+
+    container.pipeline[1].params['value'] = 1
+    container.execute_pipeline(clear=False)
+    assert container.dataframe['out'].tolist() == [1, 1]
+    assert container.history.status[-2:] == [CACHED, CACHED]
@@ -0,0 +1,59 @@
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+
+from fcsugar import DataFrameContainer, Pipeline
+from fcsugar.core import config, executors
+from fcsugar.library import splice, normalize
+
+
+def _container(status_widget=False):
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(20)}), status_widget=status_widget)
+    container.set_block('_RAW_CURVE', rng.standard_normal((20, 100)))
+    return container
+
+
+def test_failed_run_with_status_widget_is_not_a_success():
+    widget = SimpleNamespace(value='')
+    container = _container(status_widget=widget)
+
+    # the column does not exist
+    results = Pipeline(normalize('missing')).run([container], executor='serial')
+
+    assert not results[0].success
+    assert 'missing' in results[0].error
+    assert 'missing' in widget.value
+
+
+def test_run_does_not_change_config_executor():
+    previous = config.executor
+    config.executor = 'thread'
+
+    try:
+        Pipeline(splice('_RAW_CURVE', 0, 50)).run([_container() for _ in range(3)], executor='thread')
+        assert config.executor == 'thread'
+
+        # the executor of a batch only applies to the thread that runs it
+        seen = []
+        with executors.use_executor('serial'):
+            t = threading.Thread(target=lambda: seen.append(executors.get_executor()))
+            t.start()
+            t.join()
+
+            assert executors.get_executor() == 'serial'
+
+        assert seen == ['thread']
+        assert executors.get_executor() == 'thread'
+
+    finally:
+        config.executor = previous
+
+
+def test_run_outputs():
+    results = Pipeline(splice('_RAW_CURVE', 0, 50)).run([_container() for _ in range(2)], executor='thread')
+
+    assert all(r.success for r in results)
+    assert all(r.output.get_block('spliced').shape == (20, 50) for r in results)
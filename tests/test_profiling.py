@@ -0,0 +1,82 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import DataFrameContainer
+from fcsugar.library import normalize, splice
+
+
+def _container(n=20):
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(n)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((n, 100)))
+    return container
+
+
+def test_profile():
+    container = _container()
+    container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced')
+    container.execute_pipeline(profile=True, trace_memory=True)
+
+    assert [p['node'] for p in container.node_stats] == ['splice', 'normalize']
+
+    for p in container.node_stats:
+        assert {'start', 'wall_time', 'cpu_time', 'max_rss_increase', 'peak_memory'} <= p.keys()
+        assert p['rows_in'] == p['rows_out'] == 20
+
+    splice_profile, normalize_profile = container.node_stats
+    assert list(splice_profile['columns_added']) == ['spliced']
+    assert splice_profile['columns_added']['spliced'] >= 20 * 50 * 8
+    assert normalize_profile['start'] >= splice_profile['start']
+
+    # the profile is attached to each node's log entry
+    assert container.log['splice.0']['_profile'] is splice_profile
+    assert container.log['normalize.0']['_profile'] is normalize_profile
+
+
+def test_no_profile():
+    container = _container()
+    container >> splice('_RAW_CURVE', 0, 50)
+    container.execute_pipeline()
+
+    assert set(container.node_stats[0].keys()) == {'node', 'wall_time'}
+    assert '_profile' not in container.log['splice.0']
+
+
+def test_profiler_callbacks():
+    profiles = []
+
+    container = _container()
+    container.add_profiler(profiles.append)
+    container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced')
+    container.execute_pipeline()
+
+    assert profiles == container.node_stats
+    assert [p['node'] for p in profiles] == ['splice', 'normalize']
+
+
+@pytest.mark.parametrize('format', ['chrome', 'speedscope'])
+def test_export_profile(tmp_path, format):
+    path = str(tmp_path / 'profile.json')
+
+    container = _container()
+    container >> splice('_RAW_CURVE', 0, 50) >> normalize('spliced')
+    container.execute_pipeline(profile=True)
+    exported = container.export_profile(path, format=format)
+
+    with open(path) as f:
+        assert json.load(f) == exported
+
+    if format == 'chrome':
+        assert [e['name'] for e in exported['traceEvents']] == ['splice', 'normalize']
+    else:
+        events = exported['profiles'][0]['events']
+        assert [e['type'] for e in events] == ['O', 'C', 'O', 'C']
+        assert all(a['at'] <= b['at'] for a, b in zip(events, events[1:]))
+
+
+def test_export_profile_format():
+    with pytest.raises(ValueError):
+        _container().export_profile('profile.json', format='pstats')
@@ -0,0 +1,44 @@
+from fcsugar.core import registry
+
+SOURCE = '''
+def scaled(x, factor=2):
+    return x * factor
+'''
+
+
+def test_exec_functions_once_per_namespace():
+    key = registry.register_source(SOURCE)
+    namespace = {}
+
+    registry.exec_functions([key], namespace, namespace)
+    func = namespace['scaled']
+    assert func(3) == 6
+
+    # already defined, not executed again
+    registry.exec_functions([key], namespace, namespace)
+    assert namespace['scaled'] is func
+
+
+def test_exec_functions_after_namespace_changed():
+    key = registry.register_source(SOURCE)
+    namespace = {}
+
+    registry.exec_functions([key], namespace, namespace)
+
+    # overwritten, such as by another function with the same name
+    namespace['scaled'] = lambda x: x
+    registry.exec_functions([key], namespace, namespace)
+    assert namespace['scaled'](3) == 6
+
+    # a new namespace, which can have the id of a namespace that was freed
+    other = {}
+    registry.exec_functions([key], other, other)
+    assert other['scaled'](3) == 6
+
+
+def test_code_hash_is_stable():
+    def f(x):
+        return (lambda y: y + 1)(x)
+
+    assert registry.code_hash(f) == registry.code_hash(f)
+    assert registry.register(f) == registry.register(f)
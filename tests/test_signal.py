@@ -0,0 +1,106 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import signal as scipy_signal
+from scipy.fft import next_fast_len
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import config
+from fcsugar.library import log_power_spectrum, rfft_magnitude, sort_peak_widths, welch_psd
+from fcsugar.library.signal import _peak_widths
+
+
+def _traces(n=200, size=150, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(size)
+
+    # a gaussian peak on a noisy baseline, some of them at the edges
+    centers = rng.uniform(-10, size + 10, n)
+    widths = rng.uniform(2, 30, n)
+    peaks = np.exp(-0.5 * ((t[None, :] - centers[:, None]) / widths[:, None]) ** 2)
+    return peaks + 0.05 * rng.standard_normal((n, size))
+
+
+def _scipy_widths(traces, rel_height=0.5):
+    # peaks at the edges have a prominence and width of 0
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='some peaks have')
+        return np.array(
+            [scipy_signal.peak_widths(x, [np.argmax(x)], rel_height=rel_height)[0][0] for x in traces]
+        )
+
+
+@pytest.mark.parametrize('rel_height', [0.25, 0.5, 1.0, 1.5])
+def test_peak_widths_match_scipy(rel_height):
+    X = _traces()
+    np.testing.assert_allclose(_peak_widths(X, rel_height), _scipy_widths(X, rel_height), atol=1e-9)
+
+
+@pytest.mark.parametrize('ragged', [False, True])
+def test_sort_peak_widths(monkeypatch, ragged):
+    monkeypatch.setattr(config, 'chunk_rows', 16)
+
+    X = _traces()
+    traces = np.empty(len(X), dtype=object)
+    for i, x in enumerate(X):
+        traces[i] = x[:100 + i % 3] if ragged else x
+
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(len(X)), 'trace': traces}),
+                                   status_widget=False)
+    container >> sort_peak_widths('trace')
+    container.execute_pipeline()
+
+    expected = np.argsort(_scipy_widths(traces))
+    np.testing.assert_array_equal(container.dataframe['cell'].values, expected)
+
+
+def _run(node, traces):
+    rows = np.empty(len(traces), dtype=object)
+    for i, x in enumerate(traces):
+        rows[i] = x
+
+    container = DataFrameContainer(pd.DataFrame({'trace': rows}), status_widget=False)
+    container >> node
+    container.execute_pipeline()
+    return [np.asarray(v) for v in container.dataframe[node.name].values]
+
+
+@pytest.mark.parametrize('ragged', [False, True])
+@pytest.mark.parametrize('pad', [False, True])
+def test_rfft_magnitude(ragged, pad):
+    traces = [x[:97 + (i % 3 if ragged else 0)] for i, x in enumerate(_traces(n=30))]
+    outputs = _run(rfft_magnitude('trace', pad=pad), traces)
+
+    for out, x in zip(outputs, traces):
+        n = next_fast_len(x.size, real=True) if pad else x.size
+        np.testing.assert_allclose(out, np.abs(np.fft.rfft(x, n=n)), atol=1e-10)
+
+
+def test_rfft_magnitude_single_precision():
+    traces = list(_traces(n=30))
+    outputs = _run(rfft_magnitude('trace', single_precision=True), traces)
+
+    assert outputs[0].dtype == np.float32
+    np.testing.assert_allclose(np.stack(outputs), np.abs(np.fft.rfft(np.stack(traces))), rtol=1e-4, atol=1e-4)
+
+
+def test_log_power_spectrum():
+    traces = list(_traces(n=30)) + [np.zeros(150)]
+    outputs = _run(log_power_spectrum('trace'), traces)
+
+    expected = np.log10(np.abs(np.fft.rfft(np.stack(traces[:-1]))) ** 2)
+    np.testing.assert_allclose(np.stack(outputs[:-1]), expected, rtol=1e-10, atol=1e-10)
+
+    # zero power is clipped instead of -inf
+    assert np.isfinite(outputs[-1]).all()
+
+
+@pytest.mark.parametrize('nperseg', [64, 1000])
+def test_welch_psd(nperseg):
+    traces = list(_traces(n=30))
+    outputs = _run(welch_psd('trace', nperseg=nperseg), traces)
+
+    for out, x in zip(outputs, traces):
+        np.testing.assert_allclose(out, scipy_signal.welch(x, nperseg=min(nperseg, x.size))[1])
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import DataFrameContainer, DataFrameStream, node
+from fcsugar.core import hdftools
+from fcsugar.library import splice
+
+
+@node(row_local=True)
+def fail_after(container, n_rows: int = 0):
+    if container.dataframe['cell'].values[-1] >= n_rows:
+        raise RuntimeError('failed chunk')
+    return container
+
+
+def _input(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    rng = np.random.default_rng(0)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(30)}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((30, 100)))
+    container.to_hdf5(path)
+    return path
+
+
+def test_stream_output(tmp_path):
+    output_path = str(tmp_path / 'out.h5')
+
+    stream = DataFrameStream(_input(tmp_path), output_path=output_path, chunk_rows=10, status_widget=False)
+    stream >> splice('_RAW_CURVE', 0, 50)
+    output = stream.execute_pipeline()
+
+    assert output.path == output_path
+    assert hdftools.get_n_rows(output_path, stream.key) == 30
+    assert not os.path.exists(f"{output_path}.tmp")
+
+
+def test_failed_stream_leaves_no_output(tmp_path):
+    output_path = str(tmp_path / 'out.h5')
+
+    # the first chunk is written before the second one fails
+    stream = DataFrameStream(_input(tmp_path), output_path=output_path, chunk_rows=10, status_widget=False)
+    stream >> fail_after(n_rows=15)
+
+    with pytest.raises(RuntimeError, match='failed chunk'):
+        stream.execute_pipeline()
+
+    assert os.listdir(tmp_path) == ['data.h5']
+
+    # the stream can be executed again
+    stream >> fail_after(n_rows=30)
+    stream.execute_pipeline()
+    assert hdftools.get_n_rows(output_path, stream.key) == 30
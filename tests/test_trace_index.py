@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import TraceIndex
+from fcsugar.library import build_index
+
+
+def _traces(n=2000, size=200, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 8 * np.pi, size)
+
+    # groups of 10 noisy copies of random smooth traces, so that the neighbours of a trace are its group
+    bases = np.cumsum(rng.standard_normal((n // 10, size)), axis=1) + np.sin(t)[None, :]
+    return (np.repeat(bases, 10, axis=0) + 0.1 * rng.standard_normal((n, size))).astype(np.float32)
+
+
+def _exact(X, Q, k):
+    d = np.linalg.norm(X[None, :, :] - Q[:, None, :], axis=2)
+    return np.argsort(d, axis=1)[:, :k]
+
+
+@pytest.mark.parametrize('metric', ['euclidean', 'sbd'])
+def test_recall(metric):
+    X = _traces()
+    queries = X[:20]
+    k = 10
+
+    index = TraceIndex(metric=metric, random_state=0).fit(X)
+    exact = TraceIndex(metric=metric).fit(X).query(queries, k=k, n_candidates=len(X))[0]
+    rows, distances = index.query(queries, k=k, n_candidates=100)
+
+    recall = np.mean([len(set(r) & set(e)) / k for r, e in zip(rows, exact)])
+    assert recall >= 0.9
+
+    # each query is its own nearest neighbour
+    np.testing.assert_array_equal(rows[:, 0], np.arange(len(queries)))
+    assert (np.diff(distances, axis=1) >= 0).all()
+
+
+def test_exact_euclidean():
+    X = _traces(n=300)
+    rows, _ = TraceIndex().fit(X).query(X[:5], k=5, n_candidates=len(X))
+
+    np.testing.assert_array_equal(rows, _exact(X, X[:5], 5))
+
+
+def _container(n=300):
+    X = _traces(n=n)
+    container = DataFrameContainer(pd.DataFrame({'cell': np.arange(n)}), status_widget=False)
+    container.set_block('_RAW_CURVE', X)
+    return container
+
+
+def test_index_is_stale_after_reordering():
+    container = _container()
+    container >> build_index('_RAW_CURVE', random_state=0)
+    container.execute_pipeline()
+
+    assert len(container.get_index('_RAW_CURVE')) == 300
+
+    # same number of rows, in another order
+    container.dataframe = container.dataframe.iloc[::-1].copy(deep=False)
+
+    with pytest.raises(ValueError):
+        container.get_index('_RAW_CURVE')
+
+
+def test_index_is_stale_after_replacing_column():
+    container = _container()
+    container >> build_index('_RAW_CURVE', random_state=0)
+    container.execute_pipeline()
+
+    container.set_block('_RAW_CURVE', _traces(n=300, seed=1))
+
+    with pytest.raises(ValueError):
+        container.get_index('_RAW_CURVE')
+
+
+def test_saved_index_is_valid_after_loading(tmp_path):
+    path = str(tmp_path / 'data.h5')
+
+    container = _container()
+    container >> build_index('_RAW_CURVE', random_state=0)
+    container.execute_pipeline()
+    container.to_hdf5(path)
+
+    loaded = DataFrameContainer.from_hdf5(path, status_widget=False)
+    query = loaded.dataframe['_RAW_CURVE'].iloc[3]
+
+    rows, _ = loaded.get_index('_RAW_CURVE').query(query, k=5)
+    assert rows[0] == 3
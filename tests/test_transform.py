@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis
+
+from fcsugar import DataFrameContainer
+from fcsugar.core import cache, config
+from fcsugar.library import LDA
+
+
+def _container(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.repeat(np.arange(3), n // 3)
+
+    container = DataFrameContainer(pd.DataFrame({'label': labels}), status_widget=False)
+    container.set_block('_RAW_CURVE', rng.standard_normal((n, 20)) + labels[:, None])
+    container.set_block('other', rng.standard_normal((n, 20)))
+    return container
+
+
+def _lda(container, **kwargs):
+    params = dict(data_column='_RAW_CURVE', labels_column='label', n_components=2)
+    params.update(kwargs)
+
+    container >> LDA(**params)
+    container.execute_pipeline()
+    return container.get_block('lda_transform')
+
+
+@pytest.fixture(autouse=True)
+def _clear_models():
+    cache.models.clear()
+    yield
+    cache.models.clear()
+
+
+def test_fit():
+    container = _container()
+    X = container.get_block('_RAW_CURVE')
+    y = container.dataframe['label'].values
+
+    expected = LinearDiscriminantAnalysis().fit(X, y).transform(X)[:, :2]
+    np.testing.assert_allclose(_lda(container), expected)
+
+
+def test_fit_false_uses_latest_model():
+    fitted = _container()
+    _lda(fitted)
+
+    # new rows transformed with the model fit on the first container
+    new = _container(seed=1)
+    X_fit = fitted.get_block('_RAW_CURVE')
+    expected = LinearDiscriminantAnalysis().fit(X_fit, fitted.dataframe['label'].values)
+    expected = expected.transform(new.get_block('_RAW_CURVE'))[:, :2]
+
+    np.testing.assert_allclose(_lda(new, fit=False), expected)
+
+
+def test_fit_false_is_per_data_column():
+    _lda(_container())
+
+    with pytest.raises(ValueError):
+        _lda(_container(), data_column='other', fit=False)
+
+
+def test_fit_false_without_model_cache():
+    previous = config.model_cache_size
+    config.model_cache_size = 0
+
+    try:
+        _lda(_container())
+
+        with pytest.raises(ValueError, match='model_cache_size'):
+            _lda(_container(), fit=False)
+
+    finally:
+        config.model_cache_size = previous
+
+
+def test_fit_size():
+    container = _container()
+    transform = _lda(container, fit_size=30, random_state=0)
+
+    # fit on a sample, transform all rows
+    assert transform.shape == (60, 2)
+    assert len(cache.models) == 2
+
+    # same sample, the model is reused
+    np.testing.assert_array_equal(_lda(_container(), fit_size=30, random_state=0), transform)
+    assert len(cache.models) == 2
+
+    # another sample, another model
+    _lda(_container(), fit_size=30, random_state=1)
+    assert len(cache.models) == 4